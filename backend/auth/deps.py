@@ -1,15 +1,17 @@
 # backend/auth/deps.py
-from fastapi import Depends, HTTPException, Request, status
-from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from database import get_db
-from config import JWT_SECRET, JWT_ALG
+from fastapi import Depends, HTTPException, status
+from starlette.requests import HTTPConnection
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from backend.users.models import User
+from backend.auth.principal_cache import principal_cache
+from backend.auth.tokens import TokenError, token_service
+from backend.auth.revocation import revocations
 from uuid import UUID
 
 COOKIE_NAME = "access_token"
 
-def _extract_token(request: Request) -> str | None:
+def _extract_token(request: HTTPConnection) -> str | None:
     # 1) из cookie
     t = request.cookies.get(COOKIE_NAME)
     if t:
@@ -34,28 +36,46 @@ def _parse_sub(sub: str):
     # оставляем строкой (если PK строковый)
     return sub
 
-def current_user(request: Request, db: Session = Depends(get_db)) -> User:
+# HTTPConnection, а не Request: та же зависимость работает и для WebSocket-роутов
+async def current_user(request: HTTPConnection, db: AsyncSession = Depends(get_async_db)) -> User:
     token = _extract_token(request)
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
+    # подпись проверяется один раз на токен, дальше — кэш до exp (см. tokens.py)
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-    except JWTError:
+        payload = token_service.verify(token)
+    except TokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
 
     sub = payload.get("sub")
     if not sub:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
 
+    # каждый токен принадлежит сессии: без sid его нельзя отозвать, такие не принимаем
+    sid = payload.get("sid")
+    if not sid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+    # отзыв (выход, кража refresh-токена): почти всегда — только Bloom-фильтр в памяти
+    if await revocations.is_revoked(db, sid):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session revoked")
+
+    sub = str(sub)
+    user = principal_cache.get(sub)
+    if user is not None:
+        return user
+
     key = _parse_sub(sub)
 
     # SQLAlchemy 1.4: Session.get; на 2.x используйте db.get(User, key)
     # SQLAlchemy 1.4+: Session.get гарантированно работает и с UUID первичными ключами.
     # Query.get помечен как legacy и не всегда корректно отрабатывает для UUID, поэтому
     # используем современный API, чтобы не терять пользователя и не выбрасывать 401.
-    user = db.get(User, key)
+    user = await db.get(User, key)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
+    # отсоединяем от сессии запроса: объект будет жить в кэше и читаться другими запросами
+    db.expunge(user)
+    principal_cache.put(sub, user, exp=payload.get("exp"))
     return user
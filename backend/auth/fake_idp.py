@@ -0,0 +1,162 @@
+# backend/auth/fake_idp.py
+"""A local stand-in for Google's OpenID Connect endpoints, for offline sign-in.
+
+    python -m backend.auth.fake_idp [--port 9100] [--latency-ms 0] [--connect-latency-ms 0]
+
+then start the API with ``GOOGLE_DISCOVERY_URL=http://127.0.0.1:9100/.well-known/openid-configuration``
+and any ``GOOGLE_CLIENT_ID`` / ``GOOGLE_CLIENT_SECRET``. ``/authorize``
+consents at once (``login_hint`` picks the e-mail) and redirects back with a
+code; ``/token`` answers with an RS256 ID token whose key is served from
+``/jwks``. ``--latency-ms`` delays every response, and ``--connect-latency-ms``
+additionally delays the first request on each new connection, standing in
+for the TCP/TLS handshake to the real provider. ``/stats`` counts requests
+and connections.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import secrets
+import time
+from collections import Counter
+from typing import Dict, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, RedirectResponse
+from starlette.routing import Route
+
+_CACHE_HEADERS = {"Cache-Control": "public, max-age=3600"}
+
+
+class FakeIdP:
+    def __init__(self, base_url: str, latency: float = 0.0, connect_latency: float = 0.0):
+        self.base_url = base_url.rstrip("/")
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.requests: Counter = Counter()
+        self.connections: set = set()
+        self._codes: Dict[str, Tuple[str, str, str]] = {}  # code -> (client id, nonce, e-mail)
+        self.rotate_key()
+        self.app = Starlette(routes=[
+            Route("/.well-known/openid-configuration", self.discovery),
+            Route("/authorize", self.authorize),
+            Route("/token", self.token, methods=["POST"]),
+            Route("/jwks", self.jwks),
+            Route("/userinfo", self.userinfo),
+            Route("/stats", self.stats),
+        ])
+
+    def rotate_key(self) -> None:
+        """Sign with a new key (new ``kid``) from now on, as a provider rotation would."""
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        # constructed once: handing jose the PEM re-parses the key on every token (~30 ms)
+        self._signing_key = jwk.construct(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ), "RS256")
+        public_pem = key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        self.kid = secrets.token_hex(8)
+        self._jwk = {**jwk.construct(public_pem, "RS256").to_dict(), "kid": self.kid, "use": "sig"}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            if scope["path"] != "/stats":
+                self.requests[scope["path"]] += 1
+            # a new client address/port is a new connection
+            if scope.get("client") not in self.connections:
+                self.connections.add(scope.get("client"))
+                await asyncio.sleep(self.connect_latency)
+            await asyncio.sleep(self.latency)
+        await self.app(scope, receive, send)
+
+    async def discovery(self, request: Request):
+        return JSONResponse({
+            "issuer": self.base_url,
+            "authorization_endpoint": f"{self.base_url}/authorize",
+            "token_endpoint": f"{self.base_url}/token",
+            "jwks_uri": f"{self.base_url}/jwks",
+            "userinfo_endpoint": f"{self.base_url}/userinfo",
+            "response_types_supported": ["code"],
+            "id_token_signing_alg_values_supported": ["RS256"],
+            "token_endpoint_auth_methods_supported": ["client_secret_basic", "client_secret_post"],
+        }, headers=_CACHE_HEADERS)
+
+    async def authorize(self, request: Request):
+        params = request.query_params
+        code = secrets.token_urlsafe(16)
+        self._codes[code] = (
+            params.get("client_id", ""), params.get("nonce", ""), params.get("login_hint") or "designer@example.com",
+        )
+        query = urlencode({"code": code, "state": params.get("state", "")})
+        return RedirectResponse(f"{params['redirect_uri']}?{query}", status_code=302)
+
+    def _claims(self, client_id: str, email: str) -> dict:
+        name = email.split("@")[0]
+        return {
+            "iss": self.base_url,
+            "aud": client_id,
+            "sub": hashlib.sha256(email.encode()).hexdigest()[:21],
+            "email": email,
+            "email_verified": True,
+            "given_name": name.capitalize(),
+            "family_name": "Local",
+            "picture": f"{self.base_url}/avatars/{name}.png",
+        }
+
+    async def token(self, request: Request):
+        # urlencoded by hand: Starlette's form parser needs python-multipart
+        form = dict(parse_qsl((await request.body()).decode()))
+        entry = self._codes.pop(form.get("code", ""), None)
+        if entry is None:
+            return JSONResponse({"error": "invalid_grant"}, status_code=400)
+        client_id, nonce, email = entry
+        if not client_id:
+            client_id = form.get("client_id", "")
+        now = int(time.time())
+        id_token = jwt.encode(
+            {**self._claims(client_id, email), "iat": now, "exp": now + 3600, "nonce": nonce},
+            self._signing_key, algorithm="RS256", headers={"kid": self.kid},
+        )
+        return JSONResponse({
+            "access_token": f"{email}:{secrets.token_urlsafe(16)}",
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "scope": "openid email profile",
+            "id_token": id_token,
+        })
+
+    async def jwks(self, request: Request):
+        return JSONResponse({"keys": [self._jwk]}, headers=_CACHE_HEADERS)
+
+    async def userinfo(self, request: Request):
+        email = request.headers.get("authorization", "").removeprefix("Bearer ").split(":")[0]
+        if "@" not in email:
+            return JSONResponse({"error": "invalid_token"}, status_code=401)
+        return JSONResponse(self._claims("", email))
+
+    async def stats(self, request: Request):
+        return JSONResponse({"requests": dict(self.requests), "connections": len(self.connections)})
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--connect-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    idp = FakeIdP(f"http://{args.host}:{args.port}", args.latency_ms / 1000, args.connect_latency_ms / 1000)
+    uvicorn.run(idp, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
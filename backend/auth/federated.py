@@ -0,0 +1,124 @@
+# backend/auth/federated.py
+"""Вход через внешнего провайдера (Google и т.п.): найти/привязать/создать User одним запросом.
+
+Раньше callback делал до четырёх обращений к БД (поиск по provider+provider_id,
+поиск по email, INSERT/UPDATE, refresh) и при одновременных первых входах
+одного человека падал на уникальных ограничениях. Здесь всё — один
+INSERT ... ON CONFLICT с CTE:
+
+* ``found``    — пользователь с этой внешней учёткой (uq_provider_providerid);
+* ``touched``  — обновляем ему аватар, только если он изменился;
+* ``upserted`` — если учётки нет: вставляем нового пользователя, а при
+  конфликте по email привязываем учётку к уже существующему (пароль и
+  чужую привязку не трогаем — COALESCE).
+
+Гонка «одна внешняя учётка, разные email» (оба INSERT проходят мимо
+``found``) заканчивается IntegrityError — запрос повторяется один раз,
+и повтор уже находит учётку через ``found``.
+"""
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, exists, func, select, true, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.users.models import User
+from backend.auth.principal_cache import principal_cache
+
+_users = User.__table__
+
+
+@dataclass
+class FederatedIdentity:
+    provider: str          # 'google', ...
+    subject: str           # устойчивый id у провайдера (OIDC `sub`)
+    email: str
+    first_name: str
+    last_name: str
+    avatar_url: Optional[str] = None
+
+
+def _upsert_statement():
+    # имена параметров не совпадают с колонками: иначе execute() подставит их в SET у UPDATE
+    param = {
+        name: bindparam(f"identity_{name}", type_=_users.c[column].type)
+        for name, column in (
+            ("id", "id"), ("first_name", "first_name"), ("last_name", "last_name"), ("email", "email"),
+            ("provider", "provider"), ("subject", "provider_id"), ("avatar_url", "avatar_url"),
+            ("created_at", "created_at"),
+        )
+    }
+    found = (
+        select(_users.c.id)
+        .where(_users.c.provider == param["provider"], _users.c.provider_id == param["subject"])
+        .cte("found")
+    )
+    found_ids = select(found.c.id)
+
+    # аватар переписываем, только если провайдер его прислал и он другой
+    touched = (
+        update(_users)
+        .where(
+            _users.c.id.in_(found_ids),
+            param["avatar_url"].is_not(None),
+            _users.c.avatar_url.is_distinct_from(param["avatar_url"]),
+        )
+        .values(avatar_url=param["avatar_url"])
+        .returning(_users.c.id)
+        .cte("touched")
+    )
+
+    columns = ["id", "first_name", "last_name", "email", "provider", "subject", "avatar_url", "created_at"]
+    stmt = insert(_users).from_select(
+        ["id", "first_name", "last_name", "email", "provider", "provider_id", "avatar_url", "created_at"],
+        select(*(param[name] for name in columns)).where(~exists(found_ids)),
+        include_defaults=False,
+    )
+    upserted = stmt.on_conflict_do_update(
+        index_elements=[_users.c.email],
+        set_={
+            "provider": func.coalesce(_users.c.provider, stmt.excluded.provider),
+            "provider_id": func.coalesce(_users.c.provider_id, stmt.excluded.provider_id),
+            "avatar_url": func.coalesce(stmt.excluded.avatar_url, _users.c.avatar_url),
+        },
+    ).returning(_users.c.id).cte("upserted")
+
+    # changed: строка переписана — запись в principal_cache надо сбросить
+    return select(found.c.id, exists(select(touched.c.id)).label("changed")).union_all(
+        select(upserted.c.id, true())
+    )
+
+
+# собирается один раз: SQLAlchemy кэширует и скомпилированный SQL
+_UPSERT = _upsert_statement()
+
+
+async def upsert_federated_user(db: AsyncSession, identity: FederatedIdentity) -> uuid.UUID:
+    """id пользователя для внешней учётки; создаёт/привязывает и коммитит за один запрос."""
+    for attempt in (1, 2):
+        try:
+            user_id, changed = (await db.execute(_UPSERT, {
+                "identity_id": uuid.uuid4(),
+                "identity_first_name": identity.first_name,
+                "identity_last_name": identity.last_name,
+                "identity_email": identity.email,
+                "identity_provider": identity.provider,
+                "identity_subject": identity.subject,
+                "identity_avatar_url": identity.avatar_url,
+                "identity_created_at": datetime.utcnow(),
+            })).one()
+            await db.commit()
+            break
+        except IntegrityError:
+            await db.rollback()
+            if attempt == 2:
+                raise
+    if changed:
+        principal_cache.invalidate(user_id)
+    return user_id
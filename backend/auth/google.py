@@ -1,37 +1,40 @@
 # backend/auth/google.py
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import RedirectResponse
-from jose import jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.requests import Request
-from authlib.integrations.starlette_client import OAuth
 from authlib.integrations.base_client.errors import OAuthError
 
 from config import (
-    GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, OAUTH_REDIRECT_URI,
-    JWT_SECRET, JWT_ALG, JWT_EXPIRES_MIN
+    GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_DISCOVERY_URL, OAUTH_REDIRECT_URI,
+    OIDC_HTTP_TIMEOUT_SEC,
 )
-from database import get_db
-from backend.users import models as users_models
+from database import get_async_db
+from backend.auth.federated import FederatedIdentity, upsert_federated_user
+from backend.auth.oidc import CachedOAuth, pooled_transport
+from backend.auth.sessions import start_session
+from backend.responses import FastJSONRoute
 
-router = APIRouter(prefix="/auth/google", tags=["OAuth: Google"])
+router = APIRouter(prefix="/auth/google", tags=["OAuth: Google"], route_class=FastJSONRoute)
 
 # --- Настройка OAuth-клиента ---
-oauth = OAuth()
+# CachedOAuth: discovery и JWKS кэшируются с TTL и обновляются в фоне,
+# все запросы к Google идут через общий пул keep-alive соединений (см. oidc.py)
+oauth = CachedOAuth()
 oauth.register(
     name="google",
     client_id=GOOGLE_CLIENT_ID,
     client_secret=GOOGLE_CLIENT_SECRET,
-    server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
+    server_metadata_url=GOOGLE_DISCOVERY_URL,
     client_kwargs={
         "scope": "openid email profile",
         "trust_env": False,
-        "timeout": 10.0},
+        "timeout": OIDC_HTTP_TIMEOUT_SEC,
+        "transport": pooled_transport()},
 )
 
 async def _authorize_google_token(request: Request, **kwargs) -> tuple[dict, Optional[dict]]:
@@ -85,15 +88,6 @@ async def _authorize_google_token(request: Request, **kwargs) -> tuple[dict, Opt
         token["userinfo"] = userinfo
     return token, state_data
 
-def issue_jwt(user_id) -> str:
-    now = datetime.now(tz=timezone.utc)  # всегда UTC
-    payload = {
-        "sub": str(user_id),
-        "iat": now,
-        "exp": now + timedelta(minutes=JWT_EXPIRES_MIN),
-    }
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
-
 @router.get("/login")
 async def google_login(request: Request):
     """Редирект на Google для логина/регистрации."""
@@ -105,7 +99,7 @@ async def google_login(request: Request):
     # return await oauth.google.authorize_redirect(request, redirect_uri)
 
 @router.get("/callback", name="google_callback")
-async def google_callback(request: Request, db: Session = Depends(get_db)):
+async def google_callback(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Принимаем ответ от Google, создаём/находим пользователя, ставим cookie с JWT."""
      # redirect_uri может приходить из query params или быть сохранён в state Authlib.
     final_redirect: Optional[str] = request.query_params.get("redirect_uri")
@@ -139,53 +133,21 @@ async def google_callback(request: Request, db: Session = Depends(get_db)):
 
     email = userinfo.get("email")
     sub = userinfo.get("sub")                     # устойчивый id в Google
-    given_name = userinfo.get("given_name") or ""
-    family_name = userinfo.get("family_name") or ""
-    picture = userinfo.get("picture")
 
     if not email or not sub:
         raise HTTPException(400, "Missing email/sub from Google")
 
-    # 1) ищем по provider+provider_id
-    user = db.query(users_models.User).filter(
-        users_models.User.provider == "google",
-        users_models.User.provider_id == sub
-    ).one_or_none()
-
-    # 2) если нет — пробуем по email (мог регаться ранее паролем)
-    if not user:
-        user = db.query(users_models.User).filter(
-            users_models.User.email == email
-        ).one_or_none()
-
-    # 3) создаём или обновляем
-    if not user:
-        user = users_models.User(
-            first_name=given_name or "Google",
-            last_name=family_name or "User",
-            email=email,
-            password_hash=None,     # OAuth-пользователь — пароль не обязателен
-            provider="google",
-            provider_id=sub,
-            avatar_url=picture,
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    else:
-        changed = False
-        if not user.provider:
-            user.provider = "google"; changed = True
-        if not user.provider_id:
-            user.provider_id = sub; changed = True
-        if picture and user.avatar_url != picture:
-            user.avatar_url = picture; changed = True
-        if changed:
-            db.add(user)
-            db.commit()
-
-    # 4) выдаём JWT -> кладём в httpOnly cookie
-    token_jwt = issue_jwt(user.id)
+    # найти по provider+provider_id, иначе привязать по email (мог регаться ранее паролем),
+    # иначе создать — одним запросом, см. federated.py
+    user_id = await upsert_federated_user(db, FederatedIdentity(
+        provider="google",
+        subject=sub,
+        email=email,
+        first_name=userinfo.get("given_name") or "Google",
+        last_name=userinfo.get("family_name") or "User",
+        avatar_url=userinfo.get("picture"),
+    ))
+
     if final_redirect and not final_redirect.startswith("/"):
         final_redirect = None
 
@@ -196,13 +158,6 @@ async def google_callback(request: Request, db: Session = Depends(get_db)):
         status_code=status.HTTP_303_SEE_OTHER
         )
 
-    resp.set_cookie(
-        key="access_token",
-        value=token_jwt,
-        httponly=True,
-        secure=False,   # True на проде (https)
-        samesite="lax",
-        max_age=JWT_EXPIRES_MIN * 60,
-        path="/",
-    )
+    # выдаём access + refresh -> кладём в httpOnly cookie (см. sessions.py)
+    await start_session(db, user_id, resp)
     return resp
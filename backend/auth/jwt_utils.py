@@ -1,11 +1,9 @@
 from typing import Optional
 from fastapi import Request, HTTPException, status
-from jose import jwt, JWTError
-import os
 
-ALGORITHM = os.getenv("JWT_ALG", "HS256")
-SECRET_KEY = os.getenv("JWT_SECRET", "supersecret")
-COOKIE_NAME = "access_token"
+# проверка токенов — общая, в backend/auth/tokens.py (раньше здесь был свой секрет по умолчанию)
+from backend.auth.tokens import TokenError, token_service
+from backend.auth.deps import COOKIE_NAME
 
 class AuthError(HTTPException):
     def __init__(self, detail: str, code: int = status.HTTP_401_UNAUTHORIZED):
@@ -16,8 +14,8 @@ def get_token_from_cookie(request: Request) -> Optional[str]:
 
 def decode_token(token: str) -> dict:
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except JWTError as e:
+        return dict(token_service.verify(token))  # копия: claims из кэша общие
+    except TokenError as e:
         raise AuthError("Invalid or expired token") from e
 
 def get_current_user_payload(request: Request) -> dict:
@@ -0,0 +1,175 @@
+# backend/auth/oidc.py
+"""OpenID Connect discovery and keys, cached, over one pooled HTTP client.
+
+Stock Authlib fetches the discovery document once per process and never
+again, keeps the JWKS forever, and builds a new HTTP client for every
+discovery fetch, token exchange and JWKS request. Each of those is a fresh
+TCP/TLS connection on the critical path of a sign-in. ``CachedOIDCApp``
+replaces those pieces:
+
+* discovery and JWKS are ``CachedDocument``s. Each stays fresh for the
+  response's ``max-age`` (or OIDC_CACHE_TTL_SEC), then is served stale while
+  a single background task refreshes it. Only a cold cache waits for the
+  network;
+* an ID token signed with an unknown ``kid`` forces a JWKS refetch, at most
+  once per OIDC_JWKS_MIN_REFETCH_SEC, so forged tokens cannot hammer the
+  provider;
+* every request goes through one keep-alive connection pool, so the token
+  exchange reuses a warm connection.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from typing import Awaitable, Callable, Optional, Tuple
+
+import httpx
+from authlib.integrations.starlette_client import OAuth, StarletteOAuth2App
+
+from config import OIDC_CACHE_TTL_SEC, OIDC_HTTP_MAX_CONNECTIONS, OIDC_JWKS_MIN_REFETCH_SEC
+
+log = logging.getLogger(__name__)
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class CachedDocument:
+    """A JSON document with a TTL, refreshed in the background once stale."""
+
+    def __init__(self, name: str, fetch: Callable[[], Awaitable[Tuple[dict, Optional[float]]]], ttl: float):
+        self.name = name
+        self._fetch = fetch
+        self.ttl = ttl
+        self._value: Optional[dict] = None
+        self._expires = 0.0
+        self._fetched = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh: Optional[asyncio.Task] = None
+        self.fetches = 0
+        self.errors = 0
+
+    async def _load(self) -> dict:
+        value, max_age = await self._fetch()
+        now = time.monotonic()
+        self._value = value
+        self._fetched = now
+        self._expires = now + (max_age if max_age is not None else self.ttl)
+        self.fetches += 1
+        return value
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            async with self._lock:
+                await self._load()
+        except Exception as exc:
+            # keep serving the stale copy; the next request schedules another try
+            self.errors += 1
+            log.warning("oidc: refreshing %s failed: %s", self.name, exc)
+
+    async def get(self) -> dict:
+        if self._value is None:
+            async with self._lock:  # concurrent cold callers share one fetch
+                if self._value is None:
+                    await self._load()
+        elif time.monotonic() >= self._expires and (self._refresh is None or self._refresh.done()):
+            self._refresh = asyncio.create_task(self._refresh_in_background())
+        return self._value
+
+    async def refetch(self, min_interval: float) -> dict:
+        """Fetch now, unless the copy is younger than ``min_interval`` seconds."""
+        async with self._lock:
+            if self._value is None or time.monotonic() - self._fetched >= min_interval:
+                await self._load()
+        return self._value
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "cached": self._value is not None,
+            "age_sec": round(now - self._fetched, 1) if self._value is not None else None,
+            "fresh_for_sec": round(max(self._expires - now, 0.0), 1),
+            "fetches": self.fetches,
+            "errors": self.errors,
+        }
+
+
+class _BorrowedTransport(httpx.AsyncBaseTransport):
+    """Lends the shared pool to a short-lived client; closing that client leaves the pool open."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+
+pool = httpx.AsyncHTTPTransport(
+    limits=httpx.Limits(max_connections=OIDC_HTTP_MAX_CONNECTIONS, keepalive_expiry=60.0),
+    retries=1,
+)
+
+
+def pooled_transport() -> httpx.AsyncBaseTransport:
+    return _BorrowedTransport(pool)
+
+
+def _max_age(response) -> Optional[float]:
+    match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+    return float(match.group(1)) if match else None
+
+
+class CachedOIDCApp(StarletteOAuth2App):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.discovery = CachedDocument("discovery", self._fetch_discovery, OIDC_CACHE_TTL_SEC)
+        self.jwks = CachedDocument("jwks", self._fetch_jwks, OIDC_CACHE_TTL_SEC)
+
+    async def _get_json(self, url: str) -> Tuple[dict, Optional[float]]:
+        async with self._get_session() as client:
+            response = await client.request("GET", url, withhold_token=True)
+            response.raise_for_status()
+            return response.json(), _max_age(response)
+
+    async def _fetch_discovery(self) -> Tuple[dict, Optional[float]]:
+        return await self._get_json(self._server_metadata_url)
+
+    async def _fetch_jwks(self) -> Tuple[dict, Optional[float]]:
+        metadata = await self.load_server_metadata()
+        uri = metadata.get("jwks_uri")
+        if not uri:
+            raise RuntimeError('Missing "jwks_uri" in metadata')
+        return await self._get_json(uri)
+
+    async def load_server_metadata(self) -> dict:
+        if not self._server_metadata_url:
+            return self.server_metadata
+        return {**self.server_metadata, **await self.discovery.get()}
+
+    async def fetch_jwk_set(self, force: bool = False) -> dict:
+        # Authlib passes force=True after an unknown ``kid``: the provider may have rotated keys
+        if force:
+            return await self.jwks.refetch(OIDC_JWKS_MIN_REFETCH_SEC)
+        return await self.jwks.get()
+
+    async def warm_up(self) -> None:
+        """Load discovery and JWKS ahead of the first sign-in; failures only log."""
+        try:
+            await self.jwks.get()
+        except Exception as exc:
+            log.warning("oidc: warm-up of %s failed: %s", self.name, exc)
+
+    def stats(self) -> dict:
+        return {"discovery": self.discovery.stats(), "jwks": self.jwks.stats()}
+
+
+class CachedOAuth(OAuth):
+    oauth2_client_cls = CachedOIDCApp
+
+
+async def close_pool() -> None:
+    await pool.aclose()
@@ -0,0 +1,92 @@
+# backend/auth/principal_cache.py
+"""In-process кэш аутентифицированных пользователей для current_user.
+
+Ключ — subject токена (`sub`), значение — отсоединённый от сессии объект User.
+Запись живёт не дольше PRINCIPAL_CACHE_TTL_SEC и не дольше `exp` токена,
+размер ограничен (LRU). При изменении пользователя запись надо сбросить:
+это делает listener на User ниже, а явный вызов invalidate() доступен
+для мест, где пользователь меняется в обход ORM.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+
+from config import PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SEC
+from backend.users.models import User
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple[float, User]]" = OrderedDict()
+        # sync-fallback код может звать кэш из threadpool, поэтому обычный Lock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, sub: str) -> Optional[User]:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(sub)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if expires_at <= now:
+                del self._data[sub]
+                self.misses += 1
+                return None
+            self._data.move_to_end(sub)
+            self.hits += 1
+            return user
+
+    def put(self, sub: str, user: User, exp: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        with self._lock:
+            self._data[sub] = (expires_at, user)
+            self._data.move_to_end(sub)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, sub) -> None:
+        with self._lock:
+            self._data.pop(str(sub), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_sec": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SEC)
+
+
+# --- хуки инвалидации: любое изменение/удаление User через ORM сбрасывает запись ---
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target: User) -> None:
+    principal_cache.invalidate(target.id)
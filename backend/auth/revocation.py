@@ -0,0 +1,159 @@
+# backend/auth/revocation.py
+"""Отозванные сессии в памяти: Bloom-фильтр поверх таблицы revoked_sessions.
+
+Access-токен несёт ``sid``. Проверка на каждом запросе — несколько бит в
+фильтре, без запроса к БД. Фильтр не даёт ложных «нет»: если sid в нём не
+найден, сессия точно не отозвана. Ложные «да» (доля
+REVOCATION_FILTER_FP_RATE) и настоящие отзывы проверяются точным запросом.
+
+Фильтр пересобирается из таблицы раз в REVOCATION_REBUILD_SEC; заодно
+удаляются истёкшие строки revoked_sessions и refresh_tokens. Отзыв в этом
+процессе попадает в фильтр сразу; в других воркерах — при их следующей
+пересборке. До первой сборки каждая проверка идёт в БД.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import delete, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+from config import REVOCATION_FILTER_FP_RATE, REVOCATION_REBUILD_SEC
+from backend.users.models import RefreshToken, RevokedSession
+
+log = logging.getLogger(__name__)
+
+_MIN_CAPACITY = 1024
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _seeds(self, key: bytes):
+        # двойное хеширование: k позиций из двух 64-битных половин одного blake2b
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def add(self, key: bytes) -> None:
+        h1, h2 = self._seeds(key)
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % self.size
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: bytes) -> bool:
+        h1, h2 = self._seeds(key)
+        bits, size = self._bits, self.size
+        # почти все проверяемые sid не отозваны: выходим на первом нулевом бите
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+def _key(session_id) -> bytes:
+    return (session_id if isinstance(session_id, uuid.UUID) else uuid.UUID(str(session_id))).bytes
+
+
+class RevocationList:
+    def __init__(self, rebuild_every: float, fp_rate: float):
+        self.rebuild_every = rebuild_every
+        self.fp_rate = fp_rate
+        self.filter = BloomFilter(_MIN_CAPACITY, fp_rate)
+        self.loaded = False
+        self._added_since_rebuild: List[bytes] = []
+        self._task: Optional[asyncio.Task] = None
+        self.checks = 0
+        self.filter_hits = 0
+        self.confirmed = 0
+        self.rebuilds = 0
+        self.rebuild_ms = 0.0
+
+    def add(self, session_id) -> None:
+        """Сессия только что отозвана в этом процессе (строка в revoked_sessions уже закоммичена)."""
+        key = _key(session_id)
+        self.filter.add(key)
+        self._added_since_rebuild.append(key)
+
+    async def is_revoked(self, db: AsyncSession, session_id) -> bool:
+        self.checks += 1
+        try:
+            key = _key(session_id)
+        except ValueError:
+            return True  # sid не UUID — такую сессию мы не выдавали
+        if self.loaded and key not in self.filter:
+            return False
+        self.filter_hits += 1
+        revoked = bool(await db.scalar(
+            select(exists().where(RevokedSession.session_id == uuid.UUID(bytes=key)))
+        ))
+        self.confirmed += revoked
+        return revoked
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        start = time.perf_counter()
+        pending, self._added_since_rebuild = self._added_since_rebuild, []
+        now = datetime.utcnow()
+        await db.execute(delete(RevokedSession).where(RevokedSession.expires_at <= now))
+        await db.execute(delete(RefreshToken).where(RefreshToken.expires_at <= now))
+        await db.commit()
+        ids = (await db.execute(select(RevokedSession.session_id))).scalars().all()
+        fresh = BloomFilter(max(2 * len(ids), _MIN_CAPACITY), self.fp_rate)
+        for session_id in ids:
+            fresh.add(session_id.bytes)
+        # отзывы, закоммиченные уже после нашего SELECT, в ids могли не попасть
+        for key in pending + self._added_since_rebuild:
+            fresh.add(key)
+        self.filter = fresh
+        self.loaded = True
+        self.rebuilds += 1
+        self.rebuild_ms = (time.perf_counter() - start) * 1000
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with database.AsyncSessionLocal() as db:
+                    await self.rebuild(db)
+            except Exception:
+                log.exception("revocation: rebuilding the filter failed")
+            await asyncio.sleep(self.rebuild_every)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "entries": self.filter.count,
+            "capacity": self.filter.capacity,
+            "bits": self.filter.size,
+            "hashes": self.filter.hashes,
+            "checks": self.checks,
+            "filter_hits": self.filter_hits,
+            "confirmed": self.confirmed,
+            "rebuilds": self.rebuilds,
+            "rebuild_ms": round(self.rebuild_ms, 1),
+        }
+
+
+revocations = RevocationList(REVOCATION_REBUILD_SEC, REVOCATION_FILTER_FP_RATE)
@@ -0,0 +1,177 @@
+# backend/auth/sessions.py
+"""Сессии: короткий access-токен + ротируемый refresh-токен.
+
+Вход (пароль или Google) открывает сессию: access-токен с ``sid`` на
+JWT_EXPIRES_MIN в cookie ``access_token`` и непрозрачный refresh-токен на
+REFRESH_EXPIRES_DAYS в cookie ``refresh_token`` (её видит только /auth).
+``POST /auth/refresh`` меняет refresh-токен на новый и выдаёт свежий
+access — без bcrypt и без похода к Google.
+
+Использованный refresh-токен, предъявленный снова, означает, что его
+скопировали: вся сессия отзывается. Исключение — повтор в пределах
+REFRESH_REUSE_GRACE_SEC (две вкладки обновились одновременно): тогда только
+новый access. Выход отзывает сессию целиком; отзыв проверяет current_user
+через backend/auth/revocation.py.
+"""
+from __future__ import annotations
+
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import HTTPConnection, Request
+
+from config import JWT_EXPIRES_MIN, REFRESH_EXPIRES_DAYS, REFRESH_REUSE_GRACE_SEC
+from database import get_async_db
+from backend.users.models import RefreshToken, RevokedSession
+from backend.auth.deps import COOKIE_NAME, _extract_token
+from backend.auth.revocation import revocations
+from backend.auth.tokens import TokenError, token_service
+from backend.responses import FastJSONRoute
+
+REFRESH_COOKIE_NAME = "refresh_token"
+_REFRESH_COOKIE_PATH = "/auth"
+
+router = APIRouter(prefix="/auth", tags=["Auth"], route_class=FastJSONRoute)
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _set_access_cookie(response: Response, user_id, session_id: uuid.UUID) -> None:
+    response.set_cookie(
+        key=COOKIE_NAME,
+        value=token_service.issue(user_id, sid=str(session_id)),
+        httponly=True,
+        secure=False,   # True на проде (https)
+        samesite="lax",
+        max_age=JWT_EXPIRES_MIN * 60,
+        path="/",
+    )
+
+
+def _new_refresh_token(db: AsyncSession, user_id, session_id: uuid.UUID, response: Response) -> None:
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        token_hash=_hash(token),
+        session_id=session_id,
+        user_id=user_id,
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_EXPIRES_DAYS),
+    ))
+    response.set_cookie(
+        key=REFRESH_COOKIE_NAME,
+        value=token,
+        httponly=True,
+        secure=False,
+        samesite="lax",
+        max_age=REFRESH_EXPIRES_DAYS * 24 * 3600,
+        path=_REFRESH_COOKIE_PATH,
+    )
+
+
+async def start_session(db: AsyncSession, user_id, response: Response) -> None:
+    """Новая сессия после входа: пишет refresh-токен, коммитит, ставит обе cookie."""
+    session_id = uuid.uuid4()
+    _new_refresh_token(db, user_id, session_id, response)
+    await db.commit()
+    _set_access_cookie(response, user_id, session_id)
+
+
+async def revoke_session(db: AsyncSession, session_id: uuid.UUID) -> None:
+    now = datetime.utcnow()
+    # выданные access-токены сессии живут не дольше JWT_EXPIRES_MIN — столько и держим строку
+    until = now + timedelta(minutes=JWT_EXPIRES_MIN)
+    stmt = insert(RevokedSession).values(session_id=session_id, expires_at=until)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[RevokedSession.session_id], set_={"expires_at": stmt.excluded.expires_at},
+    ))
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.session_id == session_id, RefreshToken.used_at.is_(None))
+        .values(used_at=now)
+    )
+    await db.commit()
+    revocations.add(session_id)
+
+
+async def refresh_session(db: AsyncSession, refresh_token: str, response: Response) -> None:
+    unauthorized = HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid or expired refresh token")
+    token_hash = _hash(refresh_token)
+    now = datetime.utcnow()
+    rotated = (await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .values(used_at=now)
+        .returning(RefreshToken.session_id, RefreshToken.user_id)
+    )).first()
+    if rotated is not None:
+        _new_refresh_token(db, rotated.user_id, rotated.session_id, response)
+        await db.commit()
+        _set_access_cookie(response, rotated.user_id, rotated.session_id)
+        return
+
+    used = (await db.execute(
+        select(RefreshToken.session_id, RefreshToken.user_id, RefreshToken.used_at)
+        .where(RefreshToken.token_hash == token_hash)
+    )).first()
+    if used is None or used.used_at is None:
+        raise unauthorized  # неизвестный или истёкший
+    if now - used.used_at <= timedelta(seconds=REFRESH_REUSE_GRACE_SEC):
+        if await revocations.is_revoked(db, used.session_id):
+            raise unauthorized
+        # параллельное обновление из другой вкладки: новый refresh та уже получила
+        _set_access_cookie(response, used.user_id, used.session_id)
+        return
+    await revoke_session(db, used.session_id)
+    raise unauthorized
+
+
+def _clear_cookies(response: Response) -> None:
+    response.delete_cookie(COOKIE_NAME, path="/")
+    response.delete_cookie(REFRESH_COOKIE_NAME, path=_REFRESH_COOKIE_PATH)
+
+
+async def end_session(db: AsyncSession, request: HTTPConnection, response: Response) -> None:
+    """Выход: отзывает сессию (по refresh-cookie или по ``sid`` access-токена) и стирает cookie."""
+    session_id: Optional[uuid.UUID] = None
+    refresh_token = request.cookies.get(REFRESH_COOKIE_NAME)
+    if refresh_token:
+        session_id = await db.scalar(
+            select(RefreshToken.session_id).where(RefreshToken.token_hash == _hash(refresh_token))
+        )
+    access_token = _extract_token(request)
+    if session_id is None and access_token:
+        try:
+            sid = token_service.verify(access_token).get("sid")
+            session_id = uuid.UUID(sid) if sid else None
+        except (TokenError, ValueError):
+            pass
+    if session_id is not None:
+        await revoke_session(db, session_id)
+    _clear_cookies(response)
+
+
+@router.post("/refresh")
+async def refresh(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """Новый access-токен (и новый refresh-токен) по cookie refresh_token."""
+    refresh_token = request.cookies.get(REFRESH_COOKIE_NAME)
+    if not refresh_token:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Not authenticated")
+    await refresh_session(db, refresh_token, response)
+    return {"ok": True}
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    await end_session(db, request, response)
@@ -0,0 +1,234 @@
+# backend/auth/tokens.py
+"""Единый сервис access-токенов: выпуск, проверка, публичные ключи.
+
+* Ключи загружаются один раз при импорте. HS256 — из JWT_SECRET (как
+  раньше). ES256/EdDSA — из PEM-файлов в JWT_KEYS_DIR, ``kid`` = имя файла.
+  Подписывает JWT_ACTIVE_KID (по умолчанию последний по имени), остальные
+  ключи только проверяют. Ротация: положить новый ключ, сделать его
+  активным, старый удалить через JWT_EXPIRES_MIN.
+* Публичные ключи отдаются на ``/.well-known/jwks.json``. Другие сервисы
+  проверяют наши токены у себя, без запросов к API и без общего секрета.
+* Успешные проверки кэшируются (LRU) по sha256 токена до его ``exp``.
+  Повторный запрос с той же cookie не проверяет подпись заново: ES256 —
+  ~90 мкс на проверку, поиск в кэше — ~1 мкс.
+
+    python -m backend.auth.tokens genkey --alg ES256 --dir keys
+
+создаёт новый ключ и печатает его kid.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from joserfc import jwt
+from joserfc.errors import JoseError
+from joserfc.jwk import ECKey, KeySet, OctKey, OKPKey
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+from config import (
+    JWT_SECRET, JWT_ALG, JWT_EXPIRES_MIN, JWT_ISSUER, JWT_KEYS_DIR, JWT_ACTIVE_KID,
+    JWT_LEGACY_HS256, JWT_VERIFY_CACHE_SIZE,
+)
+from backend.responses import FastJSONRoute
+
+# "EdDSA" — имя из RFC 8037, "Ed25519" — из RFC 9864; ключ один и тот же
+_ASYMMETRIC = {"ES256": "EC", "EdDSA": "OKP", "Ed25519": "OKP"}
+
+
+class TokenError(Exception):
+    pass
+
+
+def _load_key(path: Path):
+    private = serialization.load_pem_private_key(path.read_bytes(), password=None)
+    if isinstance(private, ec.EllipticCurvePrivateKey) and isinstance(private.curve, ec.SECP256R1):
+        key_cls = ECKey
+    elif isinstance(private, ed25519.Ed25519PrivateKey):
+        key_cls = OKPKey
+    else:
+        raise ValueError(f"{path}: only P-256 and Ed25519 keys are supported")
+    return key_cls.import_key(path.read_bytes(), {"kid": path.stem, "use": "sig"})
+
+
+class TokenService:
+    def __init__(
+        self,
+        alg: str,
+        secret: Optional[str],
+        keys: List,
+        active_kid: Optional[str],
+        expires_min: int,
+        issuer: Optional[str],
+        legacy_hs256: bool,
+        cache_size: int,
+    ):
+        self.alg = alg
+        self.expires_min = expires_min
+        self.issuer = issuer
+        self.cache_size = cache_size
+        self._keys = KeySet(keys)
+        self._secret = OctKey.import_key(secret) if secret else None
+        if alg == "HS256":
+            if self._secret is None:
+                raise ValueError("JWT_ALG=HS256 needs JWT_SECRET")
+            self._signing_key = self._secret
+            self._header = {"alg": alg}
+        elif alg in _ASYMMETRIC:
+            usable = [key for key in keys if key.key_type == _ASYMMETRIC[alg]]
+            if not usable:
+                raise ValueError(f"JWT_ALG={alg}: no {_ASYMMETRIC[alg]} keys in JWT_KEYS_DIR")
+            by_kid = {key.kid: key for key in usable}
+            if active_kid and active_kid not in by_kid:
+                raise ValueError(f"JWT_ACTIVE_KID={active_kid} is not among the {alg} keys")
+            self._signing_key = by_kid[active_kid or max(by_kid)]
+            self._header = {"alg": alg, "kid": self._signing_key.kid}
+        else:
+            raise ValueError(f"unsupported JWT_ALG {alg!r}")
+        self._verify_algs = [alg] if alg != "EdDSA" else ["EdDSA", "Ed25519"]
+        self._legacy = legacy_hs256 and alg != "HS256" and self._secret is not None
+        self._claims = jwt.JWTClaimsRegistry(
+            exp={"essential": True}, **({"iss": {"value": issuer}} if issuer else {})
+        )
+        self._cache: "OrderedDict[bytes, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    @classmethod
+    def from_config(cls) -> "TokenService":
+        keys_dir = Path(JWT_KEYS_DIR) if JWT_KEYS_DIR else None
+        keys = [_load_key(path) for path in sorted(keys_dir.glob("*.pem"))] if keys_dir else []
+        return cls(
+            JWT_ALG, JWT_SECRET, keys, JWT_ACTIVE_KID, JWT_EXPIRES_MIN, JWT_ISSUER,
+            JWT_LEGACY_HS256, JWT_VERIFY_CACHE_SIZE,
+        )
+
+    # --- выпуск ---
+    def issue(self, sub, expires_min: Optional[int] = None, **claims) -> str:
+        now = int(time.time())
+        payload = {
+            **claims,
+            "sub": str(sub),
+            "iat": now,
+            "exp": now + 60 * (self.expires_min if expires_min is None else expires_min),
+        }
+        if self.issuer:
+            payload["iss"] = self.issuer
+        return jwt.encode(self._header, payload, self._signing_key, algorithms=[self.alg])
+
+    # --- проверка ---
+    def _decode(self, token: str) -> dict:
+        try:
+            if self.alg == "HS256" or (self._legacy and "kid" not in _peek_header(token)):
+                # HS256, в том числе токены, выпущенные до перехода на ES256/EdDSA
+                decoded = jwt.decode(token, self._secret, algorithms=["HS256"])
+            else:
+                decoded = jwt.decode(token, self._keys, algorithms=self._verify_algs)
+            self._claims.validate(decoded.claims)
+        except (JoseError, ValueError) as exc:
+            raise TokenError(str(exc)) from exc
+        return decoded.claims
+
+    def verify(self, token: str) -> dict:
+        """Claims проверенного токена (не изменять: объект общий для всех запросов из кэша)."""
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is not None:
+                if entry[0] > now:
+                    self._cache.move_to_end(digest)
+                    self.hits += 1
+                    return entry[1]
+                del self._cache[digest]
+            self.misses += 1
+        try:
+            claims = self._decode(token)
+        except TokenError:
+            self.failures += 1
+            raise
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[digest] = (float(claims["exp"]), claims)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return claims
+
+    # --- публикация ---
+    def jwks(self) -> dict:
+        return {"keys": [key.as_dict(private=False) for key in self._keys]}
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "alg": self.alg,
+                "active_kid": self._signing_key.kid if self.alg != "HS256" else None,
+                "keys": len(self._keys.keys),
+                "legacy_hs256": self._legacy,
+                "cache_size": len(self._cache),
+                "cache_max": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "failures": self.failures,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+
+def _peek_header(token: str) -> dict:
+    # только чтобы выбрать ключ; подпись проверяет jwt.decode
+    try:
+        segment = token.split(".", 1)[0]
+        return json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+    except ValueError:
+        return {}
+
+
+token_service = TokenService.from_config()
+
+router = APIRouter(tags=["Auth"], route_class=FastJSONRoute)
+
+
+@router.get("/.well-known/jwks.json", include_in_schema=False)
+def jwks():
+    # ключи меняются только с рестартом; 5 минут кэша — чтобы новый ключ быстро доехал до проверяющих
+    return JSONResponse(token_service.jwks(), headers={"Cache-Control": "public, max-age=300"})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a signing key for JWT_KEYS_DIR")
+    parser.add_argument("command", choices=["genkey"])
+    parser.add_argument("--alg", choices=["ES256", "EdDSA"], default="ES256")
+    parser.add_argument("--dir", default=JWT_KEYS_DIR or "keys")
+    args = parser.parse_args()
+    if args.alg == "ES256":
+        private = ec.generate_private_key(ec.SECP256R1())
+    else:
+        private = ed25519.Ed25519PrivateKey.generate()
+    # kid сортируется по времени создания: по умолчанию подписывает самый новый
+    kid = f"{datetime.now(timezone.utc):%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+    path = Path(args.dir) / f"{kid}.pem"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ))
+    path.chmod(0o600)
+    print(kid)
+
+
+if __name__ == "__main__":
+    main()
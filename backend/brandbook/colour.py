@@ -0,0 +1,211 @@
+"""Vectorized colour maths for brand palettes.
+
+Every function works on whole palettes as ``(n, 3)`` NumPy arrays, and the
+pairwise metrics (WCAG contrast, CIEDE2000) are computed for all pairs at once
+by broadcasting, with no per-pair Python loops.
+
+Conventions: sRGB and linear RGB in ``[0, 1]``, CIE Lab with a D65 white
+point, OKLCH as ``(L, C, h°)``.
+"""
+from __future__ import annotations
+
+import re
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+_HEX_RE = re.compile(r"^#?([0-9a-fA-F]{3}|[0-9a-fA-F]{6})$")
+
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_D65 = np.array([0.95047, 1.0, 1.08883])
+_LAB_DELTA = 6 / 29
+
+_RGB_TO_LMS = np.array([
+    [0.4122214708, 0.5363325363, 0.0514459929],
+    [0.2119034982, 0.6806995451, 0.1073969566],
+    [0.0883024619, 0.2817188376, 0.6299787005],
+])
+_LMS_TO_OKLAB = np.array([
+    [0.2104542553, 0.7936177850, -0.0040720468],
+    [1.9779984951, -2.4285922050, 0.4505937099],
+    [0.0259040371, 0.7827717662, -0.8086757660],
+])
+_OKLAB_TO_LMS = np.linalg.inv(_LMS_TO_OKLAB)
+_LMS_TO_RGB = np.linalg.inv(_RGB_TO_LMS)
+
+
+class ColourParseError(ValueError):
+    def __init__(self, invalid: List[int]):
+        super().__init__(f"Invalid hex colours at positions {invalid}")
+        self.invalid = invalid
+
+
+# --- parsing / formatting ---
+
+def is_hex(colour: Optional[str]) -> bool:
+    return bool(colour) and _HEX_RE.match(colour.strip()) is not None
+
+
+def parse_hex(colours: Iterable[str]) -> np.ndarray:
+    """``['#ff0000', 'f00', ...]`` -> ``(n, 3)`` sRGB floats; raises ColourParseError."""
+    colours = list(colours)
+    invalid = [i for i, c in enumerate(colours) if not is_hex(c)]
+    if invalid:
+        raise ColourParseError(invalid)
+    digits = []
+    for c in colours:
+        h = c.strip().lstrip("#")
+        digits.append("".join(ch * 2 for ch in h) if len(h) == 3 else h)
+    if not digits:
+        return np.empty((0, 3))
+    packed = np.array([int(h, 16) for h in digits], dtype=np.uint32)
+    rgb = np.stack([(packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF], axis=-1)
+    return rgb / 255.0
+
+
+def to_rgb8(srgb: np.ndarray) -> np.ndarray:
+    return np.rint(np.clip(srgb, 0, 1) * 255).astype(np.uint8)
+
+
+def to_hex(srgb: np.ndarray) -> List[str]:
+    return [f"#{r:02x}{g:02x}{b:02x}" for r, g, b in to_rgb8(srgb).tolist()]
+
+
+# --- conversions ---
+
+def srgb_to_linear(srgb: np.ndarray) -> np.ndarray:
+    return np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(linear: np.ndarray) -> np.ndarray:
+    linear = np.clip(linear, 0, 1)
+    return np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+
+
+def srgb_to_lab(srgb: np.ndarray) -> np.ndarray:
+    xyz = srgb_to_linear(srgb) @ _RGB_TO_XYZ.T / _D65
+    f = np.where(xyz > _LAB_DELTA ** 3, np.cbrt(xyz), xyz / (3 * _LAB_DELTA ** 2) + 4 / 29)
+    return np.stack([
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+
+def linear_to_oklab(linear: np.ndarray) -> np.ndarray:
+    return np.cbrt(linear @ _RGB_TO_LMS.T) @ _LMS_TO_OKLAB.T
+
+
+def oklab_to_linear(oklab: np.ndarray) -> np.ndarray:
+    return ((oklab @ _OKLAB_TO_LMS.T) ** 3) @ _LMS_TO_RGB.T
+
+
+def srgb_to_oklch(srgb: np.ndarray) -> np.ndarray:
+    lab = linear_to_oklab(srgb_to_linear(srgb))
+    chroma = np.hypot(lab[..., 1], lab[..., 2])
+    hue = np.degrees(np.arctan2(lab[..., 2], lab[..., 1])) % 360
+    # greys have no meaningful hue; float noise would otherwise make one up
+    hue = np.where(chroma < 1e-4, 0.0, hue)
+    return np.stack([lab[..., 0], chroma, hue], axis=-1)
+
+
+# --- metrics ---
+
+def relative_luminance(srgb: np.ndarray) -> np.ndarray:
+    return srgb_to_linear(srgb) @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def contrast_matrix(srgb: np.ndarray) -> np.ndarray:
+    """WCAG 2.x contrast ratio for every pair: ``(n, n)`` in ``[1, 21]``."""
+    lum = relative_luminance(srgb)
+    hi = np.maximum(lum[:, None], lum[None, :])
+    lo = np.minimum(lum[:, None], lum[None, :])
+    return (hi + 0.05) / (lo + 0.05)
+
+
+def ciede2000(lab1: np.ndarray, lab2: np.ndarray) -> np.ndarray:
+    """CIEDE2000 distance between every row of ``lab1`` and every row of ``lab2``: ``(n, m)``."""
+    L1, a1, b1 = (lab1[:, None, i] for i in range(3))
+    L2, a2, b2 = (lab2[None, :, i] for i in range(3))
+
+    c_bar7 = ((np.hypot(a1, b1) + np.hypot(a2, b2)) / 2) ** 7
+    g = 0.5 * (1 - np.sqrt(c_bar7 / (c_bar7 + 25.0 ** 7)))
+    a1p, a2p = (1 + g) * a1, (1 + g) * a2
+    c1p, c2p = np.hypot(a1p, b1), np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+    achromatic = (c1p * c2p) == 0
+
+    d_l = L2 - L1
+    d_c = c2p - c1p
+    dh = h2p - h1p
+    dh = np.where(dh > 180, dh - 360, np.where(dh < -180, dh + 360, dh))
+    dh = np.where(achromatic, 0, dh)
+    d_h = 2 * np.sqrt(c1p * c2p) * np.sin(np.radians(dh / 2))
+
+    l_bar = (L1 + L2) / 2
+    c_bar_p = (c1p + c2p) / 2
+    h_sum = h1p + h2p
+    h_bar = np.where(
+        achromatic, h_sum,
+        np.where(np.abs(h1p - h2p) <= 180, h_sum / 2,
+                 np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2)),
+    )
+    t = (1 - 0.17 * np.cos(np.radians(h_bar - 30)) + 0.24 * np.cos(np.radians(2 * h_bar))
+         + 0.32 * np.cos(np.radians(3 * h_bar + 6)) - 0.20 * np.cos(np.radians(4 * h_bar - 63)))
+    d_theta = 30 * np.exp(-(((h_bar - 275) / 25) ** 2))
+    c_bar_p7 = c_bar_p ** 7
+    r_c = 2 * np.sqrt(c_bar_p7 / (c_bar_p7 + 25.0 ** 7))
+    s_l = 1 + 0.015 * (l_bar - 50) ** 2 / np.sqrt(20 + (l_bar - 50) ** 2)
+    s_c = 1 + 0.045 * c_bar_p
+    s_h = 1 + 0.015 * c_bar_p * t
+    r_t = -np.sin(np.radians(2 * d_theta)) * r_c
+
+    return np.sqrt(
+        (d_l / s_l) ** 2 + (d_c / s_c) ** 2 + (d_h / s_h) ** 2 + r_t * (d_c / s_c) * (d_h / s_h)
+    )
+
+
+# --- ramps ---
+
+def ramps(srgb: np.ndarray, steps: int) -> tuple[np.ndarray, np.ndarray]:
+    """Tints (towards white) and shades (towards black), interpolated in OKLab.
+
+    Returns two ``(n, steps, 3)`` sRGB arrays, lightest/darkest last.
+    """
+    oklab = linear_to_oklab(srgb_to_linear(srgb))[:, None, :]
+    weights = (np.arange(1, steps + 1) / (steps + 1))[None, :, None]
+    white = np.array([1.0, 0.0, 0.0])
+    tints = oklab + (white - oklab) * weights
+    shades = oklab * (1 - weights)
+    return linear_to_srgb(oklab_to_linear(tints)), linear_to_srgb(oklab_to_linear(shades))
+
+
+def analyze(hexes: List[str], ramp_steps: int = 0) -> dict:
+    """Everything the palette endpoints return, computed in one batch."""
+    srgb = parse_hex(hexes)
+    lab = srgb_to_lab(srgb)
+    result = {
+        "colours": [
+            {"hex": h, "rgb": rgb, "lab": lab_row, "oklch": oklch_row}
+            for h, rgb, lab_row, oklch_row in zip(
+                to_hex(srgb),
+                to_rgb8(srgb).tolist(),
+                np.round(lab, 3).tolist(),
+                np.round(srgb_to_oklch(srgb), 4).tolist(),
+            )
+        ],
+        "contrast": np.round(contrast_matrix(srgb), 2).tolist(),
+        "delta_e": np.round(ciede2000(lab, lab), 2).tolist(),
+        "tints": None,
+        "shades": None,
+    }
+    if ramp_steps:
+        tints, shades = ramps(srgb, ramp_steps)
+        result["tints"] = [to_hex(row) for row in tints]
+        result["shades"] = [to_hex(row) for row in shades]
+    return result
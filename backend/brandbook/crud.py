@@ -1,23 +1,203 @@
 from __future__ import annotations
 
-from . import models, schemas
-from typing import List, Optional
-from sqlalchemy.orm import Session
+import asyncio
+import base64
+import json
+import re
+import typing
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
 
+from . import json_patch, models, ordering, schemas
+from .live import hub as live_hub
+from .palette_index import palette_index
+from .response_cache import response_cache
+from backend.users.models import Section
+from typing import List, Optional, Tuple, Type
+from pydantic import BaseModel
+from sqlalchemy import exists, func, insert, inspect, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload, selectinload
 
-def create_brandbook(db: Session, owner_id: int, brandbook: schemas.BrandBookCreate) -> models.BrandBook:
-    db_obj = models.BrandBook(name=brandbook.name, description=brandbook.description, owner_id=owner_id)
+import database
+
+
+def _nested_schema(annotation) -> Optional[Type[BaseModel]]:
+    """Return the pydantic model inside ``X`` / ``List[X]`` / ``Optional[X]``, if any."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        nested = _nested_schema(arg)
+        if nested is not None:
+            return nested
+    return None
+
+
+@lru_cache(maxsize=None)
+def loader_options(schema: Optional[Type[BaseModel]], model, strategy=selectinload) -> tuple:
+    """Eager-load exactly the relationships that ``schema`` serializes.
+
+    ``strategy`` is used for the top-level relationships (``joinedload`` suits a
+    single row, ``selectinload`` keeps lists at one extra query per relationship);
+    nested relationships always use ``selectinload``. At most one collection is
+    joined, since joining several multiplies the rows. Every other relationship is
+    set to ``raiseload`` so a schema change that starts touching an unloaded
+    relationship fails loudly instead of silently issuing one query per row.
+    """
+    if schema is None:
+        return ()
+    relationships = inspect(model).relationships
+    options = []
+    joined_collection = False
+    for name, field in schema.model_fields.items():
+        if name not in relationships:
+            continue
+        relationship = relationships[name]
+        use = strategy
+        if strategy is joinedload and relationship.uselist:
+            use = selectinload if joined_collection else joinedload
+            joined_collection = True
+        option = use(getattr(model, name))
+        nested = _nested_schema(field.annotation)
+        if nested is not None:
+            option = option.options(*loader_options(nested, relationship.mapper.class_))
+        options.append(option)
+    options.append(raiseload("*"))
+    return tuple(options)
+
+
+def _make_slug(title: str) -> str:
+    base = re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-") or "brandbook"
+    return f"{base}-{uuid.uuid4().hex[:8]}"
+
+
+async def create_brandbook(db: AsyncSession, owner_id: uuid.UUID, brandbook: schemas.BrandBookCreate) -> models.Brandbook:
+    db_obj = models.Brandbook(
+        title=brandbook.title,
+        slug=brandbook.slug or _make_slug(brandbook.title),
+        user_id=owner_id,
+        items=[],  # новый брендбук пуст — items уже "загружены", ленивой подгрузки не будет
+    )
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    await commit_write(db, owner_id)
     return db_obj
 
 
-def get_brandbooks(db: Session, owner_id: int) -> List[models.BrandBook]:
-    return db.query(models.BrandBook).filter(models.BrandBook.owner_id == owner_id).all()
+def encode_cursor(brandbook: models.Brandbook) -> str:
+    raw = json.dumps([brandbook.created_at.isoformat(), str(brandbook.id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Inverse of :func:`encode_cursor`; raises ``ValueError`` on garbage."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, brandbook_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), uuid.UUID(brandbook_id)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # timestamps are stored as naive UTC (datetime.utcnow)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+async def get_brandbooks(
+    db: AsyncSession,
+    owner_id: uuid.UUID,
+    schema: Optional[Type[BaseModel]] = schemas.BrandBookRead,
+    *,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    title_prefix: Optional[str] = None,
+    item_type: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+) -> Tuple[List[models.Brandbook], Optional[str]]:
+    """Return one page of brand books, newest first, and the cursor of the next page.
+
+    Keyset pagination on ``(created_at, id)``: the cost of a page does not depend
+    on how deep into the list it is.
+    """
+    Brandbook = models.Brandbook
+    stmt = select(Brandbook).where(Brandbook.user_id == owner_id)
+    if cursor:
+        created_at, brandbook_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Brandbook.created_at, Brandbook.id) < tuple_(created_at, brandbook_id))
+    if title_prefix:
+        stmt = stmt.where(Brandbook.title.startswith(title_prefix, autoescape=True))
+    if item_type:
+        stmt = stmt.where(
+            exists().where(models.BrandItem.brandbook_id == Brandbook.id, models.BrandItem.type == item_type)
+        )
+    if updated_since:
+        stmt = stmt.where(Brandbook.updated_at >= _naive_utc(updated_since))
+
+    # selectin: one extra query per relationship, regardless of how many brand books
+    result = await db.execute(
+        stmt.order_by(Brandbook.created_at.desc(), Brandbook.id.desc())
+        .limit(limit + 1)
+        .options(*loader_options(schema, Brandbook, selectinload))
+    )
+    rows = list(result.scalars().all())
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+async def touch_brandbook(db: AsyncSession, brandbook_id: uuid.UUID) -> Optional[uuid.UUID]:
+    """Bump ``updated_at`` after a change to a child row; returns the owner's ID.
+
+    ``updated_at`` is the brand book's version: ETags, the response cache and the
+    export cache are keyed by it, so every write to items, sections or files
+    must call this and then :func:`commit_write`.
+    """
+    result = await db.execute(
+        update(models.Brandbook)
+        .where(models.Brandbook.id == brandbook_id)
+        .values(updated_at=datetime.utcnow())
+        .returning(models.Brandbook.user_id)
+    )
+    return result.scalars().first()
+
+
+async def commit_write(db: AsyncSession, owner_id: Optional[uuid.UUID]) -> None:
+    """Commit, then drop the owner's cached brand book lists.
+
+    Invalidating only after the commit matters: a read racing the write must
+    not cache pre-commit data under the new generation.
+    """
+    await db.commit()
+    if owner_id is not None:
+        await response_cache.invalidate_user(owner_id)
 
 
-def create_item(db: Session, brandbook_id: int, item: schemas.BrandItemCreate) -> models.BrandItem:
+async def get_brandbook_version(
+    db: AsyncSession, owner_id: uuid.UUID, brandbook_id: uuid.UUID
+) -> Optional[datetime]:
+    """``updated_at`` of an owned brand book (one indexed lookup, no children); None if not found."""
+    result = await db.execute(
+        select(func.coalesce(models.Brandbook.updated_at, models.Brandbook.created_at))
+        .where(models.Brandbook.id == brandbook_id, models.Brandbook.user_id == owner_id)
+    )
+    return result.scalars().first()
+
+
+async def get_brandbook_slug_version(
+    db: AsyncSession, owner_id: uuid.UUID, brandbook_id: uuid.UUID
+) -> Optional[Tuple[str, datetime]]:
+    """``(slug, updated_at)`` of an owned brand book, same lookup as :func:`get_brandbook_version`."""
+    result = await db.execute(
+        select(models.Brandbook.slug, func.coalesce(models.Brandbook.updated_at, models.Brandbook.created_at))
+        .where(models.Brandbook.id == brandbook_id, models.Brandbook.user_id == owner_id)
+    )
+    row = result.first()
+    return tuple(row) if row is not None else None
+
+
+async def create_item(db: AsyncSession, brandbook_id: uuid.UUID, item: schemas.BrandItemCreate) -> models.BrandItem:
     db_item = models.BrandItem(
         brandbook_id=brandbook_id,
         type=item.type,
@@ -26,10 +206,235 @@ def create_item(db: Session, brandbook_id: int, item: schemas.BrandItemCreate) -
         colour=item.colour,
     )
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    owner_id = await touch_brandbook(db, brandbook_id)
+    await commit_write(db, owner_id)
+    await db.refresh(db_item)
+    if db_item.colour:
+        palette_index.add([(db_item.id, brandbook_id, db_item.colour)])
+    live_hub.publish(brandbook_id, {"type": "item.created", "item": schemas.BrandItemRead.model_validate(db_item)})
     return db_item
 
 
-def get_brandbook(db: Session, owner_id: int, brandbook_id: int) -> Optional[models.BrandBook]:
-    return db.query(models.BrandBook).filter(models.BrandBook.id == brandbook_id, models.BrandBook.owner_id == owner_id).first()
\ No newline at end of file
+async def create_items_bulk(
+    db: AsyncSession, brandbook_id: uuid.UUID, items: List[schemas.BrandItemCreate]
+) -> List[int]:
+    """Insert many items in one transaction; returns their IDs in input order."""
+    if not items:
+        return []
+    rows = [{"brandbook_id": brandbook_id, **item.model_dump()} for item in items]
+    # executemany + RETURNING: SQLAlchemy batches this into multi-row INSERT ... VALUES
+    result = await db.execute(
+        insert(models.BrandItem).returning(models.BrandItem.id, sort_by_parameter_order=True),
+        rows,
+    )
+    ids = list(result.scalars().all())
+    owner_id = await touch_brandbook(db, brandbook_id)
+    await commit_write(db, owner_id)
+    live_hub.publish(brandbook_id, {"type": "items.created", "ids": ids})
+    await asyncio.get_running_loop().run_in_executor(None, palette_index.add, [
+        (item_id, brandbook_id, item.colour) for item_id, item in zip(ids, items) if item.colour
+    ])
+    return ids
+
+
+async def create_section(db: AsyncSession, brandbook_id: uuid.UUID, section: schemas.SectionCreate) -> Section:
+    """Append a section at the end of the brand book."""
+    # touching first locks the brand book row: section writes of one brand book
+    # take turns, so two of them never pick keys from the same neighbours
+    owner_id = await touch_brandbook(db, brandbook_id)
+    last_key = (await db.execute(
+        select(Section.order_key)
+        .where(Section.brandbook_id == brandbook_id)
+        .order_by(Section.order_key.desc())
+        .limit(1)
+    )).scalar()
+    db_section = Section(
+        brandbook_id=brandbook_id,
+        type=section.type,
+        content=section.content,
+        order_key=ordering.key_between(last_key, None),
+    )
+    db.add(db_section)
+    await commit_write(db, owner_id)
+    live_hub.publish(brandbook_id, {"type": "section.created", "section": schemas.SectionRead.model_validate(db_section)})
+    return db_section
+
+
+async def get_sections(db: AsyncSession, brandbook_id: uuid.UUID) -> List[Section]:
+    """A brand book's sections in order (an index scan on ``(brandbook_id, order_key)``)."""
+    result = await db.execute(
+        select(Section).where(Section.brandbook_id == brandbook_id).order_by(Section.order_key)
+    )
+    return list(result.scalars().all())
+
+
+async def move_section(
+    db: AsyncSession,
+    brandbook_id: uuid.UUID,
+    section_id: uuid.UUID,
+    after: Optional[uuid.UUID] = None,
+    before: Optional[uuid.UUID] = None,
+) -> Optional[Section]:
+    """Put a section right after ``after``, right before ``before``, or first.
+
+    Only the moved row is written: its new key is picked between the two keys
+    it lands between. Returns None if the section does not exist; raises
+    ``LookupError`` if the anchor is not a sibling section.
+    """
+    owner_id = await touch_brandbook(db, brandbook_id)
+    siblings = (Section.brandbook_id == brandbook_id, Section.id != section_id)
+    anchor_id = after or before
+    if anchor_id is not None:
+        anchor = select(Section.order_key).where(*siblings, Section.id == anchor_id).scalar_subquery()
+        if after is not None:
+            neighbour = select(func.min(Section.order_key)).where(*siblings, Section.order_key > anchor)
+            keys = select(anchor, neighbour.scalar_subquery())
+        else:
+            neighbour = select(func.max(Section.order_key)).where(*siblings, Section.order_key < anchor)
+            keys = select(neighbour.scalar_subquery(), anchor)
+        low, high = (await db.execute(keys)).one()
+        if (low if after is not None else high) is None:
+            await db.rollback()
+            raise LookupError(anchor_id)
+    else:
+        low, high = None, (await db.execute(select(func.min(Section.order_key)).where(*siblings))).scalar()
+
+    result = await db.execute(
+        update(Section)
+        .where(Section.id == section_id, Section.brandbook_id == brandbook_id)
+        .values(order_key=ordering.key_between(low, high))
+        .returning(Section)
+    )
+    moved = result.scalars().first()
+    if moved is None:
+        await db.rollback()
+        return None
+    await commit_write(db, owner_id)
+    live_hub.publish(brandbook_id, {"type": "section.moved", "id": moved.id, "order_key": moved.order_key})
+    return moved
+
+
+async def rebalance_sections(db: AsyncSession, brandbook_id: uuid.UUID) -> int:
+    """Rewrite a brand book's section keys evenly spaced and short; returns how many."""
+    owner_id = await touch_brandbook(db, brandbook_id)
+    ids = (await db.execute(
+        select(Section.id).where(Section.brandbook_id == brandbook_id).order_by(Section.order_key, Section.id)
+    )).scalars().all()
+    keys = dict(zip(ids, ordering.evenly_spaced(len(ids))))
+    if keys:
+        await db.execute(update(Section), [{"id": section_id, "order_key": key} for section_id, key in keys.items()])
+    await commit_write(db, owner_id)
+    live_hub.publish(brandbook_id, {
+        "type": "sections.rekeyed", "order_keys": {str(section_id): key for section_id, key in keys.items()},
+    })
+    return len(ids)
+
+
+async def rebalance_sections_task(brandbook_id: uuid.UUID) -> None:
+    """Background variant of :func:`rebalance_sections` with its own session."""
+    async with database.AsyncSessionLocal() as db:
+        await rebalance_sections(db, brandbook_id)
+
+
+async def get_section(
+    db: AsyncSession, owner_id: uuid.UUID, brandbook_id: uuid.UUID, section_id: uuid.UUID
+) -> Optional[Section]:
+    result = await db.execute(
+        select(Section)
+        .join(models.Brandbook, models.Brandbook.id == Section.brandbook_id)
+        .where(
+            Section.id == section_id,
+            Section.brandbook_id == brandbook_id,
+            models.Brandbook.user_id == owner_id,
+        )
+    )
+    return result.scalars().first()
+
+
+async def patch_section(
+    db: AsyncSession,
+    owner_id: uuid.UUID,
+    brandbook_id: uuid.UUID,
+    section_id: uuid.UUID,
+    operations: List[schemas.JsonPatchOperation],
+) -> bool:
+    """Apply a JSON Patch to a section's content in the database; False if not found.
+
+    Raises ``json_patch.JsonPatchError`` for a malformed patch and
+    ``json_patch.JsonPatchConflict`` when an operation does not apply, in which
+    case nothing is written.
+    """
+    stmt = json_patch.patch_statement(owner_id, brandbook_id, section_id, operations)
+    # brand book row first, then the section: the lock order of every other section writer
+    if await touch_brandbook(db, brandbook_id) != owner_id:
+        await db.rollback()
+        return False
+    row = (await db.execute(stmt)).first()
+    if row is None or row.failed is not None:
+        await db.rollback()
+        if row is None:
+            return False
+        raise json_patch.JsonPatchConflict(row.failed, "does not apply to the current document")
+    await commit_write(db, owner_id)
+    # the patch itself is the event: clients apply it to their copy
+    live_hub.publish(brandbook_id, {
+        "type": "section.patched",
+        "id": section_id,
+        "patch": [op.model_dump(mode="json", by_alias=True, exclude_unset=True) for op in operations],
+    })
+    return True
+
+
+async def get_brandbook(
+    db: AsyncSession,
+    owner_id: uuid.UUID,
+    brandbook_id: uuid.UUID,
+    schema: Optional[Type[BaseModel]] = schemas.BrandBookRead,
+) -> Optional[models.Brandbook]:
+    """Fetch one brand book; pass ``schema=None`` when only ownership matters."""
+    # joined: a single row, so the whole brand book comes back in one round trip
+    result = await db.execute(
+        select(models.Brandbook)
+        .where(models.Brandbook.id == brandbook_id, models.Brandbook.user_id == owner_id)
+        .options(*loader_options(schema, models.Brandbook, joinedload))
+    )
+    return result.unique().scalars().first()
+
+
+async def get_palette(db: AsyncSession, brandbook_id: uuid.UUID) -> List[str]:
+    """Colours of a brand book's items, in insertion order."""
+    result = await db.execute(
+        select(models.BrandItem.colour)
+        .where(models.BrandItem.brandbook_id == brandbook_id, models.BrandItem.colour.is_not(None))
+        .order_by(models.BrandItem.id)
+    )
+    return list(result.scalars().all())
+
+
+_palette_refresh_lock = asyncio.Lock()
+
+
+async def refresh_palette_index(db: AsyncSession) -> None:
+    """Load colours added since the last few refreshes (all of them the first time) into the index."""
+    if not palette_index.needs_refresh():
+        return
+    async with _palette_refresh_lock:
+        if not palette_index.needs_refresh():
+            return
+        result = await db.execute(
+            select(models.BrandItem.id, models.BrandItem.brandbook_id, models.BrandItem.colour)
+            .where(models.BrandItem.id > palette_index.scan_from, models.BrandItem.colour.is_not(None))
+            .order_by(models.BrandItem.id)
+        )
+        rows = [tuple(row) for row in result.all()]
+        await asyncio.get_running_loop().run_in_executor(None, palette_index.add, rows)
+        palette_index.mark_refreshed(rows)
+
+
+async def get_brandbook_titles(db: AsyncSession, owner_id: uuid.UUID) -> dict:
+    """``{id: (title, slug)}`` of every brand book the owner has."""
+    result = await db.execute(
+        select(models.Brandbook.id, models.Brandbook.title, models.Brandbook.slug)
+        .where(models.Brandbook.user_id == owner_id)
+    )
+    return {row.id: (row.title, row.slug) for row in result}
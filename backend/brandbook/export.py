@@ -0,0 +1,333 @@
+"""Whole-brand-book export to ZIP and PDF.
+
+Exports are produced in a worker thread and handed to the response chunk by
+chunk through a small bounded queue, so neither the archive nor the PDF is
+ever held in memory and a slow client simply pauses the producer. While a
+response streams, the same bytes are written to a cache file keyed by the
+brand book's ``updated_at``; later downloads of an unchanged brand book are
+served straight from disk.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+import textwrap
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Callable, Optional
+from urllib.parse import quote
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from config import UPLOAD_ROOT, EXPORT_PDF_FONT, EXPORT_POOL_WORKERS
+from backend.files.storage import blob_store
+from .pdf import PAGE_HEIGHT_PT, PAGE_WIDTH_PT, StreamingPdfWriter
+
+log = logging.getLogger(__name__)
+
+EXPORT_ROOT = Path(UPLOAD_ROOT) / "exports"
+MEDIA_TYPES = {"zip": "application/zip", "pdf": "application/pdf"}
+
+_CHUNK = 64 * 1024
+_QUEUE_CHUNKS = 16
+_DPI_SCALE = 2  # pages are rendered at 144 dpi
+_MARGIN = 48 * _DPI_SCALE
+
+
+def cached_path(brandbook_id, version: datetime, fmt: str) -> Path:
+    """Cache file of an export of the brand book as of ``version`` (its ``updated_at``)."""
+    return EXPORT_ROOT / f"{brandbook_id}-{version:%Y%m%dT%H%M%S%f}.{fmt}"
+
+
+def _bundle_cached_path(bundle: dict, fmt: str) -> Path:
+    # keyed by what was actually loaded: a write may land between the version lookup and the load
+    version = datetime.fromisoformat(bundle.get("updated_at") or bundle["created_at"])
+    return cached_path(bundle["id"], version, fmt)
+
+
+def content_disposition(slug: str, fmt: str) -> str:
+    """``attachment`` header value for the export of a brand book with this slug.
+
+    Slugs are user-supplied: the plain ``filename`` gets an ASCII-only fallback
+    (no quotes, no control characters), the exact name goes to ``filename*``.
+    """
+    name = f"{slug}.{fmt}"
+    stem = re.sub(r"[^A-Za-z0-9._-]+", "_", slug).strip("_.") or "brandbook"
+    fallback = f"{stem}.{fmt}"
+    if fallback == name:
+        return f'attachment; filename="{name}"'
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(name, safe='')}"
+
+
+# --- PDF ---
+
+def _font(size: int):
+    try:
+        return ImageFont.truetype(EXPORT_PDF_FONT, size * _DPI_SCALE)
+    except OSError:
+        return ImageFont.load_default(size=size * _DPI_SCALE)
+
+
+class _PageComposer:
+    """Lays out blocks top to bottom and flushes full pages to the PDF writer."""
+
+    def __init__(self, writer: StreamingPdfWriter):
+        self.writer = writer
+        self.width = PAGE_WIDTH_PT * _DPI_SCALE
+        self.height = PAGE_HEIGHT_PT * _DPI_SCALE
+        self.fonts = {"title": _font(28), "heading": _font(16), "body": _font(10)}
+        self.page: Optional[Image.Image] = None
+        self.draw: Optional[ImageDraw.ImageDraw] = None
+        self.y = 0
+
+    def _new_page(self) -> None:
+        self.flush()
+        self.page = Image.new("RGB", (self.width, self.height), "white")
+        self.draw = ImageDraw.Draw(self.page)
+        self.y = _MARGIN
+
+    def _reserve(self, height: int) -> None:
+        if self.page is None or self.y + height > self.height - _MARGIN:
+            self._new_page()
+
+    def flush(self) -> None:
+        if self.page is not None:
+            self.writer.add_page(self.page)
+            self.page = self.draw = None
+
+    def text(self, text: str, style: str = "body", gap: int = 6) -> None:
+        font = self.fonts[style]
+        line_height = int(font.size * 1.35)
+        chars = max(20, int((self.width - 2 * _MARGIN) / (font.size * 0.55)))
+        for paragraph in str(text).splitlines() or [""]:
+            for line in textwrap.wrap(paragraph, chars) or [""]:
+                self._reserve(line_height)
+                self.draw.text((_MARGIN, self.y), line, fill="black", font=font)
+                self.y += line_height
+        self.y += gap * _DPI_SCALE
+
+    def swatch(self, colour: str, label: str) -> None:
+        try:
+            rgb = ImageColor.getrgb(colour)
+        except ValueError:
+            self.text(label)
+            return
+        size = 28 * _DPI_SCALE
+        self._reserve(size + 8 * _DPI_SCALE)
+        self.draw.rectangle((_MARGIN, self.y, _MARGIN + size, self.y + size), fill=rgb, outline="#cccccc")
+        self.draw.text((_MARGIN + size + 12 * _DPI_SCALE, self.y + size // 4), label,
+                       fill="black", font=self.fonts["body"])
+        self.y += size + 8 * _DPI_SCALE
+
+    def image(self, path: Path, max_height: int = 160) -> None:
+        try:
+            with Image.open(path) as im:
+                im.thumbnail((self.width - 2 * _MARGIN, max_height * _DPI_SCALE))
+                im = im.convert("RGBA")
+                self._reserve(im.height + 8 * _DPI_SCALE)
+                self.page.paste(im, (_MARGIN, self.y), im)
+                self.y += im.height + 8 * _DPI_SCALE
+        except (OSError, ValueError):
+            pass
+
+
+def _blob_path(digest: Optional[str]) -> Optional[Path]:
+    """Local file of a stored blob; None if there is no digest, no local path or no file."""
+    path = blob_store.local_path(digest) if digest else None
+    return path if path is not None and path.is_file() else None
+
+
+def build_pdf(bundle: dict, fp: BinaryIO) -> None:
+    writer = StreamingPdfWriter(fp)
+    page = _PageComposer(writer)
+
+    page.text(bundle["title"], "title", gap=12)
+    page.text(f"/{bundle['slug']}")
+
+    colours = [item for item in bundle["items"] if item.get("colour")]
+    if colours:
+        page.text("Colours", "heading")
+        for item in colours:
+            page.swatch(item["colour"], f"{item['colour']}  {item.get('name') or ''}".strip())
+
+    others = [item for item in bundle["items"] if not item.get("colour")]
+    if others:
+        page.text("Items", "heading")
+        for item in others:
+            page.text(f"[{item['type']}] {item.get('name') or ''} — {item['link']}")
+            path = _blob_path(_blob_digest(item["link"]))
+            if item["type"] == "logo" and path is not None:
+                page.image(path)
+
+    # sections arrive in order (Brandbook.sections is ordered by order_key)
+    for section in bundle.get("sections", []):
+        page.text(section["type"].capitalize(), "heading")
+        page.text(json.dumps(section["content"], ensure_ascii=False, indent=2))
+
+    files = bundle.get("files", [])
+    if files:
+        page.text("Files", "heading")
+        for f in files:
+            page.text(f"{f.get('label') or f['file_url']} ({f.get('file_type') or 'file'})")
+            path = _blob_path(f.get("content_hash"))
+            if path is not None and (f.get("content_type") or "").startswith("image/"):
+                page.image(path)
+
+    page.flush()
+    writer.close()
+
+
+# --- ZIP ---
+
+def _blob_digest(url: str) -> Optional[str]:
+    match = re.fullmatch(r"/files/blobs/([0-9a-f]{64})", url or "")
+    return match.group(1) if match else None
+
+
+def _dump(zf: zipfile.ZipFile, name: str, data) -> None:
+    zf.writestr(name, json.dumps(data, ensure_ascii=False, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+
+
+def build_zip(bundle: dict, fp: BinaryIO) -> None:
+    with zipfile.ZipFile(fp, "w", compression=zipfile.ZIP_STORED) as zf:
+        _dump(zf, "brandbook.json", bundle)
+        _dump(zf, "palette.json", [
+            {"name": item.get("name"), "colour": item["colour"]}
+            for item in bundle["items"] if item.get("colour")
+        ])
+        for position, section in enumerate(bundle.get("sections", []), start=1):
+            _dump(zf, f"sections/{position:03d}-{section['type']}.json", section)
+
+        seen = set()
+        for f in bundle.get("files", []):
+            digest = f.get("content_hash")
+            if not digest or digest in seen or not blob_store.exists(digest):
+                continue
+            seen.add(digest)
+            ext = mimetypes.guess_extension(f.get("content_type") or "") or ""
+            stem = re.sub(r"[^\w.-]+", "_", f.get("label") or digest[:12])
+            # blobs (images, PDFs) are already compressed
+            with zf.open(f"files/{stem}-{digest[:8]}{ext}", "w", force_zip64=True) as member, \
+                    blob_store.open(digest) as src:
+                for chunk in iter(lambda: src.read(_CHUNK), b""):
+                    member.write(chunk)
+
+        with zf.open("brandbook.pdf", "w", force_zip64=True) as member:
+            build_pdf(bundle, member)
+
+
+BUILDERS: dict[str, Callable[[dict, BinaryIO], None]] = {"zip": build_zip, "pdf": build_pdf}
+
+
+# --- streaming plumbing ---
+
+class _QueueWriter(io.RawIOBase):
+    """Blocking writer (worker thread) feeding an asyncio.Queue (event loop)."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self.loop = loop
+        self.queue = queue
+        self.cancelled = False
+        self.finished = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.cancelled or self.finished:
+            raise BrokenPipeError("export consumer went away")
+        # blocks while the queue is full: a slow client slows the producer down
+        asyncio.run_coroutine_threadsafe(self.queue.put(bytes(data)), self.loop).result()
+        return len(data)
+
+    def finish(self) -> None:
+        self.finished = True
+        if not self.cancelled:
+            asyncio.run_coroutine_threadsafe(self.queue.put(None), self.loop).result()
+
+
+class _TeeWriter(io.RawIOBase):
+    def __init__(self, *targets: BinaryIO):
+        self.targets = targets
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        for target in self.targets:
+            target.write(data)
+        return len(data)
+
+
+def _produce(bundle: dict, fmt: str, sink: _QueueWriter) -> None:
+    if sink.cancelled:
+        return  # the client left while this export was waiting for a pool thread
+    final = _bundle_cached_path(bundle, fmt)
+    final.parent.mkdir(parents=True, exist_ok=True)
+    tmp = final.with_name(f"{final.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with tmp.open("wb") as cache_file:
+            out = io.BufferedWriter(_TeeWriter(sink, cache_file), buffer_size=_CHUNK)
+            BUILDERS[fmt](bundle, out)
+            out.flush()
+        os.replace(tmp, final)
+        # older versions of this brand book's export are now useless
+        for stale in final.parent.glob(f"{bundle['id']}-*.{fmt}"):
+            if stale != final:
+                stale.unlink(missing_ok=True)
+    finally:
+        tmp.unlink(missing_ok=True)
+        sink.finish()
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=EXPORT_POOL_WORKERS, thread_name_prefix="export")
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _log_producer_failure(producer: asyncio.Future) -> None:
+    exc = None if producer.cancelled() else producer.exception()
+    # BrokenPipeError is the producer noticing the client went away
+    if exc is not None and not isinstance(exc, BrokenPipeError):
+        log.error("export: producer failed", exc_info=exc)
+
+
+async def stream_export(bundle: dict, fmt: str) -> AsyncIterator[bytes]:
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_CHUNKS)
+    sink = _QueueWriter(loop, queue)
+    producer = loop.run_in_executor(_get_pool(), _produce, bundle, fmt, sink)
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            yield chunk
+        await producer
+    finally:
+        # client disconnected (or we are done): unblock and stop the producer
+        sink.cancelled = True
+        while not queue.empty():
+            queue.get_nowait()
+        # a running producer fails its next write; its outcome is retrieved (and logged) when it ends
+        producer.add_done_callback(_log_producer_failure)
@@ -0,0 +1,219 @@
+"""RFC 6902 JSON Patch, applied to ``sections.content`` inside PostgreSQL.
+
+A patch compiles to one statement: a chain of CTEs, one per step, each
+deriving the next version of the document from the previous one with
+``jsonb_set`` / ``jsonb_insert`` / ``#-``, followed by an ``UPDATE`` that
+only runs when every step applied. The client sends the operations, the
+database rewrites the row; the document itself never travels.
+
+Every step also evaluates the RFC's preconditions (the target exists, the
+array index is in range, ``test`` matches). The first step that fails is
+reported by its operation index and the row is left untouched, so a patch
+applies atomically or not at all. The chain starts from the row locked
+``FOR UPDATE``, which serialises concurrent patches of the same section;
+callers lock the brand book row first, like every other section writer.
+"""
+from __future__ import annotations
+
+import json
+import re
+import uuid
+from functools import partial
+from typing import Any, Callable, List, Sequence, Tuple
+
+from sqlalchemy import Integer, Text, and_, bindparam, case, cast, false, func, literal, null, select, true, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+
+from backend.users.models import Brandbook, Section
+
+_INDEX_RE = re.compile(r"0|[1-9][0-9]*")
+
+
+class JsonPatchError(ValueError):
+    """A malformed patch; nothing was sent to the database."""
+
+    def __init__(self, index: int, message: str):
+        super().__init__(f"operation {index}: {message}")
+        self.index = index
+
+
+class JsonPatchConflict(JsonPatchError):
+    """A well-formed operation that does not apply to the current document."""
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    """RFC 6901: ``'/a~1b/0'`` -> ``['a/b', '0']``; ``''`` is the whole document."""
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise ValueError(f"JSON pointer must start with '/': {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+# --- SQL building blocks (``doc`` is a JSONB column of the previous step) ---
+
+def _path(tokens: Sequence[str]):
+    return bindparam(None, list(tokens), ARRAY(Text))
+
+
+def _value(value: Any):
+    return cast(bindparam(None, json.dumps(value), Text), JSONB)
+
+
+def _get(doc, tokens: Sequence[str]):
+    return doc.op("#>", return_type=JSONB)(_path(tokens)) if tokens else doc
+
+
+def _set(doc, tokens: Sequence[str], value, create: bool):
+    if not tokens:
+        return value
+    return func.jsonb_set(doc, _path(tokens), value, create, type_=JSONB)
+
+
+def _exists(doc, tokens: Sequence[str]):
+    if not tokens:
+        return true()
+    parent, token = _get(doc, tokens[:-1]), tokens[-1]
+    # jsonb's own lookups accept negative and out-of-range array indexes; RFC 6902 does not
+    in_array = literal(int(token)) < func.jsonb_array_length(parent) if _INDEX_RE.fullmatch(token) else false()
+    kind = func.jsonb_typeof(parent)
+    return case((kind == "object", parent.has_key(token)), (kind == "array", in_array), else_=false())
+
+
+def _add(doc, tokens: Sequence[str], value) -> Tuple[Any, Any]:
+    if not tokens:
+        return true(), value
+    parent_tokens, token = tokens[:-1], tokens[-1]
+    parent = _get(doc, parent_tokens)
+    if token == "-":
+        array_ok = true()
+        array_doc = _set(doc, parent_tokens, parent.op("||", return_type=JSONB)(func.jsonb_build_array(value)), False)
+    elif _INDEX_RE.fullmatch(token):
+        array_ok = literal(int(token)) <= func.jsonb_array_length(parent)
+        array_doc = func.jsonb_insert(doc, _path(tokens), value, type_=JSONB)
+    else:
+        array_ok, array_doc = false(), doc
+    kind = func.jsonb_typeof(parent)
+    ok = case((kind == "object", true()), (kind == "array", array_ok), else_=false())
+    return ok, case((kind == "array", array_doc), else_=func.jsonb_set(doc, _path(tokens), value, True, type_=JSONB))
+
+
+# --- steps: (doc, carry) -> (ok, new doc, new carry) ---
+
+def _add_step(path, value, doc, carry):
+    return (*_add(doc, path, value), carry)
+
+
+def _add_carried_step(path, doc, carry):
+    return (*_add(doc, path, carry), carry)
+
+
+def _remove_step(path, doc, carry):
+    return _exists(doc, path), doc.op("#-", return_type=JSONB)(_path(path)), carry
+
+
+def _replace_step(path, value, doc, carry):
+    return _exists(doc, path), _set(doc, path, value, False), carry
+
+
+def _test_step(path, value, doc, carry):
+    return and_(_exists(doc, path), _get(doc, path) == value), doc, carry
+
+
+def _test_exists_step(path, doc, carry):
+    return _exists(doc, path), doc, carry
+
+
+def _take_step(path, doc, carry):
+    """First half of ``move``: cut the value out and carry it to the next step."""
+    return _exists(doc, path), doc.op("#-", return_type=JSONB)(_path(path)), _get(doc, path)
+
+
+def _pick_step(path, doc, carry):
+    """First half of ``copy``: carry the value to the next step."""
+    return _exists(doc, path), doc, _get(doc, path)
+
+
+def _steps(operations: Sequence) -> List[Tuple[int, Callable]]:
+    """``(operation index, step)`` pairs; move and copy take two steps."""
+    steps: List[Tuple[int, Callable]] = []
+    for index, operation in enumerate(operations):
+        op = operation.op
+        try:
+            path = parse_pointer(operation.path)
+            source = parse_pointer(operation.from_) if operation.from_ is not None else None
+        except ValueError as exc:
+            raise JsonPatchError(index, str(exc))
+        if op in ("add", "replace", "test") and "value" not in operation.model_fields_set:
+            raise JsonPatchError(index, f"'{op}' needs a value")
+        if op in ("move", "copy") and source is None:
+            raise JsonPatchError(index, f"'{op}' needs 'from'")
+
+        if op == "add":
+            steps.append((index, partial(_add_step, path, _value(operation.value))))
+        elif op == "remove":
+            if not path:
+                raise JsonPatchError(index, "cannot remove the whole document")
+            steps.append((index, partial(_remove_step, path)))
+        elif op == "replace":
+            steps.append((index, partial(_replace_step, path, _value(operation.value))))
+        elif op == "test":
+            steps.append((index, partial(_test_step, path, _value(operation.value))))
+        elif op == "move":
+            if len(path) > len(source) and path[:len(source)] == source:
+                raise JsonPatchError(index, "cannot move a value into one of its own children")
+            if path == source:
+                steps.append((index, partial(_test_exists_step, path)))
+            else:
+                steps.append((index, partial(_take_step, source)))
+                steps.append((index, partial(_add_carried_step, path)))
+        elif op == "copy":
+            steps.append((index, partial(_pick_step, source)))
+            steps.append((index, partial(_add_carried_step, path)))
+        else:
+            raise JsonPatchError(index, f"unknown operation {op!r}")
+    return steps
+
+
+def patch_statement(owner_id: uuid.UUID, brandbook_id: uuid.UUID, section_id: uuid.UUID, operations: Sequence):
+    """One statement applying ``operations`` to the section's content.
+
+    The statement returns no row when the section does not exist (or is not
+    the owner's), otherwise ``(failed, updated)``: the index of the first
+    operation that did not apply (None if all did) and the number of rows
+    written. Raises JsonPatchError for a malformed patch.
+    """
+    steps = _steps(operations)
+
+    current = (
+        select(
+            Section.id.label("id"),
+            Section.content.label("doc"),
+            cast(null(), JSONB).label("carry"),
+            cast(null(), Integer).label("failed"),
+        )
+        .join(Brandbook, Brandbook.id == Section.brandbook_id)
+        .where(Section.id == section_id, Section.brandbook_id == brandbook_id, Brandbook.user_id == owner_id)
+        .with_for_update(of=Section)
+        .cte("step_0")
+    )
+    # MATERIALIZED: every step reads ``doc`` several times, and an inlined chain
+    # would repeat the previous step's expression at each reference
+    for number, (index, step) in enumerate(steps, start=1):
+        ok, new_doc, carry = step(current.c.doc, current.c.carry)
+        applies = and_(current.c.failed.is_(None), ok)
+        current = select(
+            current.c.id,
+            case((applies, new_doc), else_=current.c.doc).label("doc"),
+            carry.label("carry"),
+            case((current.c.failed.is_(None) & ~ok, literal(index)), else_=current.c.failed).label("failed"),
+        ).cte(f"step_{number}").prefix_with("MATERIALIZED")
+
+    written = (
+        update(Section)
+        .where(Section.id == current.c.id, current.c.failed.is_(None))
+        .values(content=current.c.doc)
+        .returning(Section.id)
+        .cte("written")
+    )
+    return select(current.c.failed, select(func.count()).select_from(written).scalar_subquery().label("updated"))
@@ -0,0 +1,299 @@
+"""Live brand book updates over WebSocket (``/brandbooks/{id}/live``).
+
+Writes publish change events to the brand book's channel once they have
+committed. A ticker flushes every channel with pending events each
+LIVE_TICK_MS: the burst of edits since the last tick becomes one frame,
+encoded once and handed to every subscriber of the channel.
+
+Each subscriber has a bounded queue of frames and its own sender task, so a
+slow client never delays the others. When a subscriber's queue is full, its
+backlog is replaced by a single ``resync`` frame, which tells the client to
+reload the brand book. Memory per client therefore stays bounded however far
+it falls behind.
+
+Channels live in this process. With LIVE_BUS=redis, each tick's events are
+also published to ``live:<brand book id>`` and every worker subscribes to the
+channels its clients watch, so collaborators connected to different workers
+see each other's edits. After the bus reconnects, every local channel gets a
+``resync``: whatever was published meanwhile is lost. With the local bus a
+client only sees the writes handled by its own worker.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Set
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from config import LIVE_BUS, LIVE_CLIENT_MAX_FRAMES, LIVE_FRAME_MAX_EVENTS, LIVE_TICK_MS, REDIS_URL
+from backend.responses import dumps
+from .response_cache import RedisBackend, RedisError
+
+log = logging.getLogger(__name__)
+
+RESYNC = {"type": "resync"}
+
+
+class Subscriber:
+    def __init__(self, brandbook_id: uuid.UUID, websocket: WebSocket, max_frames: int):
+        self.brandbook_id = brandbook_id
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(max_frames)
+
+    def offer(self, frame: str) -> bool:
+        """Queue a frame; when the queue is full, swap the backlog for a resync frame."""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(dumps({"brandbook_id": self.brandbook_id, "events": [RESYNC]}).decode())
+            return False
+
+    async def _send(self) -> None:
+        try:
+            while True:
+                await self.websocket.send_text(await self.queue.get())
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            pass  # the receive loop sees the disconnect too
+
+    async def serve(self, hello: dict) -> None:
+        """Send ``hello``, then queued frames, until the client disconnects.
+
+        Messages from the client are read (and ignored) only to notice the disconnect.
+        """
+        await self.websocket.send_text(dumps(hello).decode())
+        sender = asyncio.create_task(self._send())
+        try:
+            while (await self.websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            sender.cancel()
+
+
+class RedisBus:
+    """Carries each tick's events to the other workers over Redis PUBLISH / SUBSCRIBE.
+
+    A subscribed connection takes no other commands, so the bus keeps one of its
+    own for SUBSCRIBE / UNSUBSCRIBE and publishes through a pooled client.
+    Messages carry the sending worker's id; a worker skips its own.
+    """
+
+    PREFIX = "live:"
+
+    def __init__(self, url: str, retry_after: float = 1.0):
+        self.client = RedisBackend(url, ttl=0)
+        self.origin = uuid.uuid4().hex
+        self.retry_after = retry_after
+        self.hub: Optional["Hub"] = None
+        self._watched: Set[uuid.UUID] = set()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._listener: Optional[asyncio.Task] = None
+        self.connected = False
+        self.published = 0
+        self.received = 0
+        self.errors = 0
+
+    def watch(self, brandbook_id: uuid.UUID) -> None:
+        self._watched.add(brandbook_id)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        elif self._writer is not None:
+            # the reply comes back on the listener's connection, which skips it
+            self._writer.write(RedisBackend._encode("SUBSCRIBE", self.PREFIX + str(brandbook_id)))
+
+    def unwatch(self, brandbook_id: uuid.UUID) -> None:
+        self._watched.discard(brandbook_id)
+        if self._writer is not None:
+            self._writer.write(RedisBackend._encode("UNSUBSCRIBE", self.PREFIX + str(brandbook_id)))
+
+    async def publish(self, outbox: Dict[uuid.UUID, List[dict]]) -> None:
+        for brandbook_id, events in outbox.items():
+            message = dumps({"origin": self.origin, "events": events})
+            if await self.client._safe("PUBLISH", self.PREFIX + str(brandbook_id), message) is not None:
+                self.published += 1
+
+    def _deliver(self, channel: bytes, message: bytes) -> None:
+        try:
+            brandbook_id = uuid.UUID(channel.decode()[len(self.PREFIX):])
+            body = json.loads(message)
+        except ValueError:
+            log.warning("live: malformed message on %r", channel)
+            return
+        if body.get("origin") != self.origin and self.hub is not None:
+            self.received += 1
+            self.hub.receive(brandbook_id, body.get("events") or [RESYNC])
+
+    async def _listen(self) -> None:
+        reconnecting = False
+        while self._watched:
+            try:
+                reader, self._writer = await asyncio.wait_for(self.client._connect(), self.client.timeout)
+                self._writer.write(RedisBackend._encode("SUBSCRIBE", *(self.PREFIX + str(b) for b in self._watched)))
+                self.connected = True
+                if reconnecting and self.hub is not None:
+                    self.hub.resync_all()  # whatever was published while we were away is gone
+                while True:
+                    reply = await RedisBackend._read(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        self._deliver(reply[1], reply[2])
+            except (OSError, EOFError, ValueError, RedisError, asyncio.TimeoutError) as exc:
+                self.errors += 1
+                log.warning("live: redis bus connection lost: %s", exc)
+            finally:
+                if self._writer is not None:
+                    self._writer.close()
+                self._writer = None
+                self.connected = False
+            reconnecting = True
+            await asyncio.sleep(self.retry_after)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        await self.client.close()
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "watched": len(self._watched),
+            "published": self.published,
+            "received": self.received,
+            "errors": self.errors,
+        }
+
+
+class Hub:
+    def __init__(self, tick: float, max_frames: int, max_events: int, bus: Optional[RedisBus] = None):
+        self.tick = tick
+        self.max_frames = max_frames
+        self.max_events = max_events
+        self.bus = bus
+        if bus is not None:
+            bus.hub = self
+        self._channels: Dict[uuid.UUID, Set[Subscriber]] = {}
+        self._pending: Dict[uuid.UUID, List[dict]] = {}
+        self._outbox: Dict[uuid.UUID, List[dict]] = {}  # this worker's events, for the bus
+        self._sending: Set[asyncio.Task] = set()
+        self._ticker: Optional[asyncio.Task] = None
+        self.events = 0
+        self.frames = 0
+        self.deliveries = 0
+        self.resyncs = 0
+
+    def _queue(self, queues: Dict[uuid.UUID, List[dict]], brandbook_id: uuid.UUID, events: List[dict]) -> None:
+        pending = queues.setdefault(brandbook_id, [])
+        if pending == [RESYNC]:
+            return
+        if RESYNC in events or len(pending) + len(events) > self.max_events:
+            # a burst this large is cheaper to reload than to replay
+            pending[:] = [RESYNC]
+        else:
+            pending.extend(events)
+
+    def publish(self, brandbook_id: uuid.UUID, event: dict) -> None:
+        """Queue an event for the next tick.
+
+        A no-op when nobody is watching the brand book, unless there is a bus:
+        clients of other workers may be.
+        """
+        if self.bus is not None:
+            self._queue(self._outbox, brandbook_id, [event])
+            self._start_ticker()
+        if brandbook_id not in self._channels:
+            return
+        self.events += 1
+        self._queue(self._pending, brandbook_id, [event])
+
+    def receive(self, brandbook_id: uuid.UUID, events: List[dict]) -> None:
+        """Queue events another worker published."""
+        if brandbook_id in self._channels:
+            self.events += len(events)
+            self._queue(self._pending, brandbook_id, events)
+
+    def resync_all(self) -> None:
+        for brandbook_id in self._channels:
+            self._pending[brandbook_id] = [RESYNC]
+
+    def flush(self) -> None:
+        if self._outbox:
+            outbox, self._outbox = self._outbox, {}
+            task = asyncio.create_task(self.bus.publish(outbox))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+        pending, self._pending = self._pending, {}
+        for brandbook_id, events in pending.items():
+            subscribers = self._channels.get(brandbook_id)
+            if not subscribers:
+                continue
+            try:
+                frame = dumps({"brandbook_id": brandbook_id, "events": events}).decode()
+            except (TypeError, ValueError):
+                log.exception("live: cannot encode events for brand book %s", brandbook_id)
+                frame = dumps({"brandbook_id": brandbook_id, "events": [RESYNC]}).decode()
+            self.frames += 1
+            for subscriber in subscribers:
+                if subscriber.offer(frame):
+                    self.deliveries += 1
+                else:
+                    self.resyncs += 1
+
+    async def _run(self) -> None:
+        try:
+            while self._channels or self._outbox:
+                await asyncio.sleep(self.tick)
+                self.flush()
+        finally:
+            self._ticker = None
+
+    def _start_ticker(self) -> None:
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.create_task(self._run())
+
+    @asynccontextmanager
+    async def subscribe(self, brandbook_id: uuid.UUID, websocket: WebSocket):
+        subscriber = Subscriber(brandbook_id, websocket, self.max_frames)
+        if brandbook_id not in self._channels and self.bus is not None:
+            self.bus.watch(brandbook_id)
+        self._channels.setdefault(brandbook_id, set()).add(subscriber)
+        self._start_ticker()
+        try:
+            yield subscriber
+        finally:
+            channel = self._channels.get(brandbook_id)
+            if channel is not None:
+                channel.discard(subscriber)
+                if not channel:
+                    del self._channels[brandbook_id]
+                    self._pending.pop(brandbook_id, None)
+                    if self.bus is not None:
+                        self.bus.unwatch(brandbook_id)
+
+    async def close(self) -> None:
+        if self._ticker is not None:
+            self._ticker.cancel()
+        if self.bus is not None:
+            await self.bus.close()
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._channels),
+            "subscribers": sum(len(channel) for channel in self._channels.values()),
+            "tick_ms": self.tick * 1000,
+            "events": self.events,
+            "frames": self.frames,
+            "deliveries": self.deliveries,
+            "resyncs": self.resyncs,
+            "bus": self.bus.stats() if self.bus is not None else "local",
+        }
+
+
+hub = Hub(
+    LIVE_TICK_MS / 1000, LIVE_CLIENT_MAX_FRAMES, LIVE_FRAME_MAX_EVENTS,
+    bus=RedisBus(REDIS_URL) if LIVE_BUS == "redis" else None,
+)
@@ -1,8 +1,10 @@
 from backend.users.models import Base
 from backend.users.models import Brandbook
+from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, String, ForeignKey, Integer
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Computed, DateTime, String, ForeignKey, Index, Integer
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
 
 
 class BrandItem(Base):
@@ -11,10 +13,51 @@ class BrandItem(Base):
     __tablename__ = "brand_items"
 
     id: int = Column(Integer, primary_key=True, index=True)
-    brandbook_id: int = Column(Integer, ForeignKey("brandbooks.id"), nullable=False)
+    brandbook_id = Column(UUID(as_uuid=True), ForeignKey("brandbooks.id"), nullable=False)
     type: str = Column(String, nullable=False)  # e.g. "logo", "font", "colour", "merch"
     name: Optional[str] = Column(String, nullable=True)
     link: str = Column(String, nullable=False)
     colour: Optional[str] = Column(String, nullable=True)
+    # full-text search; generated by PostgreSQL on every write, never loaded by default
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(name, '') || ' ' || type), 'B')",
+        persisted=True,
+    )))
 
-    brandbook = relationship(Brandbook, back_populates="items")
\ No newline at end of file
+    brandbook = relationship(Brandbook, back_populates="items")
+
+    __table_args__ = (
+        # filter "brand book has an item of type X" (EXISTS ... WHERE brandbook_id = ? AND type = ?)
+        Index("ix_brand_items_brandbook_type", "brandbook_id", "type"),
+        Index("ix_brand_items_search", "search_vector", postgresql_using="gin"),
+    )
+
+
+class BrandbookVersion(Base):
+    """A saved state of a brand book, stored as a manifest of row snapshots.
+
+    A manifest maps every row of the brand book (``"section:<id>"``,
+    ``"item:<id>"``, ``"file:<id>"`` and ``"brandbook:<id>"`` itself) to the
+    hash of its :class:`VersionSnapshot`. Checkpoints store the whole manifest;
+    every other version stores only the entries that changed since the
+    previous one (``None`` for a removed row).
+    """
+
+    __tablename__ = "brandbook_versions"
+
+    brandbook_id = Column(UUID(as_uuid=True), ForeignKey("brandbooks.id", ondelete="CASCADE"), primary_key=True)
+    number = Column(Integer, primary_key=True)  # 1, 2, ... per brand book
+    label = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    checkpoint = Column(Boolean, nullable=False, default=False)
+    changes = Column(JSONB, nullable=False)
+    changed: int = Column(Integer, nullable=False)  # rows added, changed or removed since the previous version
+
+
+class VersionSnapshot(Base):
+    """One row's state, stored once however many versions (or brand books) share it."""
+
+    __tablename__ = "version_snapshots"
+
+    hash = Column(String(64), primary_key=True)  # sha256 hex of the body's jsonb text
+    body = Column(JSONB, nullable=False)
@@ -0,0 +1,72 @@
+"""Fractional ordering keys for sections.
+
+A key is a base-62 fraction in ``(0, 1)`` written without the leading
+``0.`` and without trailing zeros, so plain bytewise string comparison
+(``COLLATE "C"``) orders keys exactly as the fractions they spell. There is
+always room between two keys, so moving a section rewrites only that section's
+key; the price is that keys repeatedly inserted at the same spot keep growing
+(about one character per six moves between two neighbours), which
+``evenly_spaced`` resets.
+"""
+from __future__ import annotations
+
+from typing import List, Optional
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+_VALUE = {d: i for i, d in enumerate(DIGITS)}
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    # a < b as fractions; "" is 0 and None is 1
+    if b is not None:
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    low = _VALUE[a[0]] if a else 0
+    high = _VALUE[b[0]] if b is not None else BASE
+    if high - low > 1:
+        return DIGITS[(low + high + 1) // 2]
+    if b is not None and len(b) > 1:
+        # b is "<low + 1>..."; its first digit alone is already above a and below b
+        return b[0]
+    return DIGITS[low] + _midpoint(a[1:], None)
+
+
+def key_between(before: Optional[str], after: Optional[str]) -> str:
+    """A key strictly between ``before`` and ``after``; None means the start / end of the list."""
+    if before is not None and after is not None:
+        if not before < after:
+            raise ValueError(f"{before!r} must sort before {after!r}")
+        return _midpoint(before, after)
+    # at either end, step the first digit that has room instead of halving the
+    # gap: appends (the common case) then add a character every few dozen, not every six
+    if before is not None:
+        for i, digit in enumerate(before):
+            if digit != DIGITS[-1]:
+                return before[:i] + DIGITS[_VALUE[digit] + 1]
+    elif after is not None:
+        for i, digit in enumerate(after):
+            if digit != DIGITS[0]:
+                if _VALUE[digit] > 1:
+                    return after[:i] + DIGITS[_VALUE[digit] - 1]
+                break
+    return _midpoint(before or "", after)
+
+
+def evenly_spaced(count: int) -> List[str]:
+    """``count`` ascending keys spread evenly over ``(0, 1)``, as short as possible."""
+    width = 1
+    while BASE ** width <= count * 2:
+        width += 1
+    step = BASE ** width / (count + 1)
+    keys = []
+    for position in range(1, count + 1):
+        value, digits = round(position * step), []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
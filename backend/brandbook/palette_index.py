@@ -0,0 +1,211 @@
+"""In-process nearest-neighbour index over every brand item colour.
+
+Colours are bucketed in a uniform grid over Lab with chroma compressed the
+way CIEDE2000 weighs it (``C -> ln(1 + 0.045 C) / 0.045``). In that space the
+Euclidean distance stays within ~2.5x of ΔE2000 across the sRGB gamut, so a
+query only has to look at the cells within ``RADIUS_FACTOR * max ΔE`` of the
+target and rank that handful of candidates with exact ΔE2000.
+
+The index is filled from ``brand_items`` on first use and fed directly by
+``crud.create_item`` / ``create_items_bulk``; ``crud.refresh_palette_index``
+also catches up from the table by item ID every PALETTE_INDEX_REFRESH_SEC,
+which picks up rows written by other workers. IDs are taken at INSERT but the
+rows only become visible at COMMIT, so each refresh re-reads from the cursor of
+PALETTE_INDEX_RESCAN_REFRESHES refreshes ago (``add`` skips what it already has). Items removed or rewritten by a
+version restore are dropped (and re-added) in the worker that ran it.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from itertools import product
+from typing import Callable, Container, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import PALETTE_INDEX_CELL, PALETTE_INDEX_REFRESH_SEC, PALETTE_INDEX_RESCAN_REFRESHES
+from . import colour
+
+RADIUS_FACTOR = 3.0
+
+Row = Tuple[int, uuid.UUID, str]  # item id, brand book id, hex colour
+
+
+def index_coords(lab: np.ndarray) -> np.ndarray:
+    chroma = np.hypot(lab[:, 1], lab[:, 2])
+    safe = np.maximum(chroma, 1e-9)
+    scale = np.where(chroma > 1e-9, np.log1p(0.045 * safe) / (0.045 * safe), 1.0)
+    return np.stack([lab[:, 0], lab[:, 1] * scale, lab[:, 2] * scale], axis=-1)
+
+
+@dataclass
+class Match:
+    item_id: int
+    brandbook_id: uuid.UUID
+    colour: str
+    delta_e: float
+
+
+class PaletteIndex:
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self._lock = threading.Lock()
+        self._cells: Dict[Tuple[int, int, int], List[int]] = defaultdict(list)
+        self._lab = np.empty((1024, 3))
+        self._size = 0
+        self._item_ids: List[int] = []
+        self._brandbook_ids: List[uuid.UUID] = []
+        self._colours: List[str] = []
+        self._known: Dict[int, Tuple[int, Tuple[int, int, int]]] = {}  # item id -> (position, cell)
+        self.last_item_id = 0
+        self._cursors = deque([0], maxlen=PALETTE_INDEX_RESCAN_REFRESHES + 1)  # last_item_id after each refresh
+        self.refreshed_at: Optional[float] = None
+        self.queries = 0
+        self.candidates = 0
+
+    def _cell(self, point) -> Tuple[int, int, int]:
+        return tuple(int(v) for v in np.floor(point / self.cell_size))
+
+    def add(self, rows: Iterable[Row]) -> int:
+        """Index new colours; rows already indexed or without a valid hex are skipped."""
+        rows = [r for r in rows if r[0] not in self._known and colour.is_hex(r[2])]
+        if not rows:
+            return 0
+        srgb = colour.parse_hex([r[2] for r in rows])
+        lab = colour.srgb_to_lab(srgb)
+        coords = index_coords(lab)
+        hexes = colour.to_hex(srgb)
+        with self._lock:
+            added = 0
+            for row, lab_row, point, hex_ in zip(rows, lab, coords, hexes):
+                item_id, brandbook_id, _ = row
+                if item_id in self._known:
+                    continue
+                if self._size == len(self._lab):
+                    self._lab = np.concatenate([self._lab, np.empty_like(self._lab)])
+                position = self._size
+                self._lab[position] = lab_row
+                self._size += 1
+                self._item_ids.append(item_id)
+                self._brandbook_ids.append(brandbook_id)
+                self._colours.append(hex_)
+                cell = self._cell(point)
+                self._known[item_id] = (position, cell)
+                self._cells[cell].append(position)
+                added += 1
+            return added
+
+    def remove(self, item_ids: Iterable[int]) -> int:
+        """Stop returning these items; their slots stay allocated but are never visited."""
+        with self._lock:
+            removed = 0
+            for item_id in item_ids:
+                entry = self._known.pop(item_id, None)
+                if entry is None:
+                    continue
+                position, cell = entry
+                self._cells[cell].remove(position)
+                if not self._cells[cell]:
+                    del self._cells[cell]
+                removed += 1
+            return removed
+
+    def _candidates(self, point: np.ndarray, radius: float) -> np.ndarray:
+        lo = self._cell(point - radius)
+        hi = self._cell(point + radius)
+        box = int(np.prod([h - l + 1 for l, h in zip(lo, hi)]))
+        if box <= len(self._cells):
+            keys = product(*(range(l, h + 1) for l, h in zip(lo, hi)))
+            buckets = [self._cells.get(key) for key in keys]
+        else:
+            # a huge radius: walking the occupied cells is cheaper than the box
+            buckets = [
+                positions for key, positions in self._cells.items()
+                if all(l <= k <= h for k, l, h in zip(key, lo, hi))
+            ]
+        found = [p for bucket in buckets if bucket for p in bucket]
+        return np.fromiter(found, dtype=np.int64, count=len(found))
+
+    def _near(
+        self, hex_colour: str, max_delta_e: float, keep: Callable[[uuid.UUID], bool],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions of kept brand books' colours within ``max_delta_e``, closest first, and their ΔE."""
+        lab = colour.srgb_to_lab(colour.parse_hex([hex_colour]))
+        point = index_coords(lab)[0]
+        with self._lock:
+            positions = self._candidates(point, max_delta_e * RADIUS_FACTOR)
+            self.queries += 1
+            self.candidates += len(positions)
+            if not len(positions):
+                return positions, np.empty(0)
+            positions = positions[
+                np.fromiter((keep(self._brandbook_ids[p]) for p in positions), dtype=bool, count=len(positions))
+            ]
+            distances = colour.ciede2000(lab, self._lab[positions])[0]
+        close = distances <= max_delta_e
+        positions, distances = positions[close], distances[close]
+        order = np.argsort(distances, kind="stable")
+        return positions[order], distances[order]
+
+    def query(
+        self, hex_colour: str, max_delta_e: float, k: int,
+        exclude_brandbook: Optional[uuid.UUID] = None, within: Optional[Container[uuid.UUID]] = None,
+    ) -> List[Match]:
+        """Up to ``k`` indexed colours within ``max_delta_e`` (CIEDE2000), closest first.
+
+        ``within`` limits the search to those brand books (e.g. the caller's own).
+        """
+        positions, distances = self._near(
+            hex_colour, max_delta_e,
+            lambda b: b != exclude_brandbook and (within is None or b in within),
+        )
+        return [
+            Match(
+                item_id=self._item_ids[p],
+                brandbook_id=self._brandbook_ids[p],
+                colour=self._colours[p],
+                delta_e=float(d),
+            )
+            for p, d in zip(positions[:k].tolist(), distances[:k].tolist())
+        ]
+
+    def clashes(
+        self, hex_colour: str, max_delta_e: float, outside: Container[uuid.UUID],
+    ) -> Tuple[int, Optional[float]]:
+        """How many colours of brand books not in ``outside`` are within ``max_delta_e``, and the closest ΔE."""
+        _, distances = self._near(hex_colour, max_delta_e, lambda b: b not in outside)
+        return len(distances), (float(distances[0]) if len(distances) else None)
+
+    def needs_refresh(self) -> bool:
+        return self.refreshed_at is None or time.monotonic() - self.refreshed_at >= PALETTE_INDEX_REFRESH_SEC
+
+    @property
+    def scan_from(self) -> int:
+        """Refreshes read items with IDs above this: the cursor as it was a few refreshes ago."""
+        return self._cursors[0]
+
+    def mark_refreshed(self, rows: List[Row]) -> None:
+        # only rows read back from the table move the cursor: an item this worker
+        # added directly may have overtaken lower IDs committed by other workers
+        if rows:
+            self.last_item_id = max(self.last_item_id, max(r[0] for r in rows))
+        self._cursors.append(self.last_item_id)
+        self.refreshed_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "colours": len(self._known),
+                "cells": len(self._cells),
+                "cell_size": self.cell_size,
+                "last_item_id": self.last_item_id,
+                "scan_from": self.scan_from,
+                "queries": self.queries,
+                "avg_candidates": round(self.candidates / self.queries, 1) if self.queries else 0,
+            }
+
+
+palette_index = PaletteIndex(PALETTE_INDEX_CELL)
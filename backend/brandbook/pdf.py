@@ -0,0 +1,75 @@
+"""Streaming PDF writer: one JPEG image per page.
+
+Objects are written as soon as a page is ready and byte offsets are counted
+locally, so the output can go to a non-seekable stream (an HTTP response or a
+ZIP member) and memory stays bounded by a single page.
+"""
+from __future__ import annotations
+
+import io
+from typing import BinaryIO, List
+
+from PIL import Image
+
+# A4 in PDF points (1/72 inch)
+PAGE_WIDTH_PT = 595
+PAGE_HEIGHT_PT = 842
+
+
+class StreamingPdfWriter:
+    def __init__(self, fp: BinaryIO, jpeg_quality: int = 85):
+        self.fp = fp
+        self.jpeg_quality = jpeg_quality
+        self.offset = 0
+        self.offsets: dict[int, int] = {}
+        self.page_ids: List[int] = []
+        # 1 = catalog, 2 = page tree; both are written at the end
+        self.next_id = 3
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes) -> None:
+        self.fp.write(data)
+        self.offset += len(data)
+
+    def _object(self, obj_id: int, body: bytes, stream: bytes | None = None) -> None:
+        self.offsets[obj_id] = self.offset
+        self._write(f"{obj_id} 0 obj\n".encode() + body)
+        if stream is not None:
+            self._write(b"\nstream\n" + stream + b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def _alloc(self) -> int:
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def add_page(self, image: Image.Image) -> None:
+        buf = io.BytesIO()
+        image.convert("RGB").save(buf, "JPEG", quality=self.jpeg_quality)
+        jpeg = buf.getvalue()
+        image_id, content_id, page_id = self._alloc(), self._alloc(), self._alloc()
+
+        self._object(image_id, (
+            f"<< /Type /XObject /Subtype /Image /Width {image.width} /Height {image.height} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode /Length {len(jpeg)} >>"
+        ).encode(), jpeg)
+        content = f"q {PAGE_WIDTH_PT} 0 0 {PAGE_HEIGHT_PT} 0 0 cm /Im0 Do Q".encode()
+        self._object(content_id, f"<< /Length {len(content)} >>".encode(), content)
+        self._object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH_PT} {PAGE_HEIGHT_PT}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode())
+        self.page_ids.append(page_id)
+
+    def close(self) -> None:
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = self.offset
+        size = self.next_id
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for obj_id in range(1, size):
+            lines.append(f"{self.offsets[obj_id]:010d} 00000 n \n")
+        lines.append(f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n")
+        self._write("".join(lines).encode())
@@ -0,0 +1,319 @@
+"""Cache of encoded brand book responses.
+
+Entries are the final JSON bytes, so a hit skips both the children query and
+pydantic serialization. Keys carry everything that makes a response stale:
+
+* detail: ``(user, brand book, updated_at)`` — a write bumps ``updated_at``;
+* list: ``(user, generation, query params)`` — every write made through
+  ``crud`` bumps the user's generation after it commits.
+
+Two backends: an in-process LRU bounded by total bytes, and a small client for
+anything that speaks the Redis protocol (GET / SET PX / INCR), which shares
+entries and generations between workers. Lists are only cached by the shared
+backend: an in-process generation is bumped only in the worker that made the
+write, and the other workers would keep serving stale pages until the TTL.
+Detail keys carry the version itself, so either backend can cache those. The
+cache is best-effort: backend errors count as misses and never fail a request.
+A generation bump that fails (or is skipped while the server is backed off) is
+remembered, and that user's lists are not cached until a retried bump succeeds.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from config import (
+    RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SEC, REDIS_URL,
+)
+
+log = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """LRU over encoded responses, evicting once the byte budget is exceeded."""
+
+    shared = False  # per process: no list caching (see the module docstring)
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    async def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, (data, _) = self._data.popitem(last=False)
+                self._bytes -= len(data)
+                self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        data, _ = self._data.pop(key)
+        self._bytes -= len(data)
+
+    async def generation(self, name: str) -> int:
+        with self._lock:
+            return self._generations.get(name, 0)
+
+    async def bump(self, name: str) -> bool:
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisBackend:
+    """Minimal RESP2 client: a few pooled connections, one command per round trip."""
+
+    shared = True
+
+    def __init__(self, url: str, ttl: float, pool_size: int = 8, timeout: float = 0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.ttl_ms = int(ttl * 1000)
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(pool_size)
+        self._down_until = 0.0
+        self.retry_after = 5.0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def _encode(*args) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    @classmethod
+    async def _read(cls, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise RedisError("connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            return None if length < 0 else (await reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [await cls._read(reader) for _ in range(length)]
+        raise RedisError(f"unexpected reply {line[:20]!r}")
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            writer.write(self._encode("AUTH", self.password))
+        if self.db:
+            writer.write(self._encode("SELECT", self.db))
+        await writer.drain()
+        if self.password:
+            await self._read(reader)
+        if self.db:
+            await self._read(reader)
+        return reader, writer
+
+    async def _roundtrip(self, conn, args):
+        reader, writer = conn
+        writer.write(self._encode(*args))
+        await writer.drain()
+        return await self._read(reader)
+
+    async def _command(self, *args):
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else None
+            try:
+                if conn is None:
+                    conn = await asyncio.wait_for(self._connect(), self.timeout)
+                reply = await asyncio.wait_for(self._roundtrip(conn, args), self.timeout)
+            except BaseException:
+                # the connection's state is unknown (half-read reply): never reuse it
+                if conn is not None:
+                    conn[1].close()
+                raise
+            self._idle.append(conn)
+            return reply
+
+    async def _safe(self, *args):
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            return await self._command(*args)
+        except (OSError, EOFError, ValueError, RedisError, asyncio.TimeoutError) as exc:
+            self.errors += 1
+            # don't make every request wait for a dead server: back off for a while
+            self._down_until = time.monotonic() + self.retry_after
+            log.warning("response cache: redis %s failed: %s", args[0], exc)
+            return None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self._safe("GET", key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self._safe("SET", key, value, "PX", self.ttl_ms)
+
+    async def generation(self, name: str) -> int:
+        value = await self._safe("GET", name)
+        return int(value) if value else 0
+
+    async def bump(self, name: str) -> bool:
+        """False when the INCR failed or was skipped; the old generation may still be current."""
+        return await self._safe("INCR", name) is not None
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "server": f"{self.host}:{self.port}/{self.db}",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self._unbumped: Set[uuid.UUID] = set()  # users whose last bump did not reach the backend
+
+    @staticmethod
+    def _generation_key(user_id) -> str:
+        return f"rc:gen:{user_id}"
+
+    def detail_key(self, user_id: uuid.UUID, brandbook_id: uuid.UUID, version) -> str:
+        return f"rc:bb:{user_id}:{brandbook_id}:{version:%Y%m%d%H%M%S%f}"
+
+    async def list_key(self, user_id: uuid.UUID, params: dict) -> Optional[str]:
+        """Key of a list page; None when the backend cannot cache lists safely."""
+        if not self.backend.shared:
+            return None
+        if user_id in self._unbumped:
+            # pages cached under the old generation may predate a write: retry the bump first
+            if not await self.backend.bump(self._generation_key(user_id)):
+                return None
+            self._unbumped.discard(user_id)
+        generation = await self.backend.generation(self._generation_key(user_id))
+        digest = hashlib.sha1(repr(sorted(params.items())).encode()).hexdigest()
+        return f"rc:list:{user_id}:{generation}:{digest}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.backend.get(key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self.backend.set(key, value)
+
+    async def invalidate_user(self, user_id: uuid.UUID) -> None:
+        """Make every cached list of this user stale; call after the write commits."""
+        if self.backend.shared and not await self.backend.bump(self._generation_key(user_id)):
+            self._unbumped.add(user_id)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        return {**self.backend.stats(), "pending_bumps": len(self._unbumped)}
+
+
+class _NullBackend:
+    shared = False
+
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value):
+        pass
+
+    async def generation(self, name):
+        return 0
+
+    async def bump(self, name):
+        return True
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "off"}
+
+
+def _make_backend():
+    if RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend(REDIS_URL, RESPONSE_CACHE_TTL_SEC)
+    if RESPONSE_CACHE_BACKEND == "memory":
+        return MemoryBackend(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SEC)
+    return _NullBackend()
+
+
+response_cache = ResponseCache(_make_backend())
@@ -1,58 +1,624 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from . import crud, schemas
-from sqlalchemy.orm import Session
+import json
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 
-from database import get_db
+from fastapi import (
+    APIRouter, BackgroundTasks, Body, Depends, HTTPException, Query, Request, Response, WebSocket, status,
+)
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from typing import AsyncIterator, List, Optional
+from . import colour, crud, export, json_patch, live, schemas, search, versions
+from .palette_index import palette_index
+from .response_cache import response_cache
+from backend.responses import FastJSONResponse, FastJSONRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from config import (
+    BRANDBOOK_PAGE_SIZE_DEFAULT, BRANDBOOK_PAGE_SIZE_MAX, BRANDBOOK_VERSIONS_PAGE_SIZE_MAX,
+    BULK_BODY_MAX_BYTES, BULK_ITEMS_MAX, BULK_LINE_MAX_BYTES,
+    PALETTE_MAX_COLOURS, PALETTE_RAMP_STEPS_MAX, PALETTE_SIMILAR_MAX_DELTA_E, PALETTE_SIMILAR_MAX_K,
+    SEARCH_PAGE_SIZE_MAX, SECTION_ORDER_KEY_REBALANCE_LEN, SECTION_PATCH_MAX_OPS, WEB_CONCURRENCY,
+)
+from database import get_async_db
 from backend.users.dependencies import current_user  # adjust import as needed
 
 
-router = APIRouter(prefix="/brandbooks", tags=["brandbooks"])
+router = APIRouter(prefix="/brandbooks", tags=["brandbooks"], route_class=FastJSONRoute)
+
+_BRANDBOOK_LIST = TypeAdapter(List[schemas.BrandBookRead])
 
 
 @router.post("/", response_model=schemas.BrandBookRead, status_code=status.HTTP_201_CREATED)
-def api_create_brandbook(
+async def api_create_brandbook(
     brandbook: schemas.BrandBookCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(current_user),
 ):
     """Create a new brand book belonging to the authenticated user."""
-    return crud.create_brandbook(db, owner_id=current_user.id, brandbook=brandbook)
+    return await crud.create_brandbook(db, owner_id=current_user.id, brandbook=brandbook)
 
 
 @router.get("/", response_model=List[schemas.BrandBookRead])
-def api_list_brandbooks(
-    db: Session = Depends(get_db),
+async def api_list_brandbooks(
+    limit: int = Query(BRANDBOOK_PAGE_SIZE_DEFAULT, ge=1, le=BRANDBOOK_PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    title_prefix: Optional[str] = Query(None, max_length=255),
+    item_type: Optional[str] = Query(None, description="Only brand books that have an item of this type"),
+    updated_since: Optional[datetime] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(current_user),
 ):
-    """List all brand books belonging to the authenticated user."""
-    return crud.get_brandbooks(db, owner_id=current_user.id)
+    """List the authenticated user's brand books, newest first, one page at a time.
 
+    The cursor of the next page is returned in the ``X-Next-Cursor`` header.
+    """
+    params = dict(
+        limit=limit, cursor=cursor, title_prefix=title_prefix, item_type=item_type, updated_since=updated_since,
+    )
+    key = await response_cache.list_key(current_user.id, params)
+    cached = await response_cache.get(key) if key else None
+    if cached is not None:
+        next_cursor, _, body = cached.partition(b"\n")
+        next_cursor = next_cursor.decode()
+    else:
+        try:
+            brandbooks, next_cursor = await crud.get_brandbooks(
+                db, owner_id=current_user.id, schema=schemas.BrandBookRead, **params
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        body = _BRANDBOOK_LIST.dump_json(_BRANDBOOK_LIST.validate_python(brandbooks, from_attributes=True))
+        if key:
+            # the cursor is URL-safe base64, so a newline can separate it from the body
+            await response_cache.set(key, (next_cursor or "").encode() + b"\n" + body)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return Response(body, media_type="application/json", headers=headers)
 
-@router.get("/{brandbook_id}", response_model=schemas.BrandBookRead)
-def api_get_brandbook(
-    brandbook_id: int,
-    db: Session = Depends(get_db),
+
+# declared before /{brandbook_id}, which would otherwise swallow "search"
+@router.get("/search", response_model=List[schemas.BrandBookSearchResult])
+async def api_search_brandbooks(
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(20, ge=1, le=SEARCH_PAGE_SIZE_MAX),
+    offset: int = Query(0, ge=0, le=1000),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(current_user),
 ):
-    """Retrieve a single brand book by ID."""
-    brandbook = crud.get_brandbook(db, owner_id=current_user.id, brandbook_id=brandbook_id)
-    if not brandbook:
+    """Full-text search over the caller's brand book titles, item names and section content.
+
+    Every word is matched as a prefix; results are ranked, with highlighted snippets.
+    """
+    try:
+        return await search.search(db, owner_id=current_user.id, text=q, limit=limit, offset=offset)
+    except search.SearchTooBroad:
+        raise HTTPException(status_code=422, detail="The query matches too much to rank; add more letters or words")
+
+
+def _analyze_palette(colours: List[str], ramp_steps: int) -> FastJSONResponse:
+    if len(colours) > PALETTE_MAX_COLOURS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {PALETTE_MAX_COLOURS} colours per palette",
+        )
+    try:
+        analysis = colour.analyze(colours, ramp_steps)
+    except colour.ColourParseError as exc:
+        raise HTTPException(status_code=422, detail={"message": str(exc), "invalid": exc.invalid})
+    # two n x n float matrices computed right here: re-validating them against
+    # PaletteAnalysis would only repeat the work, so they are encoded as is
+    return FastJSONResponse(analysis)
+
+
+@router.post("/palette/analyze", response_model=schemas.PaletteAnalysis)
+async def api_analyze_palette(
+    palette: schemas.PaletteAnalyzeRequest,
+    current_user=Depends(current_user),
+):
+    """Conversions, WCAG contrast and CIEDE2000 matrices (and optional ramps) for any palette."""
+    return await run_in_threadpool(_analyze_palette, palette.colours, palette.ramp_steps)
+
+
+@router.get("/palette/similar", response_model=schemas.SimilarColoursResult)
+async def api_similar_colours(
+    colour_hex: str = Query(..., alias="colour", description="Hex colour to look up"),
+    k: int = Query(10, ge=1, le=PALETTE_SIMILAR_MAX_K),
+    max_delta_e: float = Query(PALETTE_SIMILAR_MAX_DELTA_E, gt=0, le=50),
+    exclude: Optional[uuid.UUID] = Query(None, description="Leave this brand book's own colours out"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Colours of the caller's brand books within ``max_delta_e`` (CIEDE2000) of ``colour``.
+
+    Answers "do my brand books already use something close to this?" from an
+    in-memory index instead of scanning every brand item. Close colours in
+    other users' brand books are only counted, never identified.
+    """
+    if not colour.is_hex(colour_hex):
+        raise HTTPException(status_code=422, detail="colour must be a hex code")
+    await crud.refresh_palette_index(db)
+    titles = await crud.get_brandbook_titles(db, current_user.id)
+    matches = await run_in_threadpool(palette_index.query, colour_hex, max_delta_e, k, exclude, titles)
+    other_matches, other_best = await run_in_threadpool(palette_index.clashes, colour_hex, max_delta_e, titles)
+
+    per_brandbook: dict = {}
+    for match in matches:
+        count, best = per_brandbook.get(match.brandbook_id, (0, match.delta_e))
+        per_brandbook[match.brandbook_id] = (count + 1, min(best, match.delta_e))
+    return schemas.SimilarColoursResult(
+        colours=[
+            schemas.SimilarColour(
+                item_id=m.item_id, brandbook_id=m.brandbook_id, colour=m.colour, delta_e=round(m.delta_e, 2)
+            )
+            for m in matches
+        ],
+        brandbooks=[
+            schemas.SimilarBrandBook(
+                brandbook_id=brandbook_id,
+                title=titles[brandbook_id][0],
+                slug=titles[brandbook_id][1],
+                matches=count,
+                best_delta_e=round(best, 2),
+            )
+            # matches are sorted, so insertion order is already closest first
+            for brandbook_id, (count, best) in per_brandbook.items()
+        ],
+        elsewhere=schemas.SimilarElsewhere(
+            matches=other_matches,
+            best_delta_e=round(other_best, 2) if other_best is not None else None,
+        ),
+    )
+
+
+def _validators(version: datetime) -> dict:
+    """ETag / Last-Modified for a brand book version (``updated_at``, naive UTC)."""
+    return {
+        "ETag": f'"{version:%Y%m%d%H%M%S%f}"',
+        "Last-Modified": format_datetime(version.replace(tzinfo=timezone.utc), usegmt=True),
+        # the editor may keep a copy, but must revalidate it on every use
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def _is_fresh(request: Request, version: datetime) -> bool:
+    """Whether the client's copy (If-None-Match / If-Modified-Since) is still current."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = _validators(version)["ETag"]
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        # Last-Modified has one-second resolution
+        return version.replace(microsecond=0, tzinfo=timezone.utc) <= since
+    return False
+
+
+@router.get(
+    "/{brandbook_id}",
+    response_model=schemas.BrandBookRead,
+    responses={304: {"description": "The client's copy is current"}},
+)
+async def api_get_brandbook(
+    brandbook_id: uuid.UUID,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Retrieve a single brand book by ID.
+
+    Supports conditional requests: send back the ``ETag`` in ``If-None-Match``
+    (or ``Last-Modified`` in ``If-Modified-Since``) and an unchanged brand book
+    costs one indexed lookup and a bodyless 304. Otherwise the encoded body
+    comes from the response cache when this version was served before.
+    """
+    version = await crud.get_brandbook_version(db, owner_id=current_user.id, brandbook_id=brandbook_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="BrandBook not found")
-    return brandbook
+    if _is_fresh(request, version):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_validators(version))
+
+    body = await response_cache.get(response_cache.detail_key(current_user.id, brandbook_id, version))
+    if body is None:
+        brandbook = await crud.get_brandbook(
+            db, owner_id=current_user.id, brandbook_id=brandbook_id, schema=schemas.BrandBookRead
+        )
+        if not brandbook:
+            raise HTTPException(status_code=404, detail="BrandBook not found")
+        # a write may have landed since the version lookup: key by what was actually loaded
+        version = brandbook.updated_at or brandbook.created_at
+        body = schemas.BrandBookRead.model_validate(brandbook).model_dump_json().encode()
+        await response_cache.set(response_cache.detail_key(current_user.id, brandbook_id, version), body)
+    return Response(body, media_type="application/json", headers=_validators(version))
+
+
+@router.websocket("/{brandbook_id}/live")
+async def ws_brandbook_live(
+    websocket: WebSocket,
+    brandbook_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Changes to the brand book as they happen, for collaborative editing.
+
+    The first frame is ``{"type": "hello", "etag": ...}``. If the ETag differs
+    from the one the client loaded, the client should reload. After that,
+    each frame is ``{"brandbook_id": ..., "events": [...]}``, holding every
+    change committed during one tick (LIVE_TICK_MS). An event of type
+    ``resync`` means the client fell behind and should reload the brand book.
+    """
+    await websocket.accept()
+    if live.hub.bus is None and WEB_CONCURRENCY > 1:
+        # each worker would only see its own writes: collaborators on other workers would be missed
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR, reason="Live updates need LIVE_BUS=redis")
+        return
+    # subscribe before reading the version: a write that lands in between is still delivered
+    async with live.hub.subscribe(brandbook_id, websocket) as subscriber:
+        version = await crud.get_brandbook_version(db, owner_id=current_user.id, brandbook_id=brandbook_id)
+        # the session would otherwise keep its pooled connection for as long as the socket is open
+        await db.close()
+        if version is None:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="BrandBook not found")
+            return
+        await subscriber.serve({"type": "hello", "etag": _validators(version)["ETag"]})
 
 
 @router.post("/{brandbook_id}/items", response_model=schemas.BrandItemRead, status_code=status.HTTP_201_CREATED)
-def api_add_item(
-    brandbook_id: int,
+async def api_add_item(
+    brandbook_id: uuid.UUID,
     item: schemas.BrandItemCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(current_user),
 ):
     """Add an item (logo, font, colour, merch) to a specific brand book."""
-    brandbook = crud.get_brandbook(db, owner_id=current_user.id, brandbook_id=brandbook_id)
+    brandbook = await crud.get_brandbook(db, owner_id=current_user.id, brandbook_id=brandbook_id, schema=None)
+    if not brandbook:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+    return await crud.create_item(db, brandbook_id=brandbook_id, item=item)
+
+
+@router.post(
+    "/{brandbook_id}/sections", response_model=schemas.SectionRead, status_code=status.HTTP_201_CREATED
+)
+async def api_add_section(
+    brandbook_id: uuid.UUID,
+    section: schemas.SectionCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Add a section (any JSON document) at the end of a brand book."""
+    brandbook = await crud.get_brandbook(db, owner_id=current_user.id, brandbook_id=brandbook_id, schema=None)
+    if not brandbook:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+    created = await crud.create_section(db, brandbook_id=brandbook_id, section=section)
+    _rebalance_if_long(background_tasks, created)
+    return created
+
+
+def _rebalance_if_long(background_tasks: BackgroundTasks, section) -> None:
+    if len(section.order_key) > SECTION_ORDER_KEY_REBALANCE_LEN:
+        background_tasks.add_task(crud.rebalance_sections_task, section.brandbook_id)
+
+
+@router.get("/{brandbook_id}/sections", response_model=List[schemas.SectionRead])
+async def api_list_sections(
+    brandbook_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """The brand book's sections, in order."""
+    brandbook = await crud.get_brandbook(db, owner_id=current_user.id, brandbook_id=brandbook_id, schema=None)
+    if not brandbook:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+    return await crud.get_sections(db, brandbook_id=brandbook_id)
+
+
+@router.post("/{brandbook_id}/sections/{section_id}/move", response_model=schemas.SectionRead)
+async def api_move_section(
+    brandbook_id: uuid.UUID,
+    section_id: uuid.UUID,
+    move: schemas.SectionMove,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Move a section after or before a sibling (or, with neither, to the top).
+
+    Only the moved section is written, however many sections the brand book
+    has. When keys get long from many moves into the same spot, the brand
+    book's keys are respaced in the background.
+    """
+    if move.after is not None and move.before is not None:
+        raise HTTPException(status_code=422, detail="Give either after or before, not both")
+    brandbook = await crud.get_brandbook(db, owner_id=current_user.id, brandbook_id=brandbook_id, schema=None)
+    if not brandbook:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+    try:
+        section = await crud.move_section(db, brandbook_id, section_id, after=move.after, before=move.before)
+    except LookupError:
+        raise HTTPException(status_code=422, detail="after/before must be another section of this brand book")
+    if not section:
+        raise HTTPException(status_code=404, detail="Section not found")
+    _rebalance_if_long(background_tasks, section)
+    return section
+
+
+@router.get("/{brandbook_id}/sections/{section_id}", response_model=schemas.SectionRead)
+async def api_get_section(
+    brandbook_id: uuid.UUID,
+    section_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """A single section with its full content."""
+    section = await crud.get_section(db, current_user.id, brandbook_id, section_id)
+    if not section:
+        raise HTTPException(status_code=404, detail="Section not found")
+    return section
+
+
+@router.patch(
+    "/{brandbook_id}/sections/{section_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={409: {"description": "An operation does not apply to the current content"}},
+)
+async def api_patch_section(
+    brandbook_id: uuid.UUID,
+    section_id: uuid.UUID,
+    operations: List[schemas.JsonPatchOperation] = Body(..., media_type="application/json-patch+json"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Edit a section's content with an RFC 6902 JSON Patch.
+
+    The operations are applied by PostgreSQL in one statement, so only the
+    patch travels, in either direction. Either every operation applies or
+    none does; a failing ``test`` (or a missing target) returns 409 with the
+    index of the operation.
+    """
+    if len(operations) > SECTION_PATCH_MAX_OPS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {SECTION_PATCH_MAX_OPS} operations per patch",
+        )
+    try:
+        found = await crud.patch_section(db, current_user.id, brandbook_id, section_id, operations)
+    except json_patch.JsonPatchConflict as exc:
+        raise HTTPException(status_code=409, detail={"message": str(exc), "index": exc.index})
+    except json_patch.JsonPatchError as exc:
+        raise HTTPException(status_code=422, detail={"message": str(exc), "index": exc.index})
+    if not found:
+        raise HTTPException(status_code=404, detail="Section not found")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post(
+    "/{brandbook_id}/versions", response_model=schemas.VersionRead, status_code=status.HTTP_201_CREATED
+)
+async def api_create_version(
+    brandbook_id: uuid.UUID,
+    version: schemas.VersionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Save the brand book's current state as a version.
+
+    Only rows that changed since the previous version are stored. If nothing
+    changed, the previous version is returned and nothing is saved.
+    """
+    brandbook = await crud.get_brandbook(db, owner_id=current_user.id, brandbook_id=brandbook_id, schema=None)
     if not brandbook:
         raise HTTPException(status_code=404, detail="BrandBook not found")
-    return crud.create_item(db, brandbook_id=brandbook_id, item=item)
\ No newline at end of file
+    saved = await versions.create_version(db, brandbook_id, label=version.label)
+    if saved is None:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+    return saved
+
+
+@router.get("/{brandbook_id}/versions", response_model=List[schemas.VersionRead])
+async def api_list_versions(
+    brandbook_id: uuid.UUID,
+    limit: int = Query(50, ge=1, le=BRANDBOOK_VERSIONS_PAGE_SIZE_MAX),
+    before: Optional[int] = Query(None, ge=1, description="Only versions older than this number"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """The brand book's versions, newest first."""
+    brandbook = await crud.get_brandbook(db, owner_id=current_user.id, brandbook_id=brandbook_id, schema=None)
+    if not brandbook:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+    return await versions.list_versions(db, brandbook_id, limit=limit, before=before)
+
+
+@router.get("/{brandbook_id}/versions/{number}", response_model=schemas.VersionDetail)
+async def api_get_version(
+    brandbook_id: uuid.UUID,
+    number: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """The brand book as it was in a given version."""
+    brandbook = await crud.get_brandbook(db, owner_id=current_user.id, brandbook_id=brandbook_id, schema=None)
+    if not brandbook:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+    detail = await versions.get_version(db, brandbook_id, number)
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return detail
+
+
+@router.post("/{brandbook_id}/versions/{number}/restore", response_model=schemas.VersionRead)
+async def api_restore_version(
+    brandbook_id: uuid.UUID,
+    number: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Roll the brand book back to a version, in a single transaction.
+
+    Only the rows that differ from that version are rewritten. Unsaved
+    changes are saved as a version first, and the restore is recorded as a
+    new version, which is returned. Restoring is therefore never destructive.
+    """
+    brandbook = await crud.get_brandbook(db, owner_id=current_user.id, brandbook_id=brandbook_id, schema=None)
+    if not brandbook:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+    restored = await versions.restore_version(db, brandbook_id, number)
+    if restored is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return restored
+
+
+@router.get("/{brandbook_id}/palette", response_model=schemas.PaletteAnalysis)
+async def api_get_palette(
+    brandbook_id: uuid.UUID,
+    ramp_steps: int = Query(0, ge=0, le=PALETTE_RAMP_STEPS_MAX),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Palette analysis of the brand book's colour items.
+
+    Items whose ``colour`` is not a valid hex code are left out.
+    """
+    brandbook = await crud.get_brandbook(db, owner_id=current_user.id, brandbook_id=brandbook_id, schema=None)
+    if not brandbook:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+    colours = [c for c in await crud.get_palette(db, brandbook_id=brandbook_id) if colour.is_hex(c)]
+    return await run_in_threadpool(_analyze_palette, colours, ramp_steps)
+
+
+@router.get("/{brandbook_id}/export.{fmt}")
+async def api_export_brandbook(
+    brandbook_id: uuid.UUID,
+    fmt: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Download the whole brand book as a ZIP (JSON, files and PDF) or a PDF.
+
+    The export is streamed while it is generated; finished exports are cached
+    per brand book version, so repeat downloads are served from disk.
+    """
+    if fmt not in export.MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="Unknown export format")
+    stamp = await crud.get_brandbook_slug_version(db, owner_id=current_user.id, brandbook_id=brandbook_id)
+    if stamp is None:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+    slug, version = stamp
+    headers = {"Content-Disposition": export.content_disposition(slug, fmt)}
+    # a repeat download is one indexed lookup and a file send: no children load, no serialization
+    cached = export.cached_path(brandbook_id, version, fmt)
+    if cached.is_file():
+        return FileResponse(cached, media_type=export.MEDIA_TYPES[fmt], headers=headers)
+
+    brandbook = await crud.get_brandbook(
+        db, owner_id=current_user.id, brandbook_id=brandbook_id, schema=schemas.BrandBookExport
+    )
+    if not brandbook:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+    bundle = schemas.BrandBookExport.model_validate(brandbook).model_dump(mode="json")
+    return StreamingResponse(
+        export.stream_export(bundle, fmt), media_type=export.MEDIA_TYPES[fmt], headers=headers
+    )
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+async def _bounded_stream(request: Request) -> AsyncIterator[bytes]:
+    """The request body chunk by chunk, failing with 413 past ``BULK_BODY_MAX_BYTES``."""
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > BULK_BODY_MAX_BYTES:
+        raise _too_large(f"Body larger than {BULK_BODY_MAX_BYTES} bytes")
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > BULK_BODY_MAX_BYTES:
+            raise _too_large(f"Body larger than {BULK_BODY_MAX_BYTES} bytes")
+        yield chunk
+
+
+async def _iter_bulk_rows(request: Request) -> AsyncIterator[object]:
+    """Yield raw rows from a JSON array body or an NDJSON stream."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonlines"):
+        # NDJSON is parsed line by line as it arrives, without buffering the whole body
+        buffer = b""
+        async for chunk in _bounded_stream(request):
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            if len(buffer) > BULK_LINE_MAX_BYTES or any(len(line) > BULK_LINE_MAX_BYTES for line in lines):
+                raise _too_large(f"NDJSON line longer than {BULK_LINE_MAX_BYTES} bytes")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+        return
+    body = b"".join([chunk async for chunk in _bounded_stream(request)])
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    for row in payload:
+        yield row
+
+
+async def _aenumerate(iterable: AsyncIterator[object]):
+    index = 0
+    async for value in iterable:
+        yield index, value
+        index += 1
+
+
+@router.post("/{brandbook_id}/items/bulk", response_model=schemas.BrandItemBulkResult)
+async def api_add_items_bulk(
+    brandbook_id: uuid.UUID,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Add many items to a brand book in a single transaction.
+
+    Accepts a JSON array of ``BrandItemCreate`` objects or an NDJSON stream
+    (``Content-Type: application/x-ndjson``). Valid rows are inserted together;
+    rejected rows are reported by index and do not abort the batch.
+    """
+    brandbook = await crud.get_brandbook(db, owner_id=current_user.id, brandbook_id=brandbook_id, schema=None)
+    if not brandbook:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+
+    valid: List[schemas.BrandItemCreate] = []
+    errors: List[schemas.BrandItemRowError] = []
+    async for index, raw in _aenumerate(_iter_bulk_rows(request)):
+        if index >= BULK_ITEMS_MAX:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {BULK_ITEMS_MAX} items per request",
+            )
+        try:
+            if isinstance(raw, bytes):
+                valid.append(schemas.BrandItemCreate.model_validate_json(raw))
+            else:
+                valid.append(schemas.BrandItemCreate.model_validate(raw))
+        except ValidationError as exc:
+            errors.append(schemas.BrandItemRowError(
+                index=index, errors=exc.errors(include_url=False, include_context=False),
+            ))
+
+    ids = await crud.create_items_bulk(db, brandbook_id=brandbook_id, items=valid)
+    return schemas.BrandItemBulkResult(created=len(ids), ids=ids, errors=errors)
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import uuid
+from datetime import datetime
+
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Any, List, Literal, Optional
+
+from config import PALETTE_RAMP_STEPS_MAX
+from backend.files.schemas import UploadedFileRead
 
 
 class BrandItemBase(BaseModel):
@@ -22,16 +28,149 @@ class BrandItemRead(BrandItemBase):
 
 
 class BrandBookBase(BaseModel):
-    name: str = Field(..., description="Name of the brand book")
-    description: Optional[str] = Field(None, description="Short description of the brand book")
+    title: str = Field(..., description="Title of the brand book")
 
 
 class BrandBookCreate(BrandBookBase):
-    pass
+    slug: Optional[str] = Field(None, description="URL slug; generated from the title when omitted")
 
 
 class BrandBookRead(BrandBookBase):
-    id: int
+    id: uuid.UUID
+    slug: str
     items: List[BrandItemRead] = []
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class SectionRead(BaseModel):
+    id: uuid.UUID
+    type: str
+    content: Any
+    order_key: str = Field(..., description="Sections sort by this key (bytewise)")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SectionCreate(BaseModel):
+    type: str = Field(..., description="Kind of section, e.g. 'logo', 'colors', 'typography'")
+    content: Any = Field(..., description="Arbitrary JSON document")
+
+
+class SectionMove(BaseModel):
+    """Where to put a section: after one sibling, before one, or (neither) at the top."""
+    after: Optional[uuid.UUID] = Field(None, description="Place right after this section")
+    before: Optional[uuid.UUID] = Field(None, description="Place right before this section")
+
+
+class JsonPatchOperation(BaseModel):
+    """One RFC 6902 operation; paths are RFC 6901 JSON pointers."""
+    op: Literal["add", "remove", "replace", "move", "copy", "test"]
+    path: str = Field(..., description="Target location, e.g. /palette/0/hex")
+    value: Any = Field(None, description="For add, replace and test")
+    from_: Optional[str] = Field(None, alias="from", description="Source location for move and copy")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class BrandBookExport(BrandBookRead):
+    """Everything that goes into a ZIP/PDF export."""
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    sections: List[SectionRead] = []
+    files: List[UploadedFileRead] = []
+
+
+class VersionCreate(BaseModel):
+    label: Optional[str] = Field(None, max_length=200, description="Optional name, e.g. 'Before rebrand'")
+
+
+class VersionRead(BaseModel):
+    number: int = Field(..., description="1, 2, ... per brand book")
+    label: Optional[str] = None
+    created_at: datetime
+    checkpoint: bool = Field(..., description="Stores the full manifest rather than a delta")
+    changed: int = Field(..., description="Rows added, changed or removed since the previous version")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class VersionDetail(VersionRead):
+    """The brand book as it was in one version."""
+    title: str
+    items: List[BrandItemRead] = []
+    sections: List[SectionRead] = []
+    files: List[UploadedFileRead] = []
+
+
+class BrandItemRowError(BaseModel):
+    index: int = Field(..., description="Zero-based position of the row in the submitted batch")
+    errors: List[dict] = Field(..., description="Validation errors for the row")
+
+
+class BrandItemBulkResult(BaseModel):
+    created: int
+    ids: List[int] = Field(..., description="IDs of the inserted items, in submission order")
+    errors: List[BrandItemRowError] = []
+
+
+class PaletteAnalyzeRequest(BaseModel):
+    colours: List[str] = Field(..., description="Hex colours (#rgb or #rrggbb)")
+    ramp_steps: int = Field(0, ge=0, le=PALETTE_RAMP_STEPS_MAX, description="Tint/shade steps per colour; 0 disables ramps")
+
+
+class PaletteColour(BaseModel):
+    hex: str
+    rgb: List[int]
+    lab: List[float] = Field(..., description="CIE L*a*b* (D65)")
+    oklch: List[float] = Field(..., description="OKLCH: lightness, chroma, hue in degrees")
+
+
+class PaletteAnalysis(BaseModel):
+    colours: List[PaletteColour]
+    contrast: List[List[float]] = Field(..., description="WCAG contrast ratio for every pair of colours")
+    delta_e: List[List[float]] = Field(..., description="CIEDE2000 distance for every pair of colours")
+    tints: Optional[List[List[str]]] = Field(None, description="Per colour, lighter steps towards white")
+    shades: Optional[List[List[str]]] = Field(None, description="Per colour, darker steps towards black")
+
+
+class SimilarColour(BaseModel):
+    item_id: int
+    brandbook_id: uuid.UUID
+    colour: str
+    delta_e: float = Field(..., description="CIEDE2000 distance to the queried colour")
+
+
+class SimilarBrandBook(BaseModel):
+    brandbook_id: uuid.UUID
+    title: str
+    slug: str
+    matches: int = Field(..., description="How many of the returned colours belong to this brand book")
+    best_delta_e: float
+
+
+class SimilarElsewhere(BaseModel):
+    matches: int = Field(..., description="Close colours in other users' brand books")
+    best_delta_e: Optional[float] = None
+
+
+class SimilarColoursResult(BaseModel):
+    colours: List[SimilarColour] = Field(..., description="Closest colours first")
+    brandbooks: List[SimilarBrandBook] = Field(..., description="Brand books owning those colours, closest first")
+    elsewhere: SimilarElsewhere = Field(..., description="Anonymized clashes with brand books of other users")
+
+
+class SearchHighlight(BaseModel):
+    kind: str = Field(..., description="Where the match is: brandbook, item or section")
+    item_id: Optional[int] = None
+    section_id: Optional[uuid.UUID] = None
+    snippet: str = Field(..., description="HTML-escaped matching text with hits wrapped in <mark>")
+
+
+class BrandBookSearchResult(BaseModel):
+    id: uuid.UUID
+    title: str
+    slug: str
+    rank: float
+    matches: int = Field(..., description="Number of matching rows (title, items, sections)")
+    highlights: List[SearchHighlight]
@@ -0,0 +1,184 @@
+"""Full-text search over the caller's brand books, their items and sections.
+
+Each table carries a generated ``search_vector`` column (weighted A for brand
+book titles, B for item names, C for section text) with a GIN index, so
+PostgreSQL keeps it current on every write and a query is a handful of index
+lookups. Hits are ranked and grouped per brand book in one statement;
+``ts_headline`` — the expensive part — only runs for the few hits of the
+brand books on the returned page. Ranking has to look at every match, so a
+very broad query (a short prefix over a million items) runs under
+SEARCH_STATEMENT_TIMEOUT_MS and fails with ``SearchTooBroad`` past it.
+"""
+from __future__ import annotations
+
+import html
+import re
+import uuid
+from typing import List, Optional
+
+from sqlalchemy import Integer, Text, case, cast, func, literal, null, select, text as sql_text, union_all
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import SEARCH_HIT_CAP, SEARCH_HEADLINES_PER_BRANDBOOK, SEARCH_STATEMENT_TIMEOUT_MS
+from backend.users.models import Brandbook, Section
+from .models import BrandItem
+
+TS_CONFIG = "simple"
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_MAX_TERMS = 8
+# ts_headline marks hits with two private-use characters (stripped from the
+# source first); the snippet is HTML-escaped and only then do they become <mark>
+_START, _STOP = "\ue000", "\ue001"
+_HEADLINE_OPTIONS = f"StartSel={_START}, StopSel={_STOP}, MaxWords=20, MinWords=6, MaxFragments=2"
+_QUERY_CANCELED = "57014"
+
+
+class SearchTooBroad(Exception):
+    """The query matched too many rows to rank within SEARCH_STATEMENT_TIMEOUT_MS."""
+
+
+def build_tsquery(text: str) -> Optional[str]:
+    """``'Acme log'`` -> ``'acme:* & log:*'``; None when nothing searchable is left.
+
+    Only word characters reach ``to_tsquery``, so user input can never inject
+    tsquery operators. Every term is a prefix match; one-letter terms are dropped
+    because ``a:*`` matches half the database.
+    """
+    terms = [t.lower() for t in _WORD_RE.findall(text) if len(t) > 1][:_MAX_TERMS]
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def render_snippet(headline: str) -> str:
+    """ts_headline output -> HTML-safe text with hits wrapped in ``<mark>``."""
+    return html.escape(headline).replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+def _hits(owner_id: uuid.UUID, tsquery):
+    """Matching rows of all three tables as (brandbook_id, kind, item_id, section_id, rank)."""
+    no_item = cast(null(), Integer)
+    no_section = cast(null(), UUID(as_uuid=True))
+    brandbook_rank = func.ts_rank(Brandbook.search_vector, tsquery)
+    item_rank = func.ts_rank(BrandItem.search_vector, tsquery)
+    section_rank = func.ts_rank(Section.search_vector, tsquery)
+    brandbooks = (
+        select(
+            Brandbook.id.label("brandbook_id"),
+            literal("brandbook").label("kind"),
+            no_item.label("item_id"),
+            no_section.label("section_id"),
+            brandbook_rank.label("rank"),
+        )
+        .where(Brandbook.user_id == owner_id, Brandbook.search_vector.op("@@")(tsquery))
+        .order_by(brandbook_rank.desc())
+        .limit(SEARCH_HIT_CAP)
+    )
+    items = (
+        select(BrandItem.brandbook_id, literal("item"), BrandItem.id, no_section, item_rank)
+        .join(Brandbook, Brandbook.id == BrandItem.brandbook_id)
+        .where(Brandbook.user_id == owner_id, BrandItem.search_vector.op("@@")(tsquery))
+        .order_by(item_rank.desc())
+        .limit(SEARCH_HIT_CAP)
+    )
+    sections = (
+        select(Section.brandbook_id, literal("section"), no_item, Section.id, section_rank)
+        .join(Brandbook, Brandbook.id == Section.brandbook_id)
+        .where(Brandbook.user_id == owner_id, Section.search_vector.op("@@")(tsquery))
+        .order_by(section_rank.desc())
+        .limit(SEARCH_HIT_CAP)
+    )
+    # each branch keeps its best SEARCH_HIT_CAP hits: ranking still reads every match
+    # (a top-N sort), but the grouping, window and headlines above see a bounded set
+    return union_all(*(branch.subquery().select() for branch in (brandbooks, items, sections)))
+
+
+async def search(db: AsyncSession, owner_id: uuid.UUID, text: str, limit: int, offset: int = 0) -> List[dict]:
+    """Brand books matching ``text``, best first, each with highlighted snippets."""
+    raw = build_tsquery(text)
+    if raw is None:
+        return []
+    tsquery = func.to_tsquery(TS_CONFIG, raw)
+    hits = _hits(owner_id, tsquery).cte("hits")
+
+    # page of brand books: best hit decides the order, total rank breaks ties
+    page = (
+        select(
+            hits.c.brandbook_id,
+            func.max(hits.c.rank).label("best"),
+            func.sum(hits.c.rank).label("total"),
+            func.count().label("matches"),
+        )
+        .group_by(hits.c.brandbook_id)
+        .order_by(func.max(hits.c.rank).desc(), func.sum(hits.c.rank).desc(), hits.c.brandbook_id)
+        .limit(limit)
+        .offset(offset)
+        .cte("page")
+    )
+    # the best few hits of each brand book on the page
+    ranked = (
+        select(
+            hits,
+            func.row_number().over(partition_by=hits.c.brandbook_id, order_by=hits.c.rank.desc()).label("n"),
+        )
+        .join(page, page.c.brandbook_id == hits.c.brandbook_id)
+        .subquery("ranked")
+    )
+    top_hits = select(ranked).where(ranked.c.n <= SEARCH_HEADLINES_PER_BRANDBOOK).subquery("top_hits")
+
+    snippet_source = func.translate(case(
+        (top_hits.c.kind == "brandbook", Brandbook.title),
+        (top_hits.c.kind == "item", func.coalesce(BrandItem.name, "") + " " + BrandItem.type),
+        else_=cast(Section.content, Text),
+    ), _START + _STOP, "")
+    stmt = (
+        select(
+            page.c.brandbook_id,
+            page.c.best,
+            page.c.matches,
+            Brandbook.title,
+            Brandbook.slug,
+            top_hits.c.kind,
+            top_hits.c.item_id,
+            top_hits.c.section_id,
+            func.ts_headline(TS_CONFIG, snippet_source, tsquery, _HEADLINE_OPTIONS).label("snippet"),
+        )
+        .select_from(page)
+        .join(Brandbook, Brandbook.id == page.c.brandbook_id)
+        .join(top_hits, top_hits.c.brandbook_id == page.c.brandbook_id)
+        .outerjoin(BrandItem, BrandItem.id == top_hits.c.item_id)
+        .outerjoin(Section, Section.id == top_hits.c.section_id)
+        .order_by(page.c.best.desc(), page.c.total.desc(), page.c.brandbook_id, top_hits.c.rank.desc())
+    )
+
+    if SEARCH_STATEMENT_TIMEOUT_MS:
+        # SET LOCAL: only this transaction, which the request's session rolls back at the end
+        await db.execute(sql_text(f"SET LOCAL statement_timeout = {int(SEARCH_STATEMENT_TIMEOUT_MS)}"))
+    try:
+        rows = (await db.execute(stmt)).all()
+    except DBAPIError as exc:
+        if getattr(exc.orig, "sqlstate", None) == _QUERY_CANCELED:
+            raise SearchTooBroad(text) from exc
+        raise
+
+    results: dict = {}
+    for row in rows:
+        entry = results.get(row.brandbook_id)
+        if entry is None:
+            entry = results[row.brandbook_id] = {
+                "id": row.brandbook_id,
+                "title": row.title,
+                "slug": row.slug,
+                "rank": row.best,
+                "matches": row.matches,
+                "highlights": [],
+            }
+        entry["highlights"].append({
+            "kind": row.kind,
+            "item_id": row.item_id,
+            "section_id": row.section_id,
+            "snippet": render_snippet(row.snippet),
+        })
+    return list(results.values())
@@ -0,0 +1,335 @@
+"""Brand book version history with structural sharing.
+
+Saving a version hashes every row of the brand book inside PostgreSQL
+(sha256 of the row as jsonb) and compares the hashes with the previous
+version's manifest. Only rows with a new hash get a ``VersionSnapshot``, and
+the version row records only the manifest entries that changed, so history
+grows with the size of the changes rather than brand book size times version
+count. A section that never changes is stored once, however many versions
+(or brand books) contain it.
+
+Every BRANDBOOK_VERSION_CHECKPOINT_EVERY-th version is a checkpoint holding
+the full manifest (hashes only). Materializing any version therefore reads at
+most that many version rows, plus one query for the snapshots it needs.
+
+A restore rewrites only the rows that differ from the target version, copying
+snapshot bodies server-side, all in one transaction. The state being replaced
+is saved as a version first and the restore is recorded as a version of its
+own, so a restore can itself be undone.
+"""
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Text, any_, bindparam, cast, delete, func, literal, literal_column, select, union_all, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import BRANDBOOK_VERSION_CHECKPOINT_EVERY
+from backend.users.models import Brandbook, Section, UploadedFile
+from . import schemas
+from .crud import commit_write, touch_brandbook
+from .live import hub as live_hub
+from .models import BrandItem, BrandbookVersion, VersionSnapshot
+from .palette_index import palette_index
+
+Manifest = Dict[str, str]  # "kind:row id" -> snapshot hash
+
+
+@dataclass(frozen=True)
+class _Kind:
+    """A table whose rows are versioned, and the columns that make up a snapshot."""
+    name: str
+    model: type
+    fields: Tuple[str, ...]
+
+    def body(self):
+        pairs = []
+        for field in self.fields:
+            pairs += [literal_column(f"'{field}'"), getattr(self.model, field)]
+        return func.jsonb_build_object(*pairs, type_=JSONB)
+
+    def owned_by(self, brandbook_id: uuid.UUID):
+        return (self.model.id if self.model is Brandbook else self.model.brandbook_id) == brandbook_id
+
+    def ids(self, keys: List[str]):
+        return bindparam(None, [self.model.id.type.python_type(key) for key in keys], ARRAY(self.model.id.type))
+
+
+_BRANDBOOK = _Kind("brandbook", Brandbook, ("title",))
+_CHILDREN = (
+    _Kind("section", Section, ("type", "content", "order_key")),
+    _Kind("item", BrandItem, ("type", "name", "link", "colour")),
+    _Kind("file", UploadedFile, (
+        "file_url", "file_type", "label", "content_hash", "content_type", "size", "created_at",
+    )),
+)
+
+
+def _hash(body):
+    return func.encode(
+        func.sha256(func.convert_to(cast(body, Text), literal_column("'UTF8'"))), literal_column("'hex'"),
+        type_=Text,
+    )
+
+
+def _rows(brandbook_id: uuid.UUID):
+    """``(kind, id, body)`` of every versioned row of the brand book."""
+    return union_all(*(
+        select(
+            literal_column(f"'{kind.name}'", Text).label("kind"),
+            cast(kind.model.id, Text).label("id"),
+            kind.body().label("body"),
+        ).where(kind.owned_by(brandbook_id))
+        for kind in (_BRANDBOOK, *_CHILDREN)
+    )).subquery("live")
+
+
+def _hashes(values):
+    return bindparam(None, sorted(values), ARRAY(Text))
+
+
+async def _current(db: AsyncSession, brandbook_id: uuid.UUID) -> Manifest:
+    """The manifest of the live rows; only hashes leave the database."""
+    rows = _rows(brandbook_id)
+    result = await db.execute(select(rows.c.kind, rows.c.id, _hash(rows.c.body)))
+    return {f"{kind}:{row_id}": digest for kind, row_id, digest in result}
+
+
+async def _history(
+    db: AsyncSession, brandbook_id: uuid.UUID, number: Optional[int] = None
+) -> Tuple[Optional[BrandbookVersion], Manifest]:
+    """Version ``number`` (the latest by default) and its manifest; ``(None, {})`` if there is none.
+
+    Reads the nearest checkpoint at or below the version and the deltas after it.
+    """
+    V = BrandbookVersion
+    bounds = [V.brandbook_id == brandbook_id]
+    if number is not None:
+        bounds.append(V.number <= number)
+    checkpoint = select(func.max(V.number)).where(*bounds, V.checkpoint).scalar_subquery()
+    result = await db.execute(select(V).where(*bounds, V.number >= checkpoint).order_by(V.number))
+    versions = result.scalars().all()
+    if not versions or (number is not None and versions[-1].number != number):
+        return None, {}
+    manifest: Manifest = {}
+    for version in versions:
+        for key, digest in version.changes.items():
+            if digest is None:
+                manifest.pop(key, None)
+            else:
+                manifest[key] = digest
+    return versions[-1], manifest
+
+
+def _diff(old: Manifest, new: Manifest) -> Dict[str, Optional[str]]:
+    changes: Dict[str, Optional[str]] = {key: digest for key, digest in new.items() if old.get(key) != digest}
+    changes.update((key, None) for key in old.keys() - new.keys())
+    return changes
+
+
+def _record(
+    db: AsyncSession,
+    brandbook_id: uuid.UUID,
+    previous: Optional[BrandbookVersion],
+    old: Manifest,
+    new: Manifest,
+    label: Optional[str],
+) -> BrandbookVersion:
+    number = previous.number + 1 if previous is not None else 1
+    changes = _diff(old, new)
+    checkpoint = (number - 1) % BRANDBOOK_VERSION_CHECKPOINT_EVERY == 0
+    version = BrandbookVersion(
+        brandbook_id=brandbook_id,
+        number=number,
+        label=label,
+        created_at=datetime.utcnow(),
+        checkpoint=checkpoint,
+        changes=new if checkpoint else changes,
+        changed=len(changes),
+    )
+    db.add(version)
+    return version
+
+
+async def _save(
+    db: AsyncSession, brandbook_id: uuid.UUID, label: Optional[str]
+) -> Tuple[Optional[BrandbookVersion], Manifest]:
+    """Record the live state unless the latest version already has it; returns that version and the manifest."""
+    latest, saved = await _history(db, brandbook_id)
+    current = await _current(db, brandbook_id)
+    if latest is not None and current == saved:
+        return latest, current
+    new_hashes = {digest for digest in _diff(saved, current).values() if digest is not None}
+    if new_hashes:
+        rows = _rows(brandbook_id)
+        digest = _hash(rows.c.body)
+        await db.execute(
+            insert(VersionSnapshot)
+            .from_select(["hash", "body"], select(digest, rows.c.body).where(digest == any_(_hashes(new_hashes))))
+            .on_conflict_do_nothing(index_elements=["hash"])
+        )
+    return _record(db, brandbook_id, latest, saved, current, label), current
+
+
+async def _lock(db: AsyncSession, brandbook_id: uuid.UUID) -> bool:
+    # every write to the brand book locks this row too (touch_brandbook), so the
+    # rows can't change between hashing them and recording the version
+    result = await db.execute(select(Brandbook.id).where(Brandbook.id == brandbook_id).with_for_update())
+    return result.first() is not None
+
+
+async def create_version(
+    db: AsyncSession, brandbook_id: uuid.UUID, label: Optional[str] = None
+) -> Optional[BrandbookVersion]:
+    """Save the brand book's current state as a new version.
+
+    Returns the latest version instead when nothing changed since it, and None
+    if the brand book does not exist.
+    """
+    if not await _lock(db, brandbook_id):
+        await db.rollback()
+        return None
+    version, _ = await _save(db, brandbook_id, label)
+    await db.commit()
+    return version
+
+
+async def list_versions(
+    db: AsyncSession, brandbook_id: uuid.UUID, limit: int, before: Optional[int] = None
+) -> list:
+    """Newest first, without the manifests."""
+    V = BrandbookVersion
+    stmt = select(V.number, V.label, V.created_at, V.checkpoint, V.changed).where(V.brandbook_id == brandbook_id)
+    if before is not None:
+        stmt = stmt.where(V.number < before)
+    result = await db.execute(stmt.order_by(V.number.desc()).limit(limit))
+    return list(result.all())
+
+
+async def get_version(db: AsyncSession, brandbook_id: uuid.UUID, number: int) -> Optional[schemas.VersionDetail]:
+    """The brand book as it was in version ``number``, rebuilt from its snapshots."""
+    version, manifest = await _history(db, brandbook_id, number)
+    if version is None:
+        return None
+    result = await db.execute(
+        select(VersionSnapshot.hash, VersionSnapshot.body)
+        .where(VersionSnapshot.hash == any_(_hashes(set(manifest.values()))))
+    )
+    bodies = dict(result.all())
+    rows: Dict[str, list] = {"brandbook": [], "section": [], "item": [], "file": []}
+    for key, digest in manifest.items():
+        kind, _, row_id = key.partition(":")
+        rows[kind].append({"id": row_id, **bodies[digest]})
+    (brandbook,) = rows["brandbook"]
+    return schemas.VersionDetail(
+        **schemas.VersionRead.model_validate(version).model_dump(),
+        title=brandbook["title"],
+        sections=sorted(rows["section"], key=lambda row: row["order_key"]),
+        items=sorted(rows["item"], key=lambda row: int(row["id"])),
+        files=sorted(
+            ({"brandbook_id": brandbook_id, **row} for row in rows["file"]),
+            key=lambda row: (row["created_at"] or "", row["id"]),
+        ),
+    )
+
+
+def _upsert(kind: _Kind, brandbook_id: uuid.UUID, written: Dict[str, str]):
+    """INSERT ... ON CONFLICT UPDATE of ``{row id: snapshot hash}``, reading the bodies in the database."""
+    target = func.jsonb_each_text(bindparam(None, written, JSONB)).table_valued("key", "value").alias("target")
+    body = VersionSnapshot.body
+    columns = {
+        "id": cast(target.c.key, kind.model.id.type),
+        "brandbook_id": literal(brandbook_id, UUID(as_uuid=True)),
+    }
+    for field in kind.fields:
+        column_type = kind.model.__table__.c[field].type
+        if isinstance(column_type, JSONB):
+            columns[field] = body[field]
+        elif column_type.python_type is str:
+            columns[field] = body[field].astext
+        else:
+            columns[field] = cast(body[field].astext, column_type)
+    source = select(*columns.values()).select_from(target).join(VersionSnapshot, VersionSnapshot.hash == target.c.value)
+    stmt = insert(kind.model).from_select(list(columns), source)
+    return stmt.on_conflict_do_update(
+        index_elements=["id"],
+        set_={field: stmt.excluded[field] for field in kind.fields},
+        # an ID that now belongs to another brand book is never taken over
+        where=kind.model.brandbook_id == brandbook_id,
+    )
+
+
+async def _apply(
+    db: AsyncSession, brandbook_id: uuid.UUID, changes: Dict[str, Optional[str]]
+) -> Tuple[List[int], List[Tuple[int, Optional[str]]]]:
+    """Write manifest ``changes`` to the live tables.
+
+    Returns the IDs of removed items and ``(id, colour)`` of rewritten ones,
+    for the palette index.
+    """
+    by_kind: Dict[str, Dict[str, Optional[str]]] = {}
+    for key, digest in changes.items():
+        kind, _, row_id = key.partition(":")
+        by_kind.setdefault(kind, {})[row_id] = digest
+
+    removed_items: List[int] = []
+    written_items: List[Tuple[int, Optional[str]]] = []
+    for kind in _CHILDREN:
+        entries = by_kind.get(kind.name, {})
+        removed = [row_id for row_id, digest in entries.items() if digest is None]
+        written = {row_id: digest for row_id, digest in entries.items() if digest is not None}
+        if removed:
+            await db.execute(
+                delete(kind.model)
+                .where(kind.owned_by(brandbook_id), kind.model.id == any_(kind.ids(removed)))
+                .execution_options(synchronize_session=False)
+            )
+        if written:
+            stmt = _upsert(kind, brandbook_id, written)
+            if kind.model is BrandItem:
+                written_items = [tuple(row) for row in await db.execute(stmt.returning(BrandItem.id, BrandItem.colour))]
+            else:
+                await db.execute(stmt)
+        if kind.model is BrandItem:
+            removed_items = [int(row_id) for row_id in removed]
+
+    for digest in by_kind.get(_BRANDBOOK.name, {}).values():
+        title = select(VersionSnapshot.body["title"].astext).where(VersionSnapshot.hash == digest).scalar_subquery()
+        await db.execute(
+            update(Brandbook)
+            .where(Brandbook.id == brandbook_id)
+            .values(title=title)
+            .execution_options(synchronize_session=False)
+        )
+    return removed_items, written_items
+
+
+async def restore_version(db: AsyncSession, brandbook_id: uuid.UUID, number: int) -> Optional[BrandbookVersion]:
+    """Make the brand book look like version ``number`` again, in one transaction.
+
+    Returns the version recording the restore, or None if there is no such version.
+    """
+    owner_id = await touch_brandbook(db, brandbook_id)
+    target_version, target = await _history(db, brandbook_id, number)
+    if owner_id is None or target_version is None:
+        await db.rollback()
+        return None
+    # unsaved changes become a version of their own, so the restore can be undone
+    saved, current = await _save(db, brandbook_id, f"Before restoring version {number}")
+    changes = _diff(current, target)
+    if not changes:
+        await commit_write(db, owner_id)
+        return saved
+
+    removed_items, written_items = await _apply(db, brandbook_id, changes)
+    version = _record(db, brandbook_id, saved, current, target, f"Restored version {number}")
+    await commit_write(db, owner_id)
+    live_hub.publish(brandbook_id, {"type": "brandbook.restored", "version": number})
+    if removed_items or written_items:
+        palette_index.remove(removed_items + [item_id for item_id, _ in written_items])
+        palette_index.add([(item_id, brandbook_id, colour) for item_id, colour in written_items if colour])
+    return version
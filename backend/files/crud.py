@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import uuid
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.users.models import UploadedFile
+from backend.brandbook.crud import commit_write, touch_brandbook
+from backend.brandbook.live import hub as live_hub
+from . import schemas
+
+
+def blob_url(digest: str) -> str:
+    return f"/files/blobs/{digest}"
+
+
+async def create_uploaded_file(
+    db: AsyncSession,
+    brandbook_id: uuid.UUID,
+    digest: str,
+    size: int,
+    content_type: Optional[str] = None,
+    file_type: Optional[str] = None,
+    label: Optional[str] = None,
+) -> UploadedFile:
+    db_file = UploadedFile(
+        brandbook_id=brandbook_id,
+        file_url=blob_url(digest),
+        file_type=file_type,
+        label=label,
+        content_hash=digest,
+        content_type=content_type,
+        size=size,
+    )
+    db.add(db_file)
+    owner_id = await touch_brandbook(db, brandbook_id)
+    await commit_write(db, owner_id)
+    live_hub.publish(brandbook_id, {"type": "file.created", "file": schemas.UploadedFileRead.model_validate(db_file)})
+    return db_file
+
+
+async def get_blob_content_type(db: AsyncSession, digest: str) -> Optional[str]:
+    result = await db.execute(
+        select(UploadedFile.content_type).where(UploadedFile.content_hash == digest).limit(1)
+    )
+    return result.scalars().first()
@@ -0,0 +1,198 @@
+"""Resized / re-encoded image variants (thumbnails, WebP, AVIF).
+
+Rendering runs in a process pool so Pillow never blocks the event loop.
+Results are cached on disk keyed by the source content hash and the transform
+parameters; the cache is trimmed least-recently-used first once its total size
+exceeds DERIVATIVE_CACHE_MAX_BYTES.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import (
+    UPLOAD_ROOT, DERIVATIVE_CACHE_MAX_BYTES, DERIVATIVE_POOL_WORKERS, DERIVATIVE_MAX_DIM,
+)
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "avif": ("AVIF", "image/avif"),
+    "png": ("PNG", "image/png"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+
+@dataclass(frozen=True)
+class Transform:
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fmt: str = "webp"
+    quality: int = 80
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.fmt][1]
+
+    def cache_key(self, source_hash: str) -> str:
+        raw = f"{source_hash}:{self.width or 0}x{self.height or 0}:{self.fmt}:q{self.quality}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _render(src: str, dst: str, transform: Transform) -> int:
+    """Runs in a worker process; returns the size of the written file."""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        if transform.width or transform.height:
+            im.thumbnail(
+                (transform.width or DERIVATIVE_MAX_DIM, transform.height or DERIVATIVE_MAX_DIM),
+                Image.Resampling.LANCZOS,
+            )
+        pil_format = FORMATS[transform.fmt][0]
+        if pil_format == "JPEG" and im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        elif im.mode == "P":
+            im = im.convert("RGBA")
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        try:
+            im.save(tmp, pil_format, quality=transform.quality)
+            os.replace(tmp, dst)
+        finally:
+            # a failed save leaves a partial file; after os.replace the name is already gone
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp)
+    return os.path.getsize(dst)
+
+
+class DerivativeCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # path -> size, LRU order
+        self._total = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path_for(self, key: str, fmt: str) -> Path:
+        return self.root / key[:2] / f"{key}.{fmt}"
+
+    def _load(self) -> None:
+        # rebuild the LRU index from disk, oldest access first
+        files = [p for p in self.root.glob("*/*") if p.is_file() and not p.name.endswith(".tmp")]
+        for p in sorted(files, key=lambda p: p.stat().st_atime):
+            size = p.stat().st_size
+            self._entries[str(p)] = size
+            self._total += size
+        self._loaded = True
+
+    def lookup(self, path: Path) -> bool:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if str(path) in self._entries and path.exists():
+                self._entries.move_to_end(str(path))
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, path: Path, size: int) -> None:
+        with self._lock:
+            previous = self._entries.pop(str(path), 0)
+            self._entries[str(path)] = size
+            self._total += size - previous
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                victim, victim_size = self._entries.popitem(last=False)
+                Path(victim).unlink(missing_ok=True)
+                self._total -= victim_size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_static_hashes: Dict[str, tuple] = {}
+
+
+def static_source_hash(path: Path) -> str:
+    """Content hash of a file from the frontend dir, recomputed only when it changes."""
+    st = path.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _static_hashes.get(str(path))
+    if cached and cached[0] == stamp:
+        return cached[1]
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    _static_hashes[str(path)] = (stamp, digest)
+    return digest
+
+
+cache = DerivativeCache(Path(UPLOAD_ROOT) / "derivatives", DERIVATIVE_CACHE_MAX_BYTES)
+_pool: Optional[ProcessPoolExecutor] = None
+# identical requests arriving together share one render
+_inflight: Dict[str, "asyncio.Task[Path]"] = {}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=DERIVATIVE_POOL_WORKERS)
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _finish(key: str, task: "asyncio.Task[Path]") -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        task.exception()  # mark as retrieved when nobody is waiting any more
+
+
+async def _render_and_cache(source: Path, dst: Path, transform: Transform) -> Path:
+    loop = asyncio.get_running_loop()
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    size = await loop.run_in_executor(_get_pool(), _render, str(source), str(dst), transform)
+    await loop.run_in_executor(None, cache.add, dst, size)
+    return dst
+
+
+async def get_derivative(source: Path, source_hash: str, transform: Transform) -> Path:
+    """Return the path of the rendered variant, rendering it on a cache miss."""
+    key = transform.cache_key(source_hash)
+    dst = cache.path_for(key, transform.fmt)
+    if await asyncio.get_running_loop().run_in_executor(None, cache.lookup, dst):
+        return dst
+    task = _inflight.get(key)
+    if task is None:
+        # the render belongs to no request: one that goes away (client disconnect)
+        # cancels only its own wait, never the render the others are waiting for
+        task = asyncio.ensure_future(_render_and_cache(source, dst, transform))
+        _inflight[key] = task
+        task.add_done_callback(partial(_finish, key))
+    return await asyncio.shield(task)
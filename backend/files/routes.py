@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import re
+import uuid
+from pathlib import Path
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from PIL import Image, UnidentifiedImageError
+
+from config import MAX_UPLOAD_BYTES, DERIVATIVE_MAX_DIM
+from database import get_async_db
+from backend.users.dependencies import current_user
+from backend.brandbook import crud as brandbook_crud
+from backend.responses import FastJSONRoute
+from . import crud, schemas
+from . import derivatives
+from .storage import UploadSession, blob_store, staging
+
+
+router = APIRouter(prefix="/files", tags=["files"], route_class=FastJSONRoute)
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_FRONTEND_DIR = Path("frontend").resolve()
+_IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+
+def _get_session(upload_id: str, user) -> UploadSession:
+    session = staging.get(upload_id)
+    if session is None or session.user_id != str(user.id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
+
+
+def _append(fh, hasher, chunk: bytes) -> None:
+    fh.write(chunk)
+    hasher.update(chunk)
+
+
+async def _finalize(db: AsyncSession, session: UploadSession, hasher) -> schemas.UploadedFileRead:
+    if session.digest is None:
+        digest = hasher.hexdigest()
+        # if the same content is already stored, put_file just drops the staged copy
+        await run_in_threadpool(blob_store.put_file, digest, staging.part_path(session.id))
+        session = await run_in_threadpool(staging.mark_stored, session, digest)
+    db_file = await crud.create_uploaded_file(
+        db,
+        brandbook_id=uuid.UUID(session.brandbook_id),
+        digest=session.digest,
+        size=session.length,
+        content_type=session.content_type,
+        file_type=session.file_type,
+        label=session.label,
+    )
+    # only now: if the row fails, the session survives and a repeated final PATCH retries it
+    staging.discard(session.id)
+    return schemas.UploadedFileRead.model_validate(db_file)
+
+
+@router.post("/uploads", response_model=schemas.UploadStatus, status_code=status.HTTP_201_CREATED)
+async def api_create_upload(
+    upload: schemas.UploadCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Start a resumable upload; send the bytes with ``PATCH /files/uploads/{upload_id}``."""
+    if upload.length > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File is too large")
+    brandbook = await brandbook_crud.get_brandbook(
+        db, owner_id=current_user.id, brandbook_id=upload.brandbook_id, schema=None
+    )
+    if not brandbook:
+        raise HTTPException(status_code=404, detail="BrandBook not found")
+    session = await run_in_threadpool(
+        staging.create,
+        user_id=current_user.id,
+        brandbook_id=upload.brandbook_id,
+        length=upload.length,
+        content_type=upload.content_type,
+        file_type=upload.file_type,
+        label=upload.label,
+    )
+    return schemas.UploadStatus(upload_id=session.id, offset=0, length=session.length)
+
+
+@router.head("/uploads/{upload_id}")
+async def api_upload_offset(upload_id: str, current_user=Depends(current_user)):
+    """Report how many bytes of an interrupted upload the server already has."""
+    session = _get_session(upload_id, current_user)
+    return Response(headers={
+        "Upload-Offset": str(staging.offset(session)),
+        "Upload-Length": str(session.length),
+        "Cache-Control": "no-store",
+    })
+
+
+@router.patch("/uploads/{upload_id}", response_model=schemas.UploadStatus)
+async def api_upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(current_user),
+):
+    """Append the request body to the upload, starting at ``Upload-Offset``.
+
+    The body is streamed to disk chunk by chunk and hashed on the fly. Once the
+    declared length is reached the blob is stored under its SHA-256 and an
+    ``UploadedFile`` row is created. If creating the row fails, repeating the
+    final PATCH (at ``Upload-Offset`` = length, empty body) retries it.
+    """
+    _get_session(upload_id, current_user)
+    async with staging.lock(upload_id):
+        # the previous holder may have finished or discarded the upload meanwhile
+        session = _get_session(upload_id, current_user)
+        offset = staging.offset(session)
+        if upload_offset != offset:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Upload-Offset does not match the stored length",
+                headers={"Upload-Offset": str(offset)},
+            )
+        hasher = None
+        if session.digest is None:  # otherwise all bytes are stored and only the row is missing
+            hasher = await run_in_threadpool(staging.hasher, upload_id)
+            try:
+                with staging.part_path(upload_id).open("ab") as fh:
+                    async for chunk in request.stream():
+                        if not chunk:
+                            continue
+                        if offset + len(chunk) > session.length:
+                            raise HTTPException(
+                                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                detail="Body exceeds the declared upload length",
+                            )
+                        await run_in_threadpool(_append, fh, hasher, chunk)
+                        offset += len(chunk)
+            except BaseException:
+                # the staged file is the source of truth; rebuild the hash from it on resume
+                staging.forget_hasher(upload_id)
+                raise
+
+        if offset < session.length:
+            return schemas.UploadStatus(upload_id=upload_id, offset=offset, length=session.length)
+        uploaded = await _finalize(db, session, hasher)
+    return schemas.UploadStatus(upload_id=upload_id, offset=offset, length=session.length, file=uploaded)
+
+
+@router.get("/blobs/{digest}")
+async def api_get_blob(digest: str, db: AsyncSession = Depends(get_async_db)):
+    """Serve a stored blob.
+
+    The URL is the SHA-256 of the content: it is unguessable and never changes,
+    so blobs are served without a session and cached forever.
+    """
+    if not _DIGEST_RE.match(digest) or not blob_store.exists(digest):
+        raise HTTPException(status_code=404, detail="File not found")
+    content_type = await crud.get_blob_content_type(db, digest) or "application/octet-stream"
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "ETag": f'"{digest}"',
+    }
+    path = blob_store.local_path(digest)
+    if path is not None:
+        return FileResponse(path, media_type=content_type, headers=headers)
+    return StreamingResponse(blob_store.open(digest), media_type=content_type, headers=headers)
+
+
+def _transform(
+    w: Optional[int] = Query(None, ge=1, le=DERIVATIVE_MAX_DIM, description="Max width in px"),
+    h: Optional[int] = Query(None, ge=1, le=DERIVATIVE_MAX_DIM, description="Max height in px"),
+    fmt: Literal["webp", "avif", "png", "jpeg"] = Query("webp"),
+    q: int = Query(80, ge=1, le=100, description="Encoder quality"),
+) -> derivatives.Transform:
+    return derivatives.Transform(width=w, height=h, fmt=fmt, quality=q)
+
+
+async def _render(source: Path, source_hash: str, transform: derivatives.Transform) -> Path:
+    try:
+        return await derivatives.get_derivative(source, source_hash, transform)
+    except Image.DecompressionBombError:
+        # not an OSError: without this it would come back from the pool as a 500
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Image has too many pixels"
+        )
+    except (UnidentifiedImageError, OSError):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Not a supported image")
+
+
+@router.get("/blobs/{digest}/derivative")
+async def api_get_blob_derivative(digest: str, transform: derivatives.Transform = Depends(_transform)):
+    """Resized / re-encoded variant of an uploaded image (e.g. a logo item's blob)."""
+    path = blob_store.local_path(digest) if _DIGEST_RE.match(digest) else None
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    rendered = await _render(path, digest, transform)
+    # source and parameters are both in the URL: the response never changes
+    return FileResponse(rendered, media_type=transform.media_type, headers={
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "ETag": f'"{transform.cache_key(digest)}"',
+    })
+
+
+@router.get("/static/{path:path}")
+async def api_get_static_derivative(path: str, transform: derivatives.Transform = Depends(_transform)):
+    """Resized / re-encoded variant of an image shipped in ``frontend/``."""
+    source = (_FRONTEND_DIR / path).resolve()
+    if (
+        not source.is_relative_to(_FRONTEND_DIR)
+        or source.suffix.lower() not in _IMAGE_SUFFIXES
+        or not source.is_file()
+    ):
+        raise HTTPException(status_code=404, detail="File not found")
+    source_hash = await run_in_threadpool(derivatives.static_source_hash, source)
+    rendered = await _render(source, source_hash, transform)
+    # the source file can change under the same URL, so cache for a day and revalidate by ETag
+    return FileResponse(rendered, media_type=transform.media_type, headers={
+        "Cache-Control": "public, max-age=86400",
+        "ETag": f'"{transform.cache_key(source_hash)}"',
+    })
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Optional
+
+
+class UploadCreate(BaseModel):
+    brandbook_id: uuid.UUID
+    length: int = Field(..., ge=1, description="Total size of the file in bytes")
+    content_type: Optional[str] = Field(None, description="MIME type of the file, e.g. image/png")
+    file_type: Optional[str] = Field(None, description="Kind of file (image, pdf, ...)")
+    label: Optional[str] = Field(None, description="Human-readable label")
+
+
+class UploadedFileRead(BaseModel):
+    id: uuid.UUID
+    brandbook_id: uuid.UUID
+    file_url: str
+    file_type: Optional[str] = None
+    label: Optional[str] = None
+    content_hash: Optional[str] = None
+    content_type: Optional[str] = None
+    size: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UploadStatus(BaseModel):
+    upload_id: str
+    offset: int = Field(..., description="Number of bytes received so far; resume from here")
+    length: int
+    file: Optional[UploadedFileRead] = Field(None, description="Set once the last byte has arrived")
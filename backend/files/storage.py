@@ -0,0 +1,228 @@
+"""Content-addressed blob storage and resumable upload sessions.
+
+Blobs are keyed by the SHA-256 of their content, so the same logo uploaded to
+fifty brand books is stored once. ``BlobStore`` mirrors the handful of object
+storage verbs the app needs (head / put / open / delete) so an S3-compatible
+backend can be dropped in next to ``LocalBlobStore``.
+
+Uploads are written chunk by chunk into a staging file and hashed on the fly;
+an interrupted upload resumes from the staged length.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+from config import UPLOAD_ROOT, UPLOAD_SESSION_TTL_SEC
+
+HASH_CHUNK = 1024 * 1024
+
+
+class BlobStore(ABC):
+    """Minimal object-store interface (content-addressed by SHA-256 hex digest)."""
+
+    @abstractmethod
+    def exists(self, digest: str) -> bool: ...
+
+    @abstractmethod
+    def size(self, digest: str) -> int: ...
+
+    @abstractmethod
+    def put_file(self, digest: str, src: Path) -> None:
+        """Move a fully written local file into the store under ``digest``."""
+
+    @abstractmethod
+    def open(self, digest: str) -> BinaryIO: ...
+
+    def local_path(self, digest: str) -> Optional[Path]:
+        """Filesystem path of the blob when the backend has one (enables sendfile)."""
+        return None
+
+    @abstractmethod
+    def delete(self, digest: str) -> None: ...
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, digest: str) -> Path:
+        # two levels of fan-out keep directories small
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def exists(self, digest: str) -> bool:
+        return self._path(digest).is_file()
+
+    def size(self, digest: str) -> int:
+        return self._path(digest).stat().st_size
+
+    def put_file(self, digest: str, src: Path) -> None:
+        dst = self._path(digest)
+        if dst.exists():
+            src.unlink(missing_ok=True)
+            return
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(src, dst)
+
+    def open(self, digest: str) -> BinaryIO:
+        return self._path(digest).open("rb")
+
+    def local_path(self, digest: str) -> Optional[Path]:
+        return self._path(digest)
+
+    def delete(self, digest: str) -> None:
+        self._path(digest).unlink(missing_ok=True)
+
+
+@dataclass
+class UploadSession:
+    id: str
+    user_id: str
+    brandbook_id: str
+    length: int
+    content_type: Optional[str] = None
+    file_type: Optional[str] = None
+    label: Optional[str] = None
+    # set once the bytes are in the blob store; only the UploadedFile row is missing
+    digest: Optional[str] = None
+
+
+@dataclass
+class _LiveUpload:
+    """In-process state of an upload; lives exactly as long as its staging files."""
+
+    # one writer per upload at a time (within this process)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # running SHA-256; rebuilt from the .part file after a restart
+    hasher: Optional["hashlib._Hash"] = None
+
+
+class UploadStaging:
+    """Staging area for in-progress uploads: ``<id>.part`` + ``<id>.json`` metadata.
+
+    A session untouched for ``ttl`` seconds has expired: ``get`` stops
+    returning it and the next sweep (run from ``create``) deletes its files
+    and in-process state.
+    """
+
+    def __init__(self, root: Path, ttl: float):
+        self.root = root
+        self.ttl = ttl
+        self._live: Dict[str, _LiveUpload] = {}
+        self._next_sweep = 0.0
+
+    def part_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.json"
+
+    def _live_upload(self, upload_id: str) -> _LiveUpload:
+        return self._live.setdefault(upload_id, _LiveUpload())
+
+    def create(self, user_id, brandbook_id, length: int, content_type=None, file_type=None, label=None) -> UploadSession:
+        self.sweep()
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=str(user_id),
+            brandbook_id=str(brandbook_id),
+            length=length,
+            content_type=content_type,
+            file_type=file_type,
+            label=label,
+        )
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.part_path(session.id).touch()
+        self._write_meta(session)
+        self._live_upload(session.id).hasher = hashlib.sha256()
+        return session
+
+    def _write_meta(self, session: UploadSession) -> None:
+        self._meta_path(session.id).write_text(json.dumps(asdict(session)))
+
+    def _last_activity(self, upload_id: str) -> float:
+        """mtime of the newer of the two staging files (appends touch .part, mark_stored .json)."""
+        mtimes = []
+        for path in (self.part_path(upload_id), self._meta_path(upload_id)):
+            try:
+                mtimes.append(path.stat().st_mtime)
+            except FileNotFoundError:
+                pass
+        return max(mtimes, default=0.0)
+
+    def get(self, upload_id: str) -> Optional[UploadSession]:
+        if not upload_id.isalnum():
+            return None
+        try:
+            session = UploadSession(**json.loads(self._meta_path(upload_id).read_text()))
+        except FileNotFoundError:
+            return None
+        if self._last_activity(upload_id) < time.time() - self.ttl:
+            return None
+        return session
+
+    def lock(self, upload_id: str) -> asyncio.Lock:
+        """The upload's writer lock; re-read the session with ``get`` once it is held."""
+        return self._live_upload(upload_id).lock
+
+    def offset(self, session: UploadSession) -> int:
+        if session.digest is not None:
+            return session.length
+        return self.part_path(session.id).stat().st_size
+
+    def hasher(self, upload_id: str) -> "hashlib._Hash":
+        """Running hash covering exactly the bytes staged so far (blocking on resume)."""
+        live = self._live_upload(upload_id)
+        if live.hasher is None:
+            hasher = hashlib.sha256()
+            with self.part_path(upload_id).open("rb") as fh:
+                for chunk in iter(lambda: fh.read(HASH_CHUNK), b""):
+                    hasher.update(chunk)
+            live.hasher = hasher
+        return live.hasher
+
+    def forget_hasher(self, upload_id: str) -> None:
+        live = self._live.get(upload_id)
+        if live is not None:
+            live.hasher = None
+
+    def mark_stored(self, session: UploadSession, digest: str) -> UploadSession:
+        """Record that the staged bytes were moved into the blob store as ``digest``."""
+        session.digest = digest
+        self._write_meta(session)
+        self.part_path(session.id).unlink(missing_ok=True)
+        self.forget_hasher(session.id)
+        return session
+
+    def discard(self, upload_id: str) -> None:
+        self._live.pop(upload_id, None)
+        self.part_path(upload_id).unlink(missing_ok=True)
+        self._meta_path(upload_id).unlink(missing_ok=True)
+
+    def sweep(self) -> None:
+        """Delete expired sessions (at most once per minute; blocking file I/O)."""
+        now = time.time()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + 60
+        cutoff = now - self.ttl
+        upload_ids = {path.stem for path in self.root.glob("*.json")} | set(self._live)
+        for upload_id in upload_ids:
+            live = self._live.get(upload_id)
+            if live is not None and live.lock.locked():
+                continue
+            if self._last_activity(upload_id) < cutoff:
+                self.discard(upload_id)
+
+
+_root = Path(UPLOAD_ROOT)
+blob_store: BlobStore = LocalBlobStore(_root / "blobs")
+staging = UploadStaging(_root / "uploads", UPLOAD_SESSION_TTL_SEC)
@@ -0,0 +1,83 @@
+"""JSON responses for the whole API.
+
+``FastJSONRoute`` is the ``route_class`` of every router. It only changes the
+*default* response class, so FastAPI keeps treating it as the default:
+
+* routes with a ``response_model`` stay on FastAPI's fast path — validate,
+  then ``TypeAdapter.dump_json`` straight to bytes in pydantic-core, never
+  building a ``jsonable_encoder`` dict (an explicit app-wide response class
+  would switch that path off);
+* routes without one (and anything returning ``FastJSONResponse(data)``
+  itself, e.g. the palette matrices, which skip re-validation) are encoded
+  with orjson, which handles datetimes, UUIDs and NumPy arrays natively.
+
+``JSON_RESPONSE_ENCODER=stdlib`` (or orjson not being installed) falls back
+to the stdlib encoder. Per-item numbers: ``python -m benchmarks.json_encode``.
+"""
+from __future__ import annotations
+
+import json
+import uuid
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.datastructures import Default, DefaultPlaceholder
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from config import JSON_RESPONSE_ENCODER
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def _default(value: Any) -> Any:
+    """Types the stdlib encoder doesn't know (orjson handles them itself)."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if hasattr(value, "tolist"):  # NumPy arrays and scalars
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _orjson_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, uuid.UUID):  # orjson only takes uuid.UUID itself, not asyncpg's subclass
+        return str(value)
+    raise TypeError
+
+
+def dumps(content: Any) -> bytes:
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode()
+    if orjson is not None and JSON_RESPONSE_ENCODER == "orjson":
+        return orjson.dumps(content, default=_orjson_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        # already-encoded bodies (e.g. from the response cache) pass straight through
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
+
+
+class FastJSONRoute(APIRoute):
+    def __init__(self, path: str, endpoint, *, response_class=Default(FastJSONResponse), **kwargs):
+        # keep it a placeholder: that is what lets response_model routes use dump_json
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = Default(FastJSONResponse)
+        super().__init__(path, endpoint, response_class=response_class, **kwargs)
@@ -0,0 +1,135 @@
+"""Build ``frontend/`` into a deployable, cache-friendly directory.
+
+    python -m backend.static.build [--src frontend] [--out build/frontend]
+
+* every asset except HTML gets its content hash in the file name
+  (``js/scripts.js`` -> ``js/scripts.3f2a1b9c0d.js``);
+* references to those assets in HTML and CSS are rewritten to the hashed
+  names, so the hashed files can be cached forever;
+* text files get ``.gz`` and ``.br`` siblings, compressed once at build time
+  at the highest level instead of on every request;
+* ``manifest.json`` records the mapping and the variants available per file,
+  so the server never has to probe the disk for them.
+
+HTML keeps its name: it is the entry point and is always revalidated.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import posixpath
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+try:
+    import brotli
+except ImportError:  # brotli is optional: without it only gzip variants are built
+    brotli = None
+
+from config import FRONTEND_DIR, FRONTEND_BUILD_DIR, FRONTEND_URL_PREFIX
+
+MANIFEST = "manifest.json"
+HASH_LEN = 10
+COMPRESSIBLE = {".html", ".js", ".mjs", ".css", ".svg", ".json", ".txt", ".xml", ".map", ".ico"}
+# files that may reference other assets; built after everything they can point at
+REWRITABLE = {".html", ".css"}
+_REF_RE = re.compile(r"""(?P<pre>(?:src|href)\s*=\s*["']|url\(\s*["']?)(?P<ref>[^"')\s]+)""")
+_SPLIT_RE = re.compile(r"([^?#]*)(.*)", re.DOTALL)  # path, then ?query / #fragment
+
+
+def fingerprint(rel: str, data: bytes) -> str:
+    stem, ext = posixpath.splitext(rel)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LEN]}{ext}"
+
+
+def _rewrite(data: bytes, rel: str, mapping: Dict[str, str]) -> bytes:
+    base = posixpath.dirname(rel)
+
+    def replace(match: re.Match) -> str:
+        path, suffix = _SPLIT_RE.match(match.group("ref")).groups()
+        if path.startswith(FRONTEND_URL_PREFIX + "/"):
+            target = path[len(FRONTEND_URL_PREFIX) + 1:]
+        elif "://" in path or path.startswith(("/", "data:", "mailto:", "#")):
+            return match.group(0)
+        else:
+            target = posixpath.normpath(posixpath.join(base, path))
+        hashed = mapping.get(target)
+        if hashed is None:
+            return match.group(0)
+        return f"{match.group('pre')}{FRONTEND_URL_PREFIX}/{hashed}{suffix}"
+
+    return _REF_RE.sub(replace, data.decode("utf-8")).encode("utf-8")
+
+
+def _compress(path: Path, data: bytes) -> List[str]:
+    """Write .br/.gz siblings that are actually smaller; return their encodings."""
+    encodings = []
+    if brotli is not None:
+        packed = brotli.compress(data, quality=11)
+        if len(packed) < len(data):
+            path.with_name(path.name + ".br").write_bytes(packed)
+            encodings.append("br")
+    packed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(packed) < len(data):
+        path.with_name(path.name + ".gz").write_bytes(packed)
+        encodings.append("gzip")
+    return encodings
+
+
+def build(src: Path, out: Path) -> dict:
+    files = sorted(p for p in src.rglob("*") if p.is_file() and "__pycache__" not in p.parts)
+    # plain assets first, then CSS (may point at images/fonts), then HTML
+    files.sort(key=lambda p: (p.suffix == ".html", p.suffix in REWRITABLE))
+
+    tmp = out.with_name(out.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    mapping: Dict[str, str] = {}
+    encodings: Dict[str, List[str]] = {}
+    for path in files:
+        rel = path.relative_to(src).as_posix()
+        data = path.read_bytes()
+        if path.suffix in REWRITABLE:
+            data = _rewrite(data, rel, mapping)
+        name = rel if path.suffix == ".html" else fingerprint(rel, data)
+        mapping[rel] = name
+        target = tmp / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        if path.suffix in COMPRESSIBLE:
+            variants = _compress(target, data)
+            if variants:
+                encodings[name] = variants
+
+    manifest = {"assets": mapping, "encodings": encodings}
+    (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    # swap in the new build in one go so a running server never sees half of it
+    old = out.with_name(out.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if out.exists():
+        out.rename(old)
+    tmp.rename(out)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--src", default=FRONTEND_DIR)
+    parser.add_argument("--out", default=FRONTEND_BUILD_DIR)
+    args = parser.parse_args(argv)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    manifest = build(Path(args.src), out)
+    print(f"{len(manifest['assets'])} files -> {out} "
+          f"({len(manifest['encodings'])} with precompressed variants)"
+          f"{'' if brotli else '; brotli not installed, gzip only'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Serving side of the static pipeline (see ``backend.static.build``).
+
+``FrontendFiles`` is a ``StaticFiles`` that, when pointed at a build:
+
+* answers with the ``.br`` / ``.gz`` sibling the client accepts, picked from
+  the manifest rather than by probing the disk, and 404s requests for those
+  siblings by name (they would go out without ``Content-Encoding``);
+* marks fingerprinted assets ``immutable`` for a year — a new build gives
+  them new names;
+* keeps HTML (and anything not fingerprinted) on ``no-cache``, i.e. cached but
+  revalidated by ETag / Last-Modified on every use.
+
+Without a build it serves the source directory as before, revalidating
+everything.
+"""
+from __future__ import annotations
+
+import json
+import mimetypes
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from config import FRONTEND_DIR, FRONTEND_BUILD_DIR
+from .build import MANIFEST
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+
+def _accepted(accept_encoding: str) -> set:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        name, _, value = params.strip().partition("=")
+        try:
+            if name.strip() == "q" and float(value) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class FrontendFiles(StaticFiles):
+    def __init__(self, directory: str, manifest: Optional[dict] = None, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.root = Path(directory).resolve()
+        manifest = manifest or {}
+        self.fingerprinted = {name for rel, name in manifest.get("assets", {}).items() if name != rel}
+        self.encodings: Dict[str, List[str]] = manifest.get("encodings", {})
+        self.variants = {
+            f"{rel}{_EXTENSIONS[encoding]}" for rel, encodings in self.encodings.items() for encoding in encodings
+        }
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        rel = Path(full_path).resolve().relative_to(self.root).as_posix()
+        if rel in self.variants:
+            raise HTTPException(status_code=404)
+        media_type = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+        headers = {"Cache-Control": IMMUTABLE if rel in self.fingerprinted else REVALIDATE}
+
+        variants = self.encodings.get(rel)
+        if variants:
+            headers["Vary"] = "Accept-Encoding"
+            accepted = _accepted(request_headers.get("accept-encoding", ""))
+            for encoding in variants:
+                if encoding in accepted:
+                    full_path = f"{full_path}{_EXTENSIONS[encoding]}"
+                    stat_result = os.stat(full_path)
+                    headers["Content-Encoding"] = encoding
+                    break
+
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result, media_type=media_type, headers=headers,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def frontend_files() -> FrontendFiles:
+    """The build if there is one (``python -m backend.static.build``), else the sources."""
+    manifest_path = Path(FRONTEND_BUILD_DIR) / MANIFEST
+    if manifest_path.is_file():
+        return FrontendFiles(FRONTEND_BUILD_DIR, json.loads(manifest_path.read_text()))
+    return FrontendFiles(FRONTEND_DIR)
@@ -1,42 +1,7 @@
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from database import get_db
-from . import models, schemas, crud
+# backend/users/auth.py
+# Раньше здесь были свои выпуск и проверка JWT (захардкоженный секрет, sub=email) —
+# такие токены никто не выдавал. Токены теперь одни: backend/auth/tokens.py, и выдаёт
+# их только вход (backend/auth/sessions.py); модуль оставлен ради старых импортов.
+from backend.auth.deps import current_user as get_current_user
 
-# Конфигурация токена
-SECRET_KEY = "your-secret-key"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-# Используется FastAPI для извлечения токена из запроса
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
-
-# Создание токена
-def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-
-# 🔐 Новое: Получение текущего пользователя по токену
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Не удалось проверить учетные данные",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = crud.get_user_by_email(db, email=email)
-    if user is None:
-        raise credentials_exception
-    return user
+__all__ = ["get_current_user"]
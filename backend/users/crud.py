@@ -1,17 +1,16 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import models, schemas
-from passlib.context import CryptContext
-
-# Контекст шифрования паролей с использованием bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .passwords import hash_password
 
 # Получить пользователя по email из базы
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
 
 # Создать нового пользователя: хешируем пароль и сохраняем в БД
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    hashed_password = await hash_password(user.password)  # bcrypt в пуле процессов
     db_user = models.User(
         first_name=user.first_name,
         last_name=user.last_name,
@@ -19,6 +18,6 @@ def create_user(db: Session, user: schemas.UserCreate):
         password_hash=hashed_password
     )
     db.add(db_user)      # Добавляем в сессию
-    db.commit()          # Сохраняем изменения
-    db.refresh(db_user)  # Обновляем объект с учётом сохранённых данных (например, id)
+    await db.commit()          # Сохраняем изменения
+    await db.refresh(db_user)  # Обновляем объект с учётом сохранённых данных (например, id)
     return db_user
@@ -1,7 +1,9 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, JSON, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy import (
+    BigInteger, Column, Computed, String, DateTime, ForeignKey, Index, UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, UUID
+from sqlalchemy.orm import declarative_base, deferred, relationship
 from datetime import datetime
 import uuid
 from sqlalchemy.orm import declarative_base, relationship
@@ -18,10 +20,12 @@ class User(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
+    # users_email_key — arbiter для ON CONFLICT (email) при входе через провайдера (auth/federated.py)
     email = Column(String, unique=True, nullable=False)
     password_hash = Column(String, nullable=True)  # <-- стало nullable
     provider = Column(String, nullable=True)       # 'google' и т.п.
-    provider_id = Column(String, unique=True, nullable=True)  # Google sub
+    # уникален только в паре с provider (uq_provider_providerid ниже), как и в миграциях
+    provider_id = Column(String, nullable=True)  # Google sub
     avatar_url = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -32,6 +36,32 @@ class User(Base):
     )
 
 
+class RefreshToken(Base):
+    """Refresh-токен (в БД только sha256). Все токены одного входа — одна сессия (session_id):
+    при обновлении старый помечается used_at и выдаётся новый; повторное
+    предъявление использованного токена отзывает всю сессию."""
+    __tablename__ = "refresh_tokens"
+
+    token_hash = Column(String(64), primary_key=True)
+    session_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    used_at = Column(DateTime, nullable=True)
+
+
+class RevokedSession(Base):
+    """Отозванная сессия: её access-токены (claim ``sid``) больше не принимаются.
+
+    Строка нужна, пока живы выданные access-токены (expires_at), потом удаляется.
+    В памяти таблица зеркалируется Bloom-фильтром (backend/auth/revocation.py).
+    """
+    __tablename__ = "revoked_sessions"
+
+    session_id = Column(UUID(as_uuid=True), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
 class Brandbook(Base):
     __tablename__ = "brandbooks"
 
@@ -39,14 +69,31 @@ class Brandbook(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     title = Column(String, nullable=False)
     slug = Column(String, unique=True, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # полнотекстовый поиск: PostgreSQL сам пересчитывает колонку при каждой записи;
+    # deferred — чтобы не тащить tsvector в обычные SELECT
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(slug, '')), 'A')",
+        persisted=True,
+    )))
 
     user = relationship("User", back_populates="brandbooks")
-    sections = relationship("Section", back_populates="brandbook", cascade="all, delete")
+    sections = relationship("Section", back_populates="brandbook", cascade="all, delete",
+                            order_by="Section.order_key")
     files = relationship("UploadedFile", back_populates="brandbook", cascade="all, delete")
     items = relationship("BrandItem", back_populates="brandbook", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # keyset-пагинация списка: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+        Index('ix_brandbooks_user_created_id', 'user_id', 'created_at', 'id'),
+        Index('ix_brandbooks_user_updated', 'user_id', 'updated_at'),
+        # фильтр по префиксу названия (LIKE 'abc%')
+        Index('ix_brandbooks_user_title_prefix', 'user_id', 'title',
+              postgresql_ops={'title': 'varchar_pattern_ops'}),
+        Index('ix_brandbooks_search', 'search_vector', postgresql_using='gin'),
+    )
+
 
 class Section(Base):
     __tablename__ = "sections"
@@ -54,11 +101,28 @@ class Section(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     brandbook_id = Column(UUID(as_uuid=True), ForeignKey("brandbooks.id"))
     type = Column(String, nullable=False)  # e.g. 'logo', 'colors'
-    content = Column(JSON, nullable=False)  # flexible data
-    order = Column(Integer, default=0)
+    # JSONB: PATCH правит документ на стороне PostgreSQL (jsonb_set и т.п.), без перезаписи целиком
+    content = Column(JSONB, nullable=False)  # flexible data
+    # дробный ключ порядка (см. backend/brandbook/ordering.py): перемещение секции
+    # меняет одну строку; COLLATE "C" — побайтовое сравнение, как у самих ключей
+    order_key = Column(String(collation="C"), nullable=False)
+    # индексируются только строковые значения JSON, без ключей
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(jsonb_to_tsvector('simple', content, '[\"string\"]'), 'C')",
+        persisted=True,
+    )))
 
     brandbook = relationship("Brandbook", back_populates="sections")
 
+    __table_args__ = (
+        # упорядоченное чтение секций брендбука — index scan (заодно покрывает JOIN по brandbook_id)
+        Index('ix_sections_brandbook_order', 'brandbook_id', 'order_key'),
+        Index('ix_sections_search', 'search_vector', postgresql_using='gin'),
+        # containment-запросы по содержимому: content @> '{"kind": "primary"}'
+        Index('ix_sections_content', 'content', postgresql_using='gin',
+              postgresql_ops={'content': 'jsonb_path_ops'}),
+    )
+
 
 class UploadedFile(Base):
     __tablename__ = "uploaded_files"
@@ -69,6 +133,10 @@ class UploadedFile(Base):
     file_type = Column(String)  # 'image', 'pdf', etc.
     label = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # файлы, загруженные через /files/uploads, лежат в content-addressed хранилище
+    content_hash = Column(String(64), index=True, nullable=True)  # sha256 hex
+    content_type = Column(String, nullable=True)
+    size = Column(BigInteger, nullable=True)
 
     brandbook = relationship("Brandbook", back_populates="files")
 
@@ -0,0 +1,138 @@
+# backend/users/passwords.py
+"""Хеширование и проверка паролей в отдельном пуле процессов.
+
+bcrypt намеренно дорогой по CPU и держит GIL, поэтому считаем его не в
+процессе uvicorn, а в ProcessPoolExecutor. Очередь ограничена: если в работе
+уже PASSWORD_POOL_MAX_PENDING задач, новая сразу получает 503 + Retry-After,
+а не копится и не тормозит остальные эндпоинты.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from config import (
+    BCRYPT_ROUNDS, PASSWORD_POOL_WORKERS, PASSWORD_POOL_MAX_PENDING,
+    PASSWORD_POOL_RETRY_AFTER_SEC,
+)
+
+# min/max_desired_rounds = BCRYPT_ROUNDS: хеш с другим work factor считается
+# устаревшим, и verify_and_update вернёт новый хеш (rehash-on-login)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_desired_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_desired_rounds=BCRYPT_ROUNDS,
+)
+
+
+# --- функции, которые выполняются в дочерних процессах ---
+def _hash_job(password: str) -> tuple[str, float]:
+    started = time.perf_counter()
+    hashed = pwd_context.hash(password)
+    return hashed, time.perf_counter() - started
+
+
+def _verify_job(password: str, hashed: str) -> tuple[bool, Optional[str], float]:
+    started = time.perf_counter()
+    ok, new_hash = pwd_context.verify_and_update(password, hashed)
+    return ok, new_hash, time.perf_counter() - started
+
+
+class PasswordPoolStats:
+    def __init__(self):
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_time_total = 0.0
+        self.hash_time_max = 0.0
+
+    def observe(self, elapsed: float, hash_time: float) -> None:
+        # время ожидания в очереди = всё время задачи минус чистое время bcrypt
+        wait = max(elapsed - hash_time, 0.0)
+        self.completed += 1
+        self.queue_wait_total += wait
+        self.queue_wait_max = max(self.queue_wait_max, wait)
+        self.hash_time_total += hash_time
+        self.hash_time_max = max(self.hash_time_max, hash_time)
+
+    def as_dict(self) -> dict:
+        n = self.completed or 1
+        return {
+            "workers": PASSWORD_POOL_WORKERS,
+            "max_pending": PASSWORD_POOL_MAX_PENDING,
+            "pending": _pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_avg_ms": self.queue_wait_total / n * 1000,
+            "queue_wait_max_ms": self.queue_wait_max * 1000,
+            "hash_time_avg_ms": self.hash_time_total / n * 1000,
+            "hash_time_max_ms": self.hash_time_max * 1000,
+        }
+
+
+stats = PasswordPoolStats()
+_pool: Optional[ProcessPoolExecutor] = None
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PASSWORD_POOL_WORKERS)
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _release(_future) -> None:
+    # вызывается пулом, когда задача реально закончилась (или отменена до старта),
+    # а не когда её перестал ждать запрос: отключившийся клиент не освобождает слот,
+    # пока bcrypt ещё крутится в дочернем процессе
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def _submit(fn, *args):
+    global _pending
+    if _pending >= PASSWORD_POOL_MAX_PENDING:
+        stats.rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервис перегружен, попробуйте позже",
+            headers={"Retry-After": str(PASSWORD_POOL_RETRY_AFTER_SEC)},
+        )
+    started = time.perf_counter()
+    future = _get_pool().submit(fn, *args)
+    with _pending_lock:
+        _pending += 1
+    future.add_done_callback(_release)
+    result = await asyncio.wrap_future(future)
+    stats.observe(time.perf_counter() - started, result[-1])
+    return result
+
+
+async def hash_password(password: str) -> str:
+    hashed, _ = await _submit(_hash_job, password)
+    return hashed
+
+
+async def verify_password(password: str, hashed: str) -> tuple[bool, Optional[str]]:
+    """Возвращает (пароль верный, новый хеш или None, если перехешировать не нужно)."""
+    ok, new_hash, _ = await _submit(_verify_job, password, hashed)
+    return ok, new_hash
@@ -1,61 +1,32 @@
 # app/users/routes.py
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-from jose import jwt
-from datetime import datetime, timedelta
-
-from database import get_db
-from backend.users import models, schemas
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from backend.users import crud, models, schemas
+from backend.users.passwords import hash_password, verify_password
 from backend.auth.deps import current_user
+from backend.auth.sessions import end_session, start_session
 from backend.users.models import User
-from config import JWT_SECRET, JWT_ALG, JWT_EXPIRES_MIN
+from backend.responses import FastJSONRoute
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=FastJSONRoute)
 
 COOKIE_NAME = "access_token"
 
-# 📌 Настройка шифрования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# 📌 Настройки JWT
-# SECRET_KEY = "supersecret"  # в реальном проекте — хранить в .env
-# ALGORITHM = "HS256"
-# ACCESS_TOKEN_EXPIRE_MINUTES = 60
-SECRET_KEY = JWT_SECRET
-ALGORITHM = JWT_ALG
-ACCESS_TOKEN_EXPIRE_MINUTES = JWT_EXPIRES_MIN
-
-
-# 🔹 Хэширование пароля
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-# 🔹 Проверка пароля
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-# 🔹 Генерация токена
-def create_access_token(data: dict, expires_delta: timedelta | None = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-
 
 # 📌 Регистрация пользователя
 @router.post("/register", response_model=schemas.UserResponse)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Проверяем, что email ещё не используется
-    existing_user = db.query(models.User).filter(models.User.email == user.email).first()
+    existing_user = await crud.get_user_by_email(db, email=user.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email уже зарегистрирован")
 
     # Создаём нового пользователя
-    hashed_password = get_password_hash(user.password)
+    # bcrypt считается в пуле процессов (backend/users/passwords.py)
+    hashed_password = await hash_password(user.password)
     db_user = models.User(
         first_name=user.first_name,
         last_name=user.last_name,
@@ -63,38 +34,28 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         password_hash=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
 
     return db_user
 
 
 # 📌 Логин пользователя
 @router.post("/login")
-def login(user: schemas.UserLogin, response: Response, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if not db_user or not verify_password(user.password, db_user.password_hash):
+async def login(user: schemas.UserLogin, response: Response, db: AsyncSession = Depends(get_async_db)):
+    db_user = await crud.get_user_by_email(db, email=user.email)
+    if not db_user or not db_user.password_hash:
         raise HTTPException(status_code=401, detail="Неверный email или пароль")
+    ok, new_hash = await verify_password(user.password, db_user.password_hash)
+    if not ok:
+        raise HTTPException(status_code=401, detail="Неверный email или пароль")
+    if new_hash:
+        # изменился work factor (BCRYPT_ROUNDS) — сохраняем хеш с новыми параметрами
+        db_user.password_hash = new_hash
+        await db.commit()
 
-    # выдаём JWT
-    now = datetime.utcnow()
-    payload = {
-        "sub": str(db_user.id),
-        "iat": now,
-        "exp": now + timedelta(minutes=JWT_EXPIRES_MIN),
-    }
-    token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
-
-    # СТАВИМ HttpOnly cookie (как в Google OAuth)
-    response.set_cookie(
-        key=COOKIE_NAME,
-        value=token,
-        httponly=True,
-        secure=False,      # локально False; на проде True (https)
-        samesite="lax",
-        max_age=JWT_EXPIRES_MIN * 60,
-        path="/",
-    )
+    # выдаём access + refresh в HttpOnly cookie (как в Google OAuth), см. auth/sessions.py
+    await start_session(db, db_user.id, response)
     # можно вернуть 204 или ok-json
     return {"ok": True}
 
@@ -107,9 +68,9 @@ def me(user: User = Depends(current_user)):
 
 
 
-# logout — очистка cookie
+# logout — отзыв сессии и очистка cookie (то же, что POST /auth/logout)
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
-def logout(response: Response):
-    response.delete_cookie(COOKIE_NAME, path="/")
+async def logout(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    await end_session(db, request, response)
 
 
@@ -0,0 +1,92 @@
+"""Per-item cost of encoding a brand book response, old path vs new.
+
+    python -m benchmarks.json_encode [--items 100 1000 10000] [--repeat 5]
+
+Each brand book is built from plain attribute objects (like ORM rows), so
+every path includes ``from_attributes`` validation. Compared paths:
+
+* ``jsonable_encoder``: model -> ``jsonable_encoder`` dict -> ``json.dumps``,
+  the pre-pydantic-v2 FastAPI pipeline;
+* ``dump_json``: validate + ``TypeAdapter.dump_json`` (pydantic-core all the
+  way), what every ``response_model`` route and the cached brand book routes
+  do under ``FastJSONRoute``;
+* ``FastJSONResponse``: validate + ``dump_python(mode="json")`` + orjson,
+  i.e. what an explicit app-wide response class would have cost instead.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import uuid
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from backend.brandbook import schemas
+from backend.responses import FastJSONResponse
+
+_ADAPTER = TypeAdapter(schemas.BrandBookRead)
+
+
+def _brandbook(items: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        title="Acme",
+        slug="acme",
+        items=[
+            SimpleNamespace(
+                id=i, type="colour", name=f"Colour {i}", link=f"/files/blobs/{i:064x}", colour="#ff00aa",
+            )
+            for i in range(items)
+        ],
+    )
+
+
+def _legacy(row) -> bytes:
+    model = schemas.BrandBookRead.model_validate(row)
+    return json.dumps(jsonable_encoder(model)).encode()
+
+
+def _dump_json(row) -> bytes:
+    return _ADAPTER.dump_json(_ADAPTER.validate_python(row, from_attributes=True))
+
+
+def _fast_response(row) -> bytes:
+    model = _ADAPTER.validate_python(row, from_attributes=True)
+    return FastJSONResponse(_ADAPTER.dump_python(model, mode="json")).body
+
+
+PATHS = {"jsonable_encoder": _legacy, "dump_json": _dump_json, "FastJSONResponse": _fast_response}
+
+
+def _per_item_us(encode, row, items: int, repeat: int) -> float:
+    encode(row)  # warm up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encode(row)
+        best = min(best, time.perf_counter() - start)
+    return best / items * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sample = _brandbook(3)
+    bodies = {name: json.loads(encode(sample)) for name, encode in PATHS.items()}
+    assert len({json.dumps(body, sort_keys=True) for body in bodies.values()}) == 1, "paths disagree"
+
+    print(f"{'items':>7}  " + "  ".join(f"{name:>18}" for name in PATHS) + "   (µs per item, best of runs)")
+    for items in args.items:
+        row = _brandbook(items)
+        costs = [_per_item_us(encode, row, items, args.repeat) for encode in PATHS.values()]
+        print(f"{items:>7}  " + "  ".join(f"{cost:>18.2f}" for cost in costs))
+
+
+if __name__ == "__main__":
+    main()
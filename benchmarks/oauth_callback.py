@@ -0,0 +1,138 @@
+"""Database cost of the Google callback's user lookup, old path vs one-statement upsert.
+
+    python -m benchmarks.oauth_callback --url postgresql+asyncpg://... [--logins 500] [--concurrency 50]
+
+Replays a login storm against a real PostgreSQL, in scratch users
+(``@bench.invalid``) deleted afterwards:
+
+* ``sign-up``: every login is a new user;
+* ``returning``: the same users sign in again;
+* ``first-login race``: ``--concurrency`` logins of one new user at once.
+
+Compared paths:
+
+* ``legacy``: SELECT by provider+provider_id, SELECT by email, INSERT or
+  UPDATE, COMMIT, refresh, as ``google_callback`` did before;
+* ``upsert``: ``backend.auth.federated.upsert_federated_user``.
+
+Statements are counted without BEGIN/COMMIT. Over a network each one is a
+round trip, so the latency gap grows with the distance to the database.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from sqlalchemy import delete, event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import backend.brandbook.models  # noqa: F401  (User's relationships need these mappers)
+from backend.auth.federated import FederatedIdentity, upsert_federated_user
+from backend.users.models import User
+
+DOMAIN = "bench.invalid"
+
+
+async def _legacy(db: AsyncSession, identity: FederatedIdentity) -> uuid.UUID:
+    user = (await db.execute(
+        select(User).where(User.provider == identity.provider, User.provider_id == identity.subject)
+    )).scalar_one_or_none()
+    if not user:
+        user = (await db.execute(select(User).where(User.email == identity.email))).scalar_one_or_none()
+    if not user:
+        user = User(
+            first_name=identity.first_name, last_name=identity.last_name, email=identity.email,
+            password_hash=None, provider=identity.provider, provider_id=identity.subject,
+            avatar_url=identity.avatar_url,
+        )
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+    elif identity.avatar_url and user.avatar_url != identity.avatar_url:
+        user.avatar_url = identity.avatar_url
+        await db.commit()
+    return user.id
+
+
+def _identity(run: str, n: int) -> FederatedIdentity:
+    return FederatedIdentity(
+        provider="google", subject=f"{run}-{n}", email=f"{run}-{n}@{DOMAIN}",
+        first_name="Bench", last_name=str(n), avatar_url=f"https://example.com/{n}.png",
+    )
+
+
+async def _storm(sessions, path, identities, concurrency: int):
+    gate = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def login(identity):
+        nonlocal errors
+        async with gate, sessions() as db:
+            start = time.perf_counter()
+            try:
+                await path(db, identity)
+            except IntegrityError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login(identity) for identity in identities))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def _run(url: str, logins: int, concurrency: int) -> None:
+    engine = create_async_engine(url, pool_size=concurrency, max_overflow=0)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+    statements = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    print(f"{'path':>7}  {'scenario':>16}  {'stmts/login':>11}  {'mean ms':>8}  {'p95 ms':>7}  {'logins/s':>8}  {'errors':>6}")
+    try:
+        for name, path in (("legacy", _legacy), ("upsert", upsert_federated_user)):
+            run = f"{name}-{uuid.uuid4().hex[:6]}"
+            users = [_identity(run, n) for n in range(logins)]
+            scenarios = (
+                ("sign-up", users),
+                ("returning", users),
+                ("first-login race", [_identity(run, logins)] * concurrency),
+            )
+            for scenario, identities in scenarios:
+                statements = 0
+                latencies, errors, elapsed = await _storm(sessions, path, identities, concurrency)
+                latencies.sort()
+                p95 = latencies[int(len(latencies) * 0.95)] if latencies else float("nan")
+                print(
+                    f"{name:>7}  {scenario:>16}  {statements / len(identities):>11.2f}"
+                    f"  {statistics.fmean(latencies) * 1000 if latencies else float('nan'):>8.2f}"
+                    f"  {p95 * 1000:>7.2f}  {len(identities) / elapsed:>8.0f}  {errors:>6}"
+                )
+    finally:
+        async with sessions() as db:
+            await db.execute(delete(User).where(User.email.like(f"%@{DOMAIN}")))
+            await db.commit()
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=os.getenv("DATABASE_URL"), help="async SQLAlchemy URL (default: $DATABASE_URL)")
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    if not args.url:
+        parser.error("--url or DATABASE_URL is required")
+    asyncio.run(_run(args.url, args.logins, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Cost of the provider round trips in a Google sign-in, stock Authlib vs CachedOIDCApp.
+
+    python -m benchmarks.oidc_login [--logins 50] [--latency-ms 5] [--connect-latency-ms 30]
+
+Runs ``backend.auth.fake_idp`` on a local port. ``--connect-latency-ms``
+stands in for the TCP/TLS handshake to the real provider. Each sign-in does
+the server-side legs of ``/auth/google/login`` and ``/callback``: build the
+authorization URL, exchange the code, verify the ID token. The browser's
+redirect through ``/authorize`` is not timed. Reported per mode:
+
+* the first sign-in of a fresh process;
+* the mean of the following ones;
+* provider requests and new connections per sign-in.
+
+``cached+warm`` is what the app does: discovery and JWKS are loaded at startup.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import uvicorn
+from authlib.integrations.starlette_client import OAuth
+
+from backend.auth.fake_idp import FakeIdP
+from backend.auth.oidc import CachedOAuth, close_pool, pooled_transport
+
+REDIRECT_URI = "http://testserver/auth/google/callback"
+
+
+def _serve(idp: FakeIdP, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(idp, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def _client(mode: str, discovery_url: str):
+    client_kwargs = {"scope": "openid email profile", "trust_env": False, "timeout": 10.0}
+    registry = OAuth() if mode == "stock" else CachedOAuth()
+    if mode != "stock":
+        client_kwargs["transport"] = pooled_transport()
+    registry.register(
+        name="google", client_id="bench", client_secret="secret",
+        server_metadata_url=discovery_url, client_kwargs=client_kwargs,
+    )
+    return registry.google
+
+
+async def _sign_in(app, browser: httpx.AsyncClient, email: str) -> float:
+    start = time.perf_counter()
+    rv = await app.create_authorization_url(REDIRECT_URI, login_hint=email)
+    elapsed = time.perf_counter() - start
+    # the browser's leg: not on the server's critical path
+    location = (await browser.get(rv["url"])).headers["location"]
+    code = parse_qs(urlparse(location).query)["code"][0]
+    start = time.perf_counter()
+    token = await app.fetch_access_token(redirect_uri=REDIRECT_URI, code=code)
+    userinfo = await app.parse_id_token(token, nonce=rv["nonce"])
+    assert userinfo["email"] == email
+    return elapsed + time.perf_counter() - start
+
+
+async def _run(mode: str, idp: FakeIdP, logins: int) -> dict:
+    app = _client(mode, f"{idp.base_url}/.well-known/openid-configuration")
+    if mode == "cached+warm":
+        await app.warm_up()
+    requests_before, connections_before = sum(idp.requests.values()), len(idp.connections)
+    async with httpx.AsyncClient() as browser:
+        first = await _sign_in(app, browser, "first@example.com")
+        rest = [await _sign_in(app, browser, f"user{i}@example.com") for i in range(logins - 1)]
+    authorize_calls = logins  # the browser's requests, not the server's
+    return {
+        "first_ms": first * 1000,
+        "mean_ms": sum(rest) / len(rest) * 1000 if rest else float("nan"),
+        "requests": (sum(idp.requests.values()) - requests_before - authorize_calls) / logins,
+        "connections": (len(idp.connections) - connections_before - 1) / logins,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--connect-latency-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    idp = FakeIdP(f"http://127.0.0.1:{port}", args.latency_ms / 1000, args.connect_latency_ms / 1000)
+    server = _serve(idp, port)
+
+    async def run_all() -> None:
+        # one event loop for all modes, as in the app: the shared pool is bound to it
+        print(f"{'mode':>12}  {'first (ms)':>10}  {'then (ms)':>9}  {'IdP requests':>12}  {'connections':>11}   (per sign-in)")
+        for mode in ("stock", "cached", "cached+warm"):
+            result = await _run(mode, idp, args.logins)
+            print(
+                f"{mode:>12}  {result['first_ms']:>10.1f}  {result['mean_ms']:>9.1f}"
+                f"  {result['requests']:>12.2f}  {result['connections']:>11.2f}"
+            )
+        await close_pool()
+
+    asyncio.run(run_all())
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -12,11 +12,156 @@ GOOGLE_CLIENT_SECRET: str | None = os.getenv("GOOGLE_CLIENT_SECRET")
 # OAUTH_REDIRECT_URI: str = os.getenv("OAUTH_REDIRECT_URI", "http://127.0.0.1:8000/auth/google/callback")
 # По умолчанию пусть редирект вычисляется автоматически из входящего запроса
 OAUTH_REDIRECT_URI: str | None = os.getenv("OAUTH_REDIRECT_URI") or "auto"
+# для офлайн-проверки входа: python -m backend.auth.fake_idp и
+# GOOGLE_DISCOVERY_URL=http://127.0.0.1:9100/.well-known/openid-configuration
+GOOGLE_DISCOVERY_URL: str = os.getenv(
+    "GOOGLE_DISCOVERY_URL", "https://accounts.google.com/.well-known/openid-configuration"
+)
+# discovery и JWKS: кэш на max-age из ответа (или TTL), после — отдаём старое и обновляем в фоне
+OIDC_CACHE_TTL_SEC: int = int(os.getenv("OIDC_CACHE_TTL_SEC", "3600"))
+# токен с неизвестным kid: перечитать JWKS не чаще раза в N секунд
+OIDC_JWKS_MIN_REFETCH_SEC: int = int(os.getenv("OIDC_JWKS_MIN_REFETCH_SEC", "60"))
+OIDC_HTTP_MAX_CONNECTIONS: int = int(os.getenv("OIDC_HTTP_MAX_CONNECTIONS", "20"))
+OIDC_HTTP_TIMEOUT_SEC: float = float(os.getenv("OIDC_HTTP_TIMEOUT_SEC", "10"))
 
 # --- JWT ---
 JWT_SECRET: str = os.getenv("JWT_SECRET", "dev_secret_change_me")
 JWT_ALG: str = os.getenv("JWT_ALG", "HS256")
-JWT_EXPIRES_MIN: int = int(os.getenv("JWT_EXPIRES_MIN", "60"))
+# access-токен живёт недолго; продление — через refresh-токен (POST /auth/refresh)
+JWT_EXPIRES_MIN: int = int(os.getenv("JWT_EXPIRES_MIN", "15"))
+REFRESH_EXPIRES_DAYS: int = int(os.getenv("REFRESH_EXPIRES_DAYS", "30"))
+# два запроса с одним refresh-токеном (две вкладки) в пределах N секунд — не кража
+REFRESH_REUSE_GRACE_SEC: int = int(os.getenv("REFRESH_REUSE_GRACE_SEC", "10"))
+# отозванные сессии: Bloom-фильтр в памяти, пересобирается из revoked_sessions раз в N секунд
+# (отзыв в другом воркере виден не позже чем через N секунд)
+REVOCATION_REBUILD_SEC: int = int(os.getenv("REVOCATION_REBUILD_SEC", "30"))
+REVOCATION_FILTER_FP_RATE: float = float(os.getenv("REVOCATION_FILTER_FP_RATE", "0.001"))
+# ES256 / EdDSA: приватные ключи — PEM-файлы <kid>.pem в JWT_KEYS_DIR
+# (python -m backend.auth.tokens genkey), публичные — на /.well-known/jwks.json
+JWT_KEYS_DIR: str | None = os.getenv("JWT_KEYS_DIR")
+# каким ключом подписывать; по умолчанию — последним по имени (genkey даёт kid по времени)
+JWT_ACTIVE_KID: str | None = os.getenv("JWT_ACTIVE_KID")
+JWT_ISSUER: str | None = os.getenv("JWT_ISSUER", "brandbook")
+# после перехода с HS256 на ES256/EdDSA: ещё JWT_EXPIRES_MIN принимать старые токены по JWT_SECRET
+JWT_LEGACY_HS256: bool = os.getenv("JWT_LEGACY_HS256", "0") == "1"
+# успешно проверенные токены (по sha256) — до их exp, LRU
+JWT_VERIFY_CACHE_SIZE: int = int(os.getenv("JWT_VERIFY_CACHE_SIZE", "10000"))
 
 # --- DB ---
-DATABASE_URL: str | None = os.getenv("DATABASE_URL")
+# любой драйвер: async-движок всегда на asyncpg, sync (alembic, скрипты) — на psycopg2
+DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql+psycopg2://localhost:5432/brandbook")
+# пул на процесс: DB_POOL_SIZE постоянных соединений + до DB_MAX_OVERFLOW временных;
+# воркеров × (size + overflow) должно укладываться в max_connections сервера
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# сколько запрос ждёт свободное соединение, прежде чем получить ошибку
+DB_POOL_TIMEOUT_SEC: float = float(os.getenv("DB_POOL_TIMEOUT_SEC", "10"))
+# соединение старше N секунд закрывается при возврате (LB/PgBouncer рвут долгоживущие)
+DB_POOL_RECYCLE_SEC: int = int(os.getenv("DB_POOL_RECYCLE_SEC", "1800"))
+# SELECT 1 перед выдачей соединения из пула: мёртвые после рестарта БД не достаются запросу
+DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# предел на один запрос к БД, мс (0 — без предела)
+DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+# за PgBouncer в режиме pool_mode=transaction: без именованных prepared statements
+# и без параметров при подключении (statement_timeout тогда считает клиент)
+DB_PGBOUNCER: bool = os.getenv("DB_PGBOUNCER", "0") == "1"
+
+# --- Кэш пользователей для current_user ---
+PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SEC: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SEC", "60"))
+
+# --- Пароли (bcrypt в пуле процессов) ---
+BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_POOL_WORKERS: int = int(os.getenv("PASSWORD_POOL_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_POOL_MAX_PENDING: int = int(os.getenv("PASSWORD_POOL_MAX_PENDING", "64"))
+PASSWORD_POOL_RETRY_AFTER_SEC: int = int(os.getenv("PASSWORD_POOL_RETRY_AFTER_SEC", "2"))
+
+# --- Брендбуки: списки и пакетная загрузка ---
+BRANDBOOK_PAGE_SIZE_DEFAULT: int = int(os.getenv("BRANDBOOK_PAGE_SIZE_DEFAULT", "50"))
+BRANDBOOK_PAGE_SIZE_MAX: int = int(os.getenv("BRANDBOOK_PAGE_SIZE_MAX", "200"))
+BULK_ITEMS_MAX: int = int(os.getenv("BULK_ITEMS_MAX", "5000"))
+# предел тела пакетной загрузки и одной строки NDJSON — больше сразу 413, не читая дальше
+BULK_BODY_MAX_BYTES: int = int(os.getenv("BULK_BODY_MAX_BYTES", str(16 * 1024 * 1024)))
+BULK_LINE_MAX_BYTES: int = int(os.getenv("BULK_LINE_MAX_BYTES", str(64 * 1024)))
+
+# --- Файлы (content-addressed хранилище загрузок) ---
+UPLOAD_ROOT: str = os.getenv("UPLOAD_ROOT", "storage")
+MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+# незавершённая загрузка без новых байтов дольше N секунд удаляется вместе с её блокировкой
+UPLOAD_SESSION_TTL_SEC: int = int(os.getenv("UPLOAD_SESSION_TTL_SEC", str(24 * 3600)))
+DERIVATIVE_CACHE_MAX_BYTES: int = int(os.getenv("DERIVATIVE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+DERIVATIVE_POOL_WORKERS: int = int(os.getenv("DERIVATIVE_POOL_WORKERS", "2"))
+DERIVATIVE_MAX_DIM: int = int(os.getenv("DERIVATIVE_MAX_DIM", "4096"))
+
+# --- Экспорт брендбука (ZIP/PDF) ---
+# TTF со своей кириллицей; FreeType ищет его и в системных каталогах шрифтов
+EXPORT_PDF_FONT: str = os.getenv("EXPORT_PDF_FONT", "DejaVuSans.ttf")
+# свой пул потоков: медленные клиенты держат поток экспорта всё время скачивания,
+# и общий пул по умолчанию (поиск в кэше превью, файлы) не должен от этого голодать
+EXPORT_POOL_WORKERS: int = int(os.getenv("EXPORT_POOL_WORKERS", "4"))
+
+# --- Палитры (матрицы контраста и ΔE растут как n², поэтому ограничиваем n) ---
+PALETTE_MAX_COLOURS: int = int(os.getenv("PALETTE_MAX_COLOURS", "1000"))
+PALETTE_RAMP_STEPS_MAX: int = int(os.getenv("PALETTE_RAMP_STEPS_MAX", "12"))
+# индекс похожих цветов по всем брендбукам: сетка в Lab, ранжирование по ΔE2000
+PALETTE_INDEX_CELL: float = float(os.getenv("PALETTE_INDEX_CELL", "8"))
+PALETTE_INDEX_REFRESH_SEC: int = int(os.getenv("PALETTE_INDEX_REFRESH_SEC", "30"))
+# ID выдаются при INSERT, а видны строки после COMMIT, т.е. не по порядку: каждое обновление
+# перечитывает строки от курсора N обновлений назад (транзакции до N * REFRESH_SEC не теряются)
+PALETTE_INDEX_RESCAN_REFRESHES: int = int(os.getenv("PALETTE_INDEX_RESCAN_REFRESHES", "10"))
+PALETTE_SIMILAR_MAX_DELTA_E: float = float(os.getenv("PALETTE_SIMILAR_MAX_DELTA_E", "5"))
+PALETTE_SIMILAR_MAX_K: int = int(os.getenv("PALETTE_SIMILAR_MAX_K", "100"))
+
+# --- Секции: PATCH в формате JSON Patch (каждая операция — шаг в одном SQL-запросе), порядок ---
+SECTION_PATCH_MAX_OPS: int = int(os.getenv("SECTION_PATCH_MAX_OPS", "100"))
+# ключи порядка растут при вставках в одно место; длиннее порога — перенумеровываем в фоне
+SECTION_ORDER_KEY_REBALANCE_LEN: int = int(os.getenv("SECTION_ORDER_KEY_REBALANCE_LEN", "16"))
+
+# --- История версий брендбука ---
+# каждая N-я версия хранит полный манифест (хэши строк), остальные — только изменения;
+# чтение любой версии — не больше N строк истории и один запрос за снимками
+BRANDBOOK_VERSION_CHECKPOINT_EVERY: int = int(os.getenv("BRANDBOOK_VERSION_CHECKPOINT_EVERY", "20"))
+BRANDBOOK_VERSIONS_PAGE_SIZE_MAX: int = int(os.getenv("BRANDBOOK_VERSIONS_PAGE_SIZE_MAX", "200"))
+
+# --- Совместное редактирование (WebSocket /brandbooks/{id}/live) ---
+# правки за один тик уходят подписчикам одним кадром; отстающему клиенту вместо
+# бесконечного буфера — кадр "resync" (перезагрузить брендбук)
+LIVE_TICK_MS: int = int(os.getenv("LIVE_TICK_MS", "50"))
+LIVE_CLIENT_MAX_FRAMES: int = int(os.getenv("LIVE_CLIENT_MAX_FRAMES", "32"))
+LIVE_FRAME_MAX_EVENTS: int = int(os.getenv("LIVE_FRAME_MAX_EVENTS", "500"))
+# каналы живут в воркере; при нескольких воркерах (WEB_CONCURRENCY, как у uvicorn --workers)
+# правки между ними возит redis (PUBLISH / SUBSCRIBE на брендбук, сервер из REDIS_URL);
+# local — только в своём воркере, и тогда при WEB_CONCURRENCY > 1 маршрут /live отказывает
+LIVE_BUS: str = os.getenv("LIVE_BUS", "local")
+WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# --- Полнотекстовый поиск ---
+SEARCH_PAGE_SIZE_MAX: int = int(os.getenv("SEARCH_PAGE_SIZE_MAX", "50"))
+# лучшие совпадения на таблицу, которые идут в группировку и ts_headline
+SEARCH_HIT_CAP: int = int(os.getenv("SEARCH_HIT_CAP", "5000"))
+# ранжирование читает все совпадения: "co*" на миллионе строк — ~0.9 с; дольше — 422
+SEARCH_STATEMENT_TIMEOUT_MS: int = int(os.getenv("SEARCH_STATEMENT_TIMEOUT_MS", "3000"))
+SEARCH_HEADLINES_PER_BRANDBOOK: int = int(os.getenv("SEARCH_HEADLINES_PER_BRANDBOOK", "3"))
+
+# --- Кэш сериализованных ответов (GET /brandbooks/ и /brandbooks/{id}) ---
+# memory — LRU в процессе, только ответы по id (у каждого воркера свой кэш, и сброс
+# списков после записи до других воркеров не дошёл бы); redis — общий для всех
+# воркеров, кэширует и списки; off — выключен
+RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_TTL_SEC: int = int(os.getenv("RESPONSE_CACHE_TTL_SEC", "300"))
+REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# --- Статика фронтенда ---
+# сборка: python -m backend.static.build (хэши в именах + .br/.gz); без неё отдаём исходники
+FRONTEND_DIR: str = os.getenv("FRONTEND_DIR", "frontend")
+FRONTEND_BUILD_DIR: str = os.getenv("FRONTEND_BUILD_DIR", "build/frontend")
+FRONTEND_URL_PREFIX: str = "/frontend"
+
+# --- JSON-ответы ---
+# orjson — быстрый кодировщик для всех ответов (если установлен); stdlib — json из стандартной библиотеки
+JSON_RESPONSE_ENCODER: str = os.getenv("JSON_RESPONSE_ENCODER", "orjson")
+
+# --- Отладка ---
+# /debug/* (статистика пулов и кэшей, содержимое cookie и токена) — только если явно включено
+DEBUG_ENDPOINTS: bool = os.getenv("DEBUG_ENDPOINTS", "0") == "1"
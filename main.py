@@ -1,38 +1,79 @@
 # Импортируем FastAPI — основной класс для создания веб-приложения
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI, Request
 from starlette.middleware.sessions import SessionMiddleware
+import asyncio
 import os
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from contextlib import asynccontextmanager
 
 # Импортируем router из модуля users.routes — чтобы подключить роуты, связанные с пользователями
 from backend.users.routes import router as users_router
 from backend.brandbook.routes import router as brandbook_router
-from backend.auth.google import router as google_auth_router
+from backend.auth.google import router as google_auth_router, oauth as google_oauth
+from backend.auth import oidc
+from backend.auth.tokens import TokenError, router as tokens_router, token_service
+from backend.auth.sessions import router as sessions_router
+from backend.auth.revocation import revocations
+from backend.auth.principal_cache import principal_cache
+from backend.files.routes import router as files_router
+from backend.users import passwords
+from backend.files import derivatives
+from backend.brandbook import export
+from backend.brandbook.response_cache import response_cache
+from backend.brandbook.live import hub as live_hub
+from backend.brandbook.palette_index import palette_index
+from backend.responses import FastJSONRoute
+from backend.static.serving import frontend_files
+from config import DEBUG_ENDPOINTS, GOOGLE_CLIENT_ID
+import database
+
+
+# Старт/остановка приложения: здесь поднимаем и гасим фоновые ресурсы (пулы и т.п.)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # discovery и JWKS Google — заранее, чтобы первый вход не ждал их загрузки
+    if GOOGLE_CLIENT_ID:
+        asyncio.create_task(google_oauth.google.warm_up())
+    # Bloom-фильтр отозванных сессий: первая сборка сразу, дальше — раз в REVOCATION_REBUILD_SEC
+    revocations.start()
+    yield
+    passwords.shutdown_pool()
+    derivatives.shutdown_pool()
+    export.shutdown_pool()
+    await response_cache.close()
+    await live_hub.close()
+    await oidc.close_pool()
+    await revocations.close()
+    await database.async_engine.dispose()
+
 
 # Создаём экземпляр приложения FastAPI
-app = FastAPI(title="Brandbook API")  # Название API для документации
-app.mount('/frontend', StaticFiles(directory='frontend'), name='frontend')
+app = FastAPI(title="Brandbook API", lifespan=lifespan)  # Название API для документации
+# собранная статика (хэши в именах, .br/.gz), если есть сборка; иначе исходники из frontend/
+frontend = frontend_files()
+app.mount('/frontend', frontend, name='frontend')
 
 # Подключаем роутер users к основному приложению с префиксом /users (см. в users/routes.py)
 app.include_router(users_router)
 app.include_router(brandbook_router)
 app.include_router(google_auth_router)
+app.include_router(files_router)
+# /.well-known/jwks.json — публичные ключи для проверки наших токенов в других сервисах
+app.include_router(tokens_router)
+# /auth/refresh, /auth/logout
+app.include_router(sessions_router)
 
 app.add_middleware(
     SessionMiddleware,
     secret_key=os.getenv("JWT_SECRET", "supersecret"),  # ключ для подписи cookie
 )
 
-@app.get('/', response_class=FileResponse)
-async def read_home():
-    return FileResponse('frontend/index.html')
-
-from fastapi import Request, APIRouter
-from jose import jwt as jose_jwt, JWTError
-from config import JWT_SECRET, JWT_ALG
+@app.get('/', include_in_schema=False)
+async def read_home(request: Request):
+    # те же заголовки кэширования и сжатие, что и у /frontend/index.html
+    return await frontend.get_response('index.html', request.scope)
 
-debug = APIRouter()
+# /debug/* отдаёт cookie, содержимое токена и внутреннюю статистику — без DEBUG_ENDPOINTS=1 их нет
+debug = APIRouter(route_class=FastJSONRoute)
 
 @debug.get("/debug/whoami")
 def whoami(req: Request):
@@ -44,11 +85,52 @@ def debug_token(req: Request):
     if not tok:
         return {"has_cookie": False}
     try:
-        payload = jose_jwt.decode(tok, JWT_SECRET, algorithms=[JWT_ALG])
+        payload = token_service.verify(tok)
         return {"has_cookie": True, "payload": payload}
-    except JWTError as e:
+    except TokenError as e:
         return {"has_cookie": True, "decode_error": str(e)}
 
-app.include_router(debug)
+@debug.get("/debug/tokens")
+def token_service_stats():
+    return token_service.stats()
+
+@debug.get("/debug/revocations")
+def revocation_stats():
+    return revocations.stats()
+
+@debug.get("/debug/principal-cache")
+def principal_cache_stats():
+    return principal_cache.stats()
+
+@debug.get("/debug/password-pool")
+def password_pool_stats():
+    return passwords.stats.as_dict()
+
+@debug.get("/debug/derivative-cache")
+def derivative_cache_stats():
+    return derivatives.cache.stats()
+
+@debug.get("/debug/palette-index")
+def palette_index_stats():
+    return palette_index.stats()
+
+@debug.get("/debug/response-cache")
+def response_cache_stats():
+    return response_cache.stats()
+
+@debug.get("/debug/oidc")
+def oidc_stats():
+    return google_oauth.google.stats()
+
+@debug.get("/debug/live")
+def live_stats():
+    return live_hub.stats()
+
+@debug.get("/debug/db-pool")
+def db_pool_stats():
+    return database.pool_stats()
+
+if DEBUG_ENDPOINTS:
+    app.include_router(debug)
 
 
@@ -0,0 +1,59 @@
+"""sections jsonb
+
+Revision ID: 0b4d7e2a9c61
+Revises: f1a6c3d94b27
+Create Date: 2026-10-18 18:02:47.906113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b4d7e2a9c61'
+down_revision: Union[str, Sequence[str], None] = 'f1a6c3d94b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _search_vector(function: str) -> sa.Column:
+    return sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        f"setweight({function}('simple', content, '[\"string\"]'), 'C')",
+        persisted=True,
+    ), nullable=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # тип колонки нельзя менять, пока от неё зависит генерируемая search_vector:
+    # снимаем её, конвертируем content и создаём заново уже через jsonb_to_tsvector
+    op.drop_index('ix_sections_search', table_name='sections')
+    op.drop_column('sections', 'search_vector')
+    op.alter_column(
+        'sections', 'content',
+        type_=postgresql.JSONB(), existing_type=sa.JSON(), existing_nullable=False,
+        postgresql_using='content::jsonb',
+    )
+    op.add_column('sections', _search_vector('jsonb_to_tsvector'))
+    op.create_index('ix_sections_search', 'sections', ['search_vector'], postgresql_using='gin')
+    op.create_index(
+        'ix_sections_content', 'sections', ['content'],
+        postgresql_using='gin', postgresql_ops={'content': 'jsonb_path_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sections_content', table_name='sections')
+    op.drop_index('ix_sections_search', table_name='sections')
+    op.drop_column('sections', 'search_vector')
+    op.alter_column(
+        'sections', 'content',
+        type_=sa.JSON(), existing_type=postgresql.JSONB(), existing_nullable=False,
+        postgresql_using='content::json',
+    )
+    op.add_column('sections', _search_vector('json_to_tsvector'))
+    op.create_index('ix_sections_search', 'sections', ['search_vector'], postgresql_using='gin')
@@ -0,0 +1,77 @@
+"""section order keys
+
+Revision ID: 1c8e5f3a7d92
+Revises: 0b4d7e2a9c61
+Create Date: 2026-10-18 19:14:05.271840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c8e5f3a7d92'
+down_revision: Union[str, Sequence[str], None] = '0b4d7e2a9c61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+
+def _keys(count: int) -> list:
+    # то же, что backend.brandbook.ordering.evenly_spaced на момент миграции
+    width = 1
+    while 62 ** width <= count * 2:
+        width += 1
+    step = 62 ** width / (count + 1)
+    keys = []
+    for position in range(1, count + 1):
+        value, digits = round(position * step), []
+        for _ in range(width):
+            value, digit = divmod(value, 62)
+            digits.append(_DIGITS[digit])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sections', sa.Column('order_key', sa.String(collation='C'), nullable=True))
+
+    # ключи в текущем порядке: по "order", при равенстве — по id
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        'SELECT id, brandbook_id FROM sections ORDER BY brandbook_id, "order", id'
+    )).all()
+    by_brandbook: dict = {}
+    for section_id, brandbook_id in rows:
+        by_brandbook.setdefault(brandbook_id, []).append(section_id)
+    updates = [
+        {"id": section_id, "order_key": key}
+        for ids in by_brandbook.values()
+        for section_id, key in zip(ids, _keys(len(ids)))
+    ]
+    if updates:
+        conn.execute(sa.text("UPDATE sections SET order_key = :order_key WHERE id = :id"), updates)
+
+    op.alter_column('sections', 'order_key', nullable=False)
+    op.create_index('ix_sections_brandbook_order', 'sections', ['brandbook_id', 'order_key'])
+    # префикс нового индекса — отдельный индекс по brandbook_id больше не нужен
+    op.drop_index('ix_sections_brandbook_id', table_name='sections')
+    op.drop_column('sections', 'order')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('sections', sa.Column('order', sa.Integer(), nullable=True))
+    op.execute(
+        'UPDATE sections SET "order" = ranked.n FROM ('
+        ' SELECT id, row_number() OVER (PARTITION BY brandbook_id ORDER BY order_key, id) - 1 AS n'
+        ' FROM sections) AS ranked '
+        'WHERE sections.id = ranked.id'
+    )
+    op.create_index('ix_sections_brandbook_id', 'sections', ['brandbook_id'])
+    op.drop_index('ix_sections_brandbook_order', table_name='sections')
+    op.drop_column('sections', 'order_key')
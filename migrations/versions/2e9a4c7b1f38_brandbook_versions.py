@@ -0,0 +1,47 @@
+"""brandbook versions
+
+Revision ID: 2e9a4c7b1f38
+Revises: 1c8e5f3a7d92
+Create Date: 2026-10-18 21:03:27.514930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e9a4c7b1f38'
+down_revision: Union[str, Sequence[str], None] = '1c8e5f3a7d92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # снимки строк по хэшу содержимого: одинаковые строки разных версий хранятся один раз
+    op.create_table('version_snapshots',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('body', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    # PK (brandbook_id, number) заодно служит индексом для поиска ближайшего чекпоинта
+    op.create_table('brandbook_versions',
+    sa.Column('brandbook_id', sa.UUID(), nullable=False),
+    sa.Column('number', sa.Integer(), nullable=False),
+    sa.Column('label', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('checkpoint', sa.Boolean(), nullable=False),
+    sa.Column('changes', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('changed', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['brandbook_id'], ['brandbooks.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('brandbook_id', 'number')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('brandbook_versions')
+    op.drop_table('version_snapshots')
@@ -0,0 +1,39 @@
+"""brand items
+
+Revision ID: a3c91f0d5e21
+Revises: 7259fd37d7df
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c91f0d5e21'
+down_revision: Union[str, Sequence[str], None] = '7259fd37d7df'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('brand_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('brandbook_id', sa.UUID(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('link', sa.String(), nullable=False),
+    sa.Column('colour', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['brandbook_id'], ['brandbooks.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_brand_items_id'), 'brand_items', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_brand_items_id'), table_name='brand_items')
+    op.drop_table('brand_items')
@@ -0,0 +1,40 @@
+"""brandbook list indexes
+
+Revision ID: d84e1b7c2f60
+Revises: a3c91f0d5e21
+Create Date: 2026-10-18 11:02:15.553902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd84e1b7c2f60'
+down_revision: Union[str, Sequence[str], None] = 'a3c91f0d5e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # keyset-курсор строится по (created_at, id) — NULL в created_at ломает сравнение
+    op.execute("UPDATE brandbooks SET created_at = now() WHERE created_at IS NULL")
+    op.alter_column('brandbooks', 'created_at', existing_type=sa.DateTime(), nullable=False)
+
+    op.create_index('ix_brandbooks_user_created_id', 'brandbooks', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_brandbooks_user_updated', 'brandbooks', ['user_id', 'updated_at'])
+    op.create_index('ix_brandbooks_user_title_prefix', 'brandbooks', ['user_id', 'title'],
+                    postgresql_ops={'title': 'varchar_pattern_ops'})
+    op.create_index('ix_brand_items_brandbook_type', 'brand_items', ['brandbook_id', 'type'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_brand_items_brandbook_type', table_name='brand_items')
+    op.drop_index('ix_brandbooks_user_title_prefix', table_name='brandbooks')
+    op.drop_index('ix_brandbooks_user_updated', table_name='brandbooks')
+    op.drop_index('ix_brandbooks_user_created_id', table_name='brandbooks')
+    op.alter_column('brandbooks', 'created_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,34 @@
+"""uploaded file content hash
+
+Revision ID: e5f27a9c8b13
+Revises: d84e1b7c2f60
+Create Date: 2026-10-18 12:20:47.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f27a9c8b13'
+down_revision: Union[str, Sequence[str], None] = 'd84e1b7c2f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('uploaded_files', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('uploaded_files', sa.Column('content_type', sa.String(), nullable=True))
+    op.add_column('uploaded_files', sa.Column('size', sa.BigInteger(), nullable=True))
+    op.create_index(op.f('ix_uploaded_files_content_hash'), 'uploaded_files', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_uploaded_files_content_hash'), table_name='uploaded_files')
+    op.drop_column('uploaded_files', 'size')
+    op.drop_column('uploaded_files', 'content_type')
+    op.drop_column('uploaded_files', 'content_hash')
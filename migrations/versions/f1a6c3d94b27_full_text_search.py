@@ -0,0 +1,52 @@
+"""full text search
+
+Revision ID: f1a6c3d94b27
+Revises: e5f27a9c8b13
+Create Date: 2026-10-18 13:05:31.417260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a6c3d94b27'
+down_revision: Union[str, Sequence[str], None] = 'e5f27a9c8b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # STORED-колонки считаются PostgreSQL при каждой записи; добавление перезаписывает таблицу
+    op.add_column('brandbooks', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        "setweight(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(slug, '')), 'A')",
+        persisted=True,
+    ), nullable=True))
+    op.add_column('brand_items', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        "setweight(to_tsvector('simple', coalesce(name, '') || ' ' || type), 'B')",
+        persisted=True,
+    ), nullable=True))
+    op.add_column('sections', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        "setweight(json_to_tsvector('simple', content, '[\"string\"]'), 'C')",
+        persisted=True,
+    ), nullable=True))
+    op.create_index('ix_brandbooks_search', 'brandbooks', ['search_vector'], postgresql_using='gin')
+    op.create_index('ix_brand_items_search', 'brand_items', ['search_vector'], postgresql_using='gin')
+    op.create_index('ix_sections_search', 'sections', ['search_vector'], postgresql_using='gin')
+    # поиск по items/sections фильтрует по владельцу через JOIN brandbooks
+    op.create_index('ix_sections_brandbook_id', 'sections', ['brandbook_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sections_brandbook_id', table_name='sections')
+    op.drop_index('ix_sections_search', table_name='sections')
+    op.drop_index('ix_brand_items_search', table_name='brand_items')
+    op.drop_index('ix_brandbooks_search', table_name='brandbooks')
+    op.drop_column('sections', 'search_vector')
+    op.drop_column('brand_items', 'search_vector')
+    op.drop_column('brandbooks', 'search_vector')
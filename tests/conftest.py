@@ -0,0 +1,74 @@
+"""Shared fixtures for the tests that talk to the app and its database.
+
+They run against the PostgreSQL at ``DATABASE_URL`` (migrated to head) and are
+skipped when that database cannot be reached. Everything runs in the
+TestClient's event loop, so the app's own engine and pool are used as-is.
+"""
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select, text
+from sqlalchemy.exc import DBAPIError
+
+import database
+import main
+from backend.auth.revocation import revocations
+from backend.auth.tokens import token_service
+from backend.brandbook import models
+from backend.users.models import Section, UploadedFile, User
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as client:
+        try:
+            client.portal.call(_ping)
+        except (OSError, DBAPIError) as exc:
+            pytest.skip(f"PostgreSQL at DATABASE_URL is not reachable: {exc}")
+        # the revocation filter's first rebuild must not land inside a measured request
+        client.portal.call(_wait_for_revocations)
+        yield client
+
+
+@pytest.fixture
+def owner(client):
+    """A fresh user, signed in on ``client``; deleted with everything they own afterwards."""
+    user_id = client.portal.call(_create_user)
+    client.cookies.set("access_token", token_service.issue(user_id, sid=str(uuid.uuid4())))
+    client.get("/users/me")  # warm the principal cache
+    yield user_id
+    client.portal.call(_delete_user, user_id)
+
+
+async def _ping():
+    async with database.AsyncSessionLocal() as db:
+        await db.execute(text("SELECT 1"))
+
+
+async def _wait_for_revocations():
+    while not revocations.loaded:
+        await asyncio.sleep(0.01)
+
+
+async def _create_user() -> uuid.UUID:
+    async with database.AsyncSessionLocal() as db:
+        user = User(first_name="Test", last_name="User", email=f"{uuid.uuid4().hex}@test.invalid")
+        db.add(user)
+        await db.commit()
+        return user.id
+
+
+async def _delete_user(user_id: uuid.UUID) -> None:
+    async with database.AsyncSessionLocal() as db:
+        ids = select(models.Brandbook.id).where(models.Brandbook.user_id == user_id)
+        await db.execute(delete(models.BrandItem).where(models.BrandItem.brandbook_id.in_(ids)))
+        await db.execute(delete(Section).where(Section.brandbook_id.in_(ids)))
+        await db.execute(delete(UploadedFile).where(UploadedFile.brandbook_id.in_(ids)))
+        await db.execute(delete(models.BrandbookVersion).where(models.BrandbookVersion.brandbook_id.in_(ids)))
+        await db.execute(delete(models.Brandbook).where(models.Brandbook.user_id == user_id))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
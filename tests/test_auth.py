@@ -0,0 +1,38 @@
+"""Access tokens must belong to a session, a revoked session locks its tokens out, and /debug is off.
+
+Needs the database; see the fixtures in conftest.py.
+"""
+from __future__ import annotations
+
+import uuid
+
+import database
+from backend.auth.sessions import revoke_session
+from backend.auth.tokens import token_service
+
+
+async def _revoke(session_id: uuid.UUID) -> None:
+    async with database.AsyncSessionLocal() as db:
+        await revoke_session(db, session_id)
+
+
+def _me(client, token):
+    client.cookies.set("access_token", token)
+    return client.get("/users/me")
+
+
+def test_token_without_session_is_rejected(client, owner):
+    assert _me(client, token_service.issue(owner)).status_code == 401
+
+
+def test_revoked_session_is_rejected(client, owner):
+    session_id = uuid.uuid4()
+    token = token_service.issue(owner, sid=str(session_id))
+    assert _me(client, token).status_code == 200
+    client.portal.call(_revoke, session_id)
+    assert _me(client, token).status_code == 401
+
+
+def test_debug_endpoints_are_off_by_default(client, owner):
+    for path in ["/debug/whoami", "/debug/token", "/debug/db-pool", "/debug/response-cache"]:
+        assert client.get(path).status_code == 404, path
@@ -0,0 +1,85 @@
+"""Query counts of the brand book list and detail endpoints do not grow with the data.
+
+Needs the database; see the fixtures in conftest.py.
+"""
+from __future__ import annotations
+
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+
+import database
+from backend.brandbook import crud, models, schemas
+
+N = 3
+ITEMS = 2
+
+
+async def _seed(owner_id: uuid.UUID, brandbooks: int, items: int) -> uuid.UUID:
+    """Add brand books with items; returns the id of the last one."""
+    async with database.AsyncSessionLocal() as db:
+        for n in range(brandbooks):
+            brandbook = models.Brandbook(
+                title=f"Brand {n}",
+                slug=f"brand-{uuid.uuid4().hex[:8]}",
+                user_id=owner_id,
+                items=[
+                    models.BrandItem(type="colour", link=f"item-{i}", colour="#ff0000")
+                    for i in range(items)
+                ],
+            )
+            db.add(brandbook)
+        # commit_write bumps the owner's list generation, so the next list is a cache miss
+        await crud.commit_write(db, owner_id)
+        return brandbook.id
+
+
+def _count_statements(client: TestClient, url: str) -> int:
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(database.async_engine.sync_engine, "before_cursor_execute", count)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def test_list_and_detail_query_counts_do_not_grow(client, owner):
+    small = client.portal.call(_seed, owner, N, ITEMS)
+    list_small = _count_statements(client, "/brandbooks/")
+    detail_small = _count_statements(client, f"/brandbooks/{small}")
+
+    large = client.portal.call(_seed, owner, 9 * N, 10 * ITEMS)
+    list_large = _count_statements(client, "/brandbooks/")
+    detail_large = _count_statements(client, f"/brandbooks/{large}")
+
+    assert len(client.get("/brandbooks/").json()) == 10 * N
+    assert len(client.get(f"/brandbooks/{large}").json()["items"]) == 10 * ITEMS
+
+    assert list_small and detail_small  # both were cache misses
+    assert list_small == list_large
+    assert detail_small == detail_large
+
+
+async def _load_and_touch(owner_id: uuid.UUID, brandbook_id: uuid.UUID, schema, relationship: str):
+    async with database.AsyncSessionLocal() as db:
+        brandbook = await crud.get_brandbook(db, owner_id=owner_id, brandbook_id=brandbook_id, schema=schema)
+        return getattr(brandbook, relationship)
+
+
+def test_unloaded_relationships_raise(client, owner):
+    brandbook_id = client.portal.call(_seed, owner, 1, ITEMS)
+    # what the schema serializes is loaded up front
+    items = client.portal.call(_load_and_touch, owner, brandbook_id, schemas.BrandBookRead, "items")
+    assert len(items) == ITEMS
+    # anything else raises instead of lazily issuing a query
+    with pytest.raises(InvalidRequestError):
+        client.portal.call(_load_and_touch, owner, brandbook_id, schemas.BrandBookRead, "sections")
@@ -0,0 +1,98 @@
+"""Colour maths against published reference values.
+
+CIEDE2000 is checked against the 34 pairs of Sharma, Wu & Dalal (2005), which
+exercise the hue-averaging and achromatic edge cases; WCAG contrast and the
+Lab/OKLCH conversions against well-known colours.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.brandbook import colour
+
+# (L1, a1, b1), (L2, a2, b2), ΔE00
+SHARMA_PAIRS = [
+    ((50.0000, 2.6772, -79.7751), (50.0000, 0.0000, -82.7485), 2.0425),
+    ((50.0000, 3.1571, -77.2803), (50.0000, 0.0000, -82.7485), 2.8615),
+    ((50.0000, 2.8361, -74.0200), (50.0000, 0.0000, -82.7485), 3.4412),
+    ((50.0000, -1.3802, -84.2814), (50.0000, 0.0000, -82.7485), 1.0000),
+    ((50.0000, -1.1848, -84.8006), (50.0000, 0.0000, -82.7485), 1.0000),
+    ((50.0000, -0.9009, -85.5211), (50.0000, 0.0000, -82.7485), 1.0000),
+    ((50.0000, 0.0000, 0.0000), (50.0000, -1.0000, 2.0000), 2.3669),
+    ((50.0000, -1.0000, 2.0000), (50.0000, 0.0000, 0.0000), 2.3669),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0009), 7.1792),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0010), 7.1792),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0011), 7.2195),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0012), 7.2195),
+    ((50.0000, -0.0010, 2.4900), (50.0000, 0.0009, -2.4900), 4.8045),
+    ((50.0000, -0.0010, 2.4900), (50.0000, 0.0010, -2.4900), 4.8045),
+    ((50.0000, -0.0010, 2.4900), (50.0000, 0.0011, -2.4900), 4.7461),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 0.0000, -2.5000), 4.3065),
+    ((50.0000, 2.5000, 0.0000), (73.0000, 25.0000, -18.0000), 27.1492),
+    ((50.0000, 2.5000, 0.0000), (61.0000, -5.0000, 29.0000), 22.8977),
+    ((50.0000, 2.5000, 0.0000), (56.0000, -27.0000, -3.0000), 31.9030),
+    ((50.0000, 2.5000, 0.0000), (58.0000, 24.0000, 15.0000), 19.4535),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 3.1736, 0.5854), 1.0000),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 3.2972, 0.0000), 1.0000),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 1.8634, 0.5757), 1.0000),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 3.2592, 0.3350), 1.0000),
+    ((60.2574, -34.0099, 36.2677), (60.4626, -34.1751, 39.4387), 1.2644),
+    ((63.0109, -31.0961, -5.8663), (62.8187, -29.7946, -4.0864), 1.2630),
+    ((61.2901, 3.7196, -5.3901), (61.4292, 2.2480, -4.9620), 1.8731),
+    ((35.0831, -44.1164, 3.7933), (35.0232, -40.0716, 1.5901), 1.8645),
+    ((22.7233, 20.0904, -46.6940), (23.0331, 14.9730, -42.5619), 2.0373),
+    ((36.4612, 47.8580, 18.3852), (36.2715, 50.5065, 21.2231), 1.4146),
+    ((90.8027, -2.0831, 1.4410), (91.1528, -1.6435, 0.0447), 1.4441),
+    ((90.9257, -0.5406, -0.9208), (88.6381, -0.8985, -0.7239), 1.5381),
+    ((6.7747, -0.2908, -2.4247), (5.8714, -0.0985, -2.2286), 0.6377),
+    ((2.0776, 0.0795, -1.1350), (0.9033, -0.0636, -0.5514), 0.9082),
+]
+
+
+def test_ciede2000_matches_sharma_reference_pairs():
+    lab1 = np.array([pair[0] for pair in SHARMA_PAIRS])
+    lab2 = np.array([pair[1] for pair in SHARMA_PAIRS])
+    expected = np.array([pair[2] for pair in SHARMA_PAIRS])
+
+    # the function is pairwise over all rows; the reference pairs are its diagonal
+    assert np.diagonal(colour.ciede2000(lab1, lab2)) == pytest.approx(expected, abs=1e-4)
+    # and the formula is symmetric
+    assert np.diagonal(colour.ciede2000(lab2, lab1)) == pytest.approx(expected, abs=1e-4)
+
+
+def test_ciede2000_of_identical_colours_is_zero():
+    lab = colour.srgb_to_lab(colour.parse_hex(["#000", "#fff", "#3366cc", "#808080"]))
+    assert np.diagonal(colour.ciede2000(lab, lab)) == pytest.approx(0, abs=1e-9)
+
+
+@pytest.mark.parametrize("first, second, ratio", [
+    ("#000000", "#ffffff", 21.0),
+    ("#ffffff", "#ffffff", 1.0),
+    ("#767676", "#ffffff", 4.54),  # the lightest grey that passes AA on white
+    ("#777777", "#ffffff", 4.48),
+    ("#ff0000", "#ffffff", 4.0),
+    ("#0000ff", "#000000", 2.44),
+])
+def test_wcag_contrast_of_known_pairs(first, second, ratio):
+    matrix = colour.contrast_matrix(colour.parse_hex([first, second]))
+    assert matrix[0, 1] == pytest.approx(ratio, abs=0.005)
+    assert matrix[1, 0] == matrix[0, 1]
+    assert np.diagonal(matrix) == pytest.approx([1, 1])
+
+
+def test_lab_and_oklch_of_known_colours():
+    srgb = colour.parse_hex(["#ffffff", "#000000", "#ff0000"])
+    assert colour.srgb_to_lab(srgb) == pytest.approx(
+        np.array([[100, 0, 0], [0, 0, 0], [53.2408, 80.0925, 67.2032]]), abs=1e-3
+    )
+    oklch = colour.srgb_to_oklch(srgb)
+    assert oklch[:2] == pytest.approx(np.array([[1, 0, 0], [0, 0, 0]]), abs=1e-4)
+    assert oklch[2] == pytest.approx([0.62796, 0.25768, 29.2339], abs=1e-3)
+
+
+def test_parse_hex_reports_every_invalid_position():
+    with pytest.raises(colour.ColourParseError) as exc:
+        colour.parse_hex(["#fff", "red", "#12345", "0f0"])
+    assert exc.value.invalid == [1, 2]
+    assert colour.to_hex(colour.parse_hex(["F0a", "#00FF7f"])) == ["#ff00aa", "#00ff7f"]
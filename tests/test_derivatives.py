@@ -0,0 +1,76 @@
+"""Concurrent requests for the same derivative share one render."""
+from __future__ import annotations
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.files import derivatives
+
+
+@pytest.fixture
+def renders(tmp_path, monkeypatch):
+    """Renders run in a thread and wait for ``renders.release``; ``renders.done`` lists what was written."""
+    release, done = threading.Event(), []
+
+    def render(src, dst, transform):
+        release.wait(5)
+        with open(dst, "wb") as fh:
+            fh.write(b"variant")
+        done.append(dst)
+        return 7
+
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(derivatives, "cache", derivatives.DerivativeCache(tmp_path / "cache", 1 << 20))
+    monkeypatch.setattr(derivatives, "_get_pool", lambda: pool)
+    monkeypatch.setattr(derivatives, "_render", render)
+    yield SimpleNamespace(release=release, done=done)
+    release.set()
+    pool.shutdown()
+
+
+async def _first_request_goes_away(source):
+    transform = derivatives.Transform(width=16)
+    first = asyncio.ensure_future(derivatives.get_derivative(source, "abc", transform))
+    second = asyncio.ensure_future(derivatives.get_derivative(source, "abc", transform))
+    await asyncio.sleep(0.05)
+    first.cancel()  # e.g. the client disconnected
+    await asyncio.sleep(0.05)
+    return first, second
+
+
+def test_cancelled_request_does_not_cancel_the_render(tmp_path, renders):
+    source = tmp_path / "source.png"
+    source.write_bytes(b"not read by the stub")
+
+    async def scenario():
+        first, second = await _first_request_goes_away(source)
+        assert first.cancelled() and not second.done()
+        renders.release.set()
+        return await asyncio.wait_for(second, 5)
+
+    path = asyncio.run(scenario())
+    assert path.read_bytes() == b"variant"
+    assert renders.done == [str(path)]
+    assert derivatives._inflight == {}
+
+
+def test_render_finishes_when_every_request_goes_away(tmp_path, renders):
+    source = tmp_path / "source.png"
+    source.write_bytes(b"not read by the stub")
+
+    async def scenario():
+        first, second = await _first_request_goes_away(source)
+        second.cancel()
+        renders.release.set()
+        while derivatives._inflight:
+            await asyncio.sleep(0.01)
+        # the finished variant is cached for the next request
+        return await derivatives.get_derivative(source, "abc", derivatives.Transform(width=16))
+
+    path = asyncio.run(scenario())
+    assert len(renders.done) == 1 and derivatives.cache.stats()["hits"] == 1
+    assert path.read_bytes() == b"variant"
@@ -0,0 +1,164 @@
+"""JSON Patch: pointer parsing and step compilation, and a round trip through PostgreSQL.
+
+The round-trip tests need the database; see the fixtures in conftest.py.
+"""
+from __future__ import annotations
+
+import asyncio
+import uuid
+import warnings
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import SAWarning
+
+import database
+from backend.brandbook import crud, json_patch
+from backend.brandbook.schemas import JsonPatchOperation
+from backend.users.models import Section
+
+
+def _ops(*operations):
+    return [JsonPatchOperation.model_validate(op) for op in operations]
+
+
+@pytest.mark.parametrize("pointer, tokens", [
+    ("", []),
+    ("/", [""]),
+    ("/a/0", ["a", "0"]),
+    ("/a~1b", ["a/b"]),
+    ("/m~0n", ["m~n"]),
+    ("/~01", ["~1"]),  # ~0 is decoded after ~1, so this is "~1", not "/"
+    ("/a//b", ["a", "", "b"]),
+])
+def test_parse_pointer(pointer, tokens):
+    assert json_patch.parse_pointer(pointer) == tokens
+
+
+def test_parse_pointer_needs_leading_slash():
+    with pytest.raises(ValueError):
+        json_patch.parse_pointer("a/b")
+
+
+def test_steps_per_operation():
+    steps = json_patch._steps(_ops(
+        {"op": "add", "path": "/a", "value": 1},
+        {"op": "remove", "path": "/b"},
+        {"op": "replace", "path": "/c", "value": None},
+        {"op": "test", "path": "/d", "value": "x"},
+        {"op": "move", "from": "/e", "path": "/f"},
+        {"op": "move", "from": "/g", "path": "/g"},
+        {"op": "copy", "from": "/h", "path": "/i"},
+    ))
+    # move and copy take two steps (take/pick, then add); a move onto itself is a test
+    assert [index for index, _ in steps] == [0, 1, 2, 3, 4, 4, 5, 6, 6]
+    assert [step.func for _, step in steps] == [
+        json_patch._add_step, json_patch._remove_step, json_patch._replace_step, json_patch._test_step,
+        json_patch._take_step, json_patch._add_carried_step, json_patch._test_exists_step,
+        json_patch._pick_step, json_patch._add_carried_step,
+    ]
+    assert steps[4][1].args == (["e"],)
+    assert steps[5][1].args == (["f"],)
+
+
+@pytest.mark.parametrize("operation, message", [
+    ({"op": "add", "path": "/a"}, "needs a value"),
+    ({"op": "replace", "path": "/a"}, "needs a value"),
+    ({"op": "test", "path": "/a"}, "needs a value"),
+    ({"op": "move", "path": "/a"}, "needs 'from'"),
+    ({"op": "copy", "path": "/a"}, "needs 'from'"),
+    ({"op": "remove", "path": ""}, "whole document"),
+    ({"op": "move", "from": "/a", "path": "/a/b"}, "its own children"),
+    ({"op": "add", "path": "a", "value": 1}, "must start with '/'"),
+    ({"op": "copy", "from": "x", "path": "/a"}, "must start with '/'"),
+])
+def test_malformed_operations(operation, message):
+    with pytest.raises(json_patch.JsonPatchError, match=message) as exc:
+        json_patch._steps(_ops({"op": "test", "path": "", "value": {}}, operation))
+    assert exc.value.index == 1
+    assert not isinstance(exc.value, json_patch.JsonPatchConflict)
+
+
+def test_explicit_null_value_is_a_value():
+    [(_, step)] = json_patch._steps(_ops({"op": "add", "path": "/a", "value": None}))
+    assert step.func is json_patch._add_step
+
+
+# --- through the API and PostgreSQL ---
+
+@pytest.fixture
+def section_url(client, owner):
+    created = client.post("/brandbooks/", json={"title": "Patch me"})
+    assert created.status_code == 201, created.text
+    url = f"/brandbooks/{created.json()['id']}/sections"
+    section = client.post(url, json={"type": "colors", "content": {
+        "palette": [{"hex": "#ff0000"}, {"hex": "#00ff00"}], "notes": {"a~b": 1, "c/d": 2},
+    }})
+    assert section.status_code == 201, section.text
+    return f"{url}/{section.json()['id']}"
+
+
+def _patch(client, url, *operations):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", SAWarning)  # e.g. a cartesian product in the UPDATE
+        return client.patch(url, json=list(operations), headers={"Content-Type": "application/json-patch+json"})
+
+
+def test_patch_round_trip(client, section_url):
+    response = _patch(
+        client, section_url,
+        {"op": "test", "path": "/palette/0/hex", "value": "#ff0000"},
+        {"op": "add", "path": "/palette/-", "value": {"hex": "#0000ff"}},
+        {"op": "add", "path": "/palette/0", "value": {"hex": "#000000"}},
+        {"op": "remove", "path": "/notes/a~0b"},
+        {"op": "replace", "path": "/notes/c~1d", "value": 3},
+        {"op": "move", "from": "/palette/1", "path": "/primary"},
+        {"op": "copy", "from": "/primary", "path": "/accent"},
+    )
+    assert response.status_code == 204, response.text
+    assert client.get(section_url).json()["content"] == {
+        "palette": [{"hex": "#000000"}, {"hex": "#00ff00"}, {"hex": "#0000ff"}],
+        "notes": {"c/d": 3},
+        "primary": {"hex": "#ff0000"},
+        "accent": {"hex": "#ff0000"},
+    }
+
+
+@pytest.mark.parametrize("failing", [
+    {"op": "test", "path": "/palette/0/hex", "value": "#123456"},
+    {"op": "remove", "path": "/missing"},
+    {"op": "replace", "path": "/palette/5", "value": 1},
+    {"op": "add", "path": "/palette/3", "value": 1},  # past the end: only "-" or an index <= length
+])
+def test_failed_operation_writes_nothing(client, section_url, failing):
+    before = client.get(section_url).json()
+    response = _patch(client, section_url, {"op": "add", "path": "/new", "value": 1}, failing)
+    assert response.status_code == 409, response.text
+    assert response.json()["detail"]["index"] == 1
+    after = client.get(section_url).json()
+    assert after["content"] == before["content"]
+
+
+def test_patch_of_unknown_section(client, section_url):
+    url = section_url.rsplit("/", 1)[0] + "/00000000-0000-0000-0000-000000000000"
+    assert _patch(client, url, {"op": "add", "path": "/a", "value": 1}).status_code == 404
+
+
+async def _patch_alongside_rekey(owner_id, brandbook_id, section_id):
+    """A patch racing a writer that locks the brand book, then its sections (like rebalance_sections)."""
+    async with database.AsyncSessionLocal() as writer, database.AsyncSessionLocal() as patcher:
+        await crud.touch_brandbook(writer, brandbook_id)
+        patch = asyncio.create_task(crud.patch_section(
+            patcher, owner_id, brandbook_id, section_id, _ops({"op": "add", "path": "/x", "value": 1}),
+        ))
+        await asyncio.sleep(0.2)  # the patch is now waiting for a lock
+        await writer.execute(text("SET LOCAL lock_timeout = '2s'"))
+        await writer.execute(select(Section.id).where(Section.id == section_id).with_for_update())
+        await writer.commit()
+        return await asyncio.wait_for(patch, 5)
+
+
+def test_patch_takes_brandbook_lock_first(client, owner, section_url):
+    *_, brandbook_id, _, section_id = section_url.split("/")
+    assert client.portal.call(_patch_alongside_rekey, owner, uuid.UUID(brandbook_id), uuid.UUID(section_id))
+    assert client.get(section_url).json()["content"]["x"] == 1
@@ -0,0 +1,195 @@
+"""Live updates: one frame per tick, resync for clients that fall behind, fan-out between workers.
+
+The last test needs the database; see the fixtures in conftest.py.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from backend.brandbook import live, routes
+from backend.brandbook.live import RESYNC, Hub, RedisBus
+
+BRANDBOOK = uuid.uuid4()
+
+
+def _frames(subscriber):
+    frames = []
+    while not subscriber.queue.empty():
+        frames.append(json.loads(subscriber.queue.get_nowait()))
+    return frames
+
+
+def _event(n):
+    return {"type": "item.created", "id": n}
+
+
+def test_events_of_one_tick_become_one_frame():
+    hub = Hub(tick=3600, max_frames=4, max_events=10)  # ticks are driven by hand
+
+    async def run():
+        async with hub.subscribe(BRANDBOOK, None) as first, hub.subscribe(BRANDBOOK, None) as second:
+            for n in range(3):
+                hub.publish(BRANDBOOK, _event(n))
+            hub.publish(uuid.uuid4(), _event(99))  # nobody watching: dropped
+            hub.flush()
+            hub.flush()  # nothing new: no empty frame
+            assert _frames(first) == _frames(second) == [
+                {"brandbook_id": str(BRANDBOOK), "events": [_event(0), _event(1), _event(2)]},
+            ]
+            for n in range(11):  # more than max_events in one tick
+                hub.publish(BRANDBOOK, _event(n))
+            hub.flush()
+            assert _frames(first) == [{"brandbook_id": str(BRANDBOOK), "events": [RESYNC]}]
+        await hub.close()
+
+    asyncio.run(run())
+    assert hub.frames == 2 and hub.deliveries == 4
+    assert hub.stats()["channels"] == 0
+
+
+def test_full_queue_is_replaced_by_resync():
+    hub = Hub(tick=3600, max_frames=2, max_events=10)
+
+    async def run():
+        async with hub.subscribe(BRANDBOOK, None) as slow:
+            for n in range(3):
+                hub.publish(BRANDBOOK, _event(n))
+                hub.flush()
+            # the backlog is gone: one resync frame, whatever the client missed
+            assert _frames(slow) == [{"brandbook_id": str(BRANDBOOK), "events": [RESYNC]}]
+            # once it drains, frames flow again
+            hub.publish(BRANDBOOK, _event(3))
+            hub.flush()
+            assert _frames(slow) == [{"brandbook_id": str(BRANDBOOK), "events": [_event(3)]}]
+        await hub.close()
+
+    asyncio.run(run())
+    assert hub.resyncs == 1
+
+
+# --- between workers, through a Redis-protocol server ---
+
+class _PubSubServer:
+    """Just enough of SUBSCRIBE / UNSUBSCRIBE / PUBLISH for the bus."""
+
+    def __init__(self):
+        self.subscriptions = {}  # writer -> channels
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return "redis://127.0.0.1:%d/0" % self.server.sockets[0].getsockname()[1]
+
+    @staticmethod
+    def _reply(*parts) -> bytes:
+        out = [b"*%d\r\n" % len(parts)]
+        for part in parts:
+            if isinstance(part, int):
+                out.append(b":%d\r\n" % part)
+            else:
+                out.append(b"$%d\r\n%s\r\n" % (len(part), part))
+        return b"".join(out)
+
+    async def _serve(self, reader, writer):
+        channels = self.subscriptions[writer] = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                count = int(line[1:])
+                args = []
+                for _ in range(count):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                command, rest = args[0].upper(), args[1:]
+                if command == b"SUBSCRIBE":
+                    for channel in rest:
+                        channels.add(channel)
+                        writer.write(self._reply(b"subscribe", channel, len(channels)))
+                elif command == b"UNSUBSCRIBE":
+                    for channel in rest:
+                        channels.discard(channel)
+                        writer.write(self._reply(b"unsubscribe", channel, len(channels)))
+                elif command == b"PUBLISH":
+                    receivers = [w for w, subscribed in self.subscriptions.items() if rest[0] in subscribed]
+                    for other in receivers:
+                        other.write(self._reply(b"message", rest[0], rest[1]))
+                    writer.write(b":%d\r\n" % len(receivers))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            del self.subscriptions[writer]
+            writer.close()
+
+    def drop_connections(self):
+        for writer in list(self.subscriptions):
+            writer.transport.abort()
+
+    def subscribers(self, brandbook_id) -> int:
+        channel = f"live:{brandbook_id}".encode()
+        return sum(channel in channels for channels in self.subscriptions.values())
+
+    async def close(self):
+        self.drop_connections()
+        await _until(lambda: not self.subscriptions)
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def _until(condition, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_events_reach_clients_of_other_workers():
+    async def run():
+        server = _PubSubServer()
+        url = await server.start()
+        writer = Hub(0.01, 8, 10, bus=RedisBus(url, retry_after=0.05))
+        reader = Hub(0.01, 8, 10, bus=RedisBus(url, retry_after=0.05))
+        try:
+            async with writer.subscribe(BRANDBOOK, None) as local, reader.subscribe(BRANDBOOK, None) as remote:
+                await _until(lambda: server.subscribers(BRANDBOOK) == 2)
+                writer.publish(BRANDBOOK, _event(1))
+                writer.publish(BRANDBOOK, _event(2))
+                await _until(lambda: not remote.queue.empty())
+                expected = [{"brandbook_id": str(BRANDBOOK), "events": [_event(1), _event(2)]}]
+                assert _frames(remote) == expected
+                await asyncio.sleep(0.05)
+                assert _frames(local) == expected  # its own message from the bus is skipped
+
+                # a lost bus connection may have lost messages: every client reloads
+                server.drop_connections()
+                await _until(lambda: not remote.queue.empty() and not local.queue.empty())
+                assert _frames(remote) == _frames(local) == [{"brandbook_id": str(BRANDBOOK), "events": [RESYNC]}]
+                await _until(lambda: server.subscribers(BRANDBOOK) == 2)
+                reader.publish(BRANDBOOK, _event(3))
+                await _until(lambda: not local.queue.empty())
+                assert _frames(local) == [{"brandbook_id": str(BRANDBOOK), "events": [_event(3)]}]
+
+            await _until(lambda: server.subscribers(BRANDBOOK) == 0)
+        finally:
+            await writer.close()
+            await reader.close()
+            await server.close()
+
+    asyncio.run(run())
+
+
+def test_local_bus_refuses_several_workers(client, owner, monkeypatch):
+    monkeypatch.setattr(routes, "WEB_CONCURRENCY", 2)
+    monkeypatch.setattr(live.hub, "bus", None)
+    brandbook_id = client.post("/brandbooks/", json={"title": "Live"}).json()["id"]
+    with client.websocket_connect(f"/brandbooks/{brandbook_id}/live") as websocket:
+        with pytest.raises(WebSocketDisconnect) as exc:
+            websocket.receive_text()
+    assert exc.value.code == 1011
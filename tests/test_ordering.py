@@ -0,0 +1,76 @@
+"""Properties of the fractional section ordering keys.
+
+Randomized with a fixed seed: a key inserted anywhere must sort strictly
+between its neighbours, bytewise, and never end in "0" (a trailing zero would
+spell the same fraction as the key without it).
+"""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from backend.brandbook.ordering import DIGITS, evenly_spaced, key_between
+
+
+def _assert_valid(keys):
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+    for key in keys:
+        assert key and not key.endswith("0")
+        assert set(key) <= set(DIGITS)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_inserts_keep_strict_order(seed):
+    rng = random.Random(seed)
+    keys = []
+    for _ in range(2000):
+        position = rng.randint(0, len(keys))
+        before = keys[position - 1] if position else None
+        after = keys[position] if position < len(keys) else None
+        key = key_between(before, after)
+        assert before is None or before < key
+        assert after is None or key < after
+        keys.insert(position, key)
+    _assert_valid(keys)
+
+
+@pytest.mark.parametrize("where", ["start", "end", "middle"])
+def test_repeated_inserts_at_one_spot(where):
+    keys = ["V", "k"]
+    for _ in range(500):
+        if where == "start":
+            keys.insert(0, key_between(None, keys[0]))
+        elif where == "end":
+            keys.append(key_between(keys[-1], None))
+        else:
+            keys.insert(1, key_between(keys[0], keys[1]))
+    _assert_valid(keys)
+
+
+@pytest.mark.parametrize("before, after", [
+    ("1", "2"), ("1", "11"), ("zz", None), (None, "01"), (None, "1"), ("0z", "1"), ("A", "A1"),
+])
+def test_key_between_edge_cases(before, after):
+    key = key_between(before, after)
+    assert before is None or before < key
+    assert after is None or key < after
+    assert not key.endswith("0")
+
+
+def test_key_between_rejects_unordered_neighbours():
+    with pytest.raises(ValueError):
+        key_between("b", "a")
+    with pytest.raises(ValueError):
+        key_between("a", "a")
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 30, 31, 62, 1000, 5000])
+def test_evenly_spaced(count):
+    keys = evenly_spaced(count)
+    assert len(keys) == count
+    _assert_valid(keys)
+    # the result leaves room on both sides and between neighbours
+    if keys:
+        _assert_valid([key_between(None, keys[0])] + keys + [key_between(keys[-1], None)])
@@ -0,0 +1,158 @@
+"""The palette similarity index returns exactly what a brute-force ΔE2000 scan does.
+
+The refresh test needs the database; see the fixtures in conftest.py.
+"""
+from __future__ import annotations
+
+import random
+import uuid
+
+import numpy as np
+import pytest
+
+import database
+from backend.brandbook import colour, crud, models
+from backend.brandbook.palette_index import PaletteIndex
+
+BRANDBOOKS = [uuid.uuid4() for _ in range(5)]
+
+
+def _rows(seed: int, count: int):
+    rng = random.Random(seed)
+    return [
+        (item_id, rng.choice(BRANDBOOKS), f"#{rng.randrange(1 << 24):06x}")
+        for item_id in range(1, count + 1)
+    ]
+
+
+def _brute_force(rows, hex_colour, max_delta_e, keep=lambda row: True):
+    lab = colour.srgb_to_lab(colour.parse_hex([hex_colour]))
+    kept = [row for row in rows if keep(row)]
+    distances = colour.ciede2000(lab, colour.srgb_to_lab(colour.parse_hex([r[2] for r in kept])))[0]
+    found = [(float(d), row[0]) for d, row in zip(distances, kept) if d <= max_delta_e]
+    return sorted(found)
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return _rows(0, 3000)
+
+
+@pytest.fixture(scope="module")
+def index(rows):
+    index = PaletteIndex(cell_size=8)
+    assert index.add(rows) == len(rows)
+    return index
+
+
+@pytest.mark.parametrize("max_delta_e", [1, 5, 12, 40])
+def test_query_matches_brute_force(rows, index, max_delta_e):
+    for target in ["#ff0000", "#336699", "#777777", "#fafafa", "#0a0a0a", "#00ff7f"]:
+        expected = _brute_force(rows, target, max_delta_e)
+        matches = index.query(target, max_delta_e, k=len(rows))
+        assert [m.item_id for m in matches] == [item_id for _, item_id in expected]
+        assert [m.delta_e for m in matches] == pytest.approx([d for d, _ in expected])
+
+
+def test_threshold_and_k():
+    # ΔE2000 of #808080 and #838383 is about 1.1, of #808080 and #858585 about 1.9
+    index = PaletteIndex(cell_size=8)
+    index.add([(1, BRANDBOOKS[0], "#838383"), (2, BRANDBOOKS[0], "#858585"), (3, BRANDBOOKS[0], "#808080")])
+    assert [m.item_id for m in index.query("#808080", 1.0, k=10)] == [3]
+    assert [m.item_id for m in index.query("#808080", 1.5, k=10)] == [3, 1]
+    assert [m.item_id for m in index.query("#808080", 2.0, k=10)] == [3, 1, 2]
+    assert [m.item_id for m in index.query("#808080", 2.0, k=2)] == [3, 1]
+    assert all(m.delta_e <= 2.0 for m in index.query("#808080", 2.0, k=10))
+
+
+def test_brandbook_filters(rows, index):
+    mine = {BRANDBOOKS[0], BRANDBOOKS[1]}
+    target, max_delta_e = "#3366cc", 15
+
+    within = index.query(target, max_delta_e, k=len(rows), within=mine)
+    assert [m.item_id for m in within] == [
+        item_id for _, item_id in _brute_force(rows, target, max_delta_e, lambda r: r[1] in mine)
+    ]
+    excluded = index.query(target, max_delta_e, k=len(rows), exclude_brandbook=BRANDBOOKS[0], within=mine)
+    assert {m.brandbook_id for m in excluded} <= {BRANDBOOKS[1]}
+
+    elsewhere = _brute_force(rows, target, max_delta_e, lambda r: r[1] not in mine)
+    count, best = index.clashes(target, max_delta_e, outside=mine)
+    assert count == len(elsewhere)
+    assert best == pytest.approx(elsewhere[0][0])
+    assert index.clashes(target, max_delta_e, outside=set(BRANDBOOKS)) == (0, None)
+
+
+def test_incremental_add_and_remove():
+    first, second = _rows(1, 400), [(item_id + 400, b, c) for item_id, b, c in _rows(2, 400)]
+    index = PaletteIndex(cell_size=8)
+    assert index.add(first) == len(first)
+    assert index.add(first) == 0  # already indexed
+    assert index.add([(9999, BRANDBOOKS[0], "not a colour")]) == 0
+    assert index.add(second) == len(second)
+
+    removed = {row[0] for row in first[::3]}
+    assert index.remove(removed | {123456}) == len(removed)
+    assert index.remove(removed) == 0
+    live = [row for row in first + second if row[0] not in removed]
+
+    for target in ["#c0ffee", "#123456", "#888888"]:
+        expected = _brute_force(live, target, 20)
+        assert [m.item_id for m in index.query(target, 20, k=len(live))] == [i for _, i in expected]
+
+    # a removed item can be indexed again (a version restore rewrites items)
+    readded = first[0]
+    assert index.add([readded]) == 1
+    assert readded[0] in {m.item_id for m in index.query(readded[2], 0.01, k=10)}
+    assert index.stats()["colours"] == len(live) + 1
+
+
+def test_array_growth_keeps_positions():
+    index = PaletteIndex(cell_size=8)
+    rows = _rows(3, 2500)  # more than the initial 1024 slots
+    for start in range(0, len(rows), 700):
+        index.add(rows[start:start + 700])
+    for item_id, _, hex_colour in rows[::250]:
+        assert index.query(hex_colour, 0.01, k=1)[0].delta_e == pytest.approx(0, abs=1e-6)
+        assert np.isclose(
+            min(m.delta_e for m in index.query(hex_colour, 0.01, k=50) if m.item_id == item_id), 0
+        )
+
+
+# --- catching up from PostgreSQL ---
+
+async def _refresh(index: PaletteIndex) -> None:
+    index.refreshed_at = None  # due now
+    async with database.AsyncSessionLocal() as db:
+        await crud.refresh_palette_index(db)
+
+
+async def _insert_out_of_commit_order(index: PaletteIndex, brandbook_id: uuid.UUID):
+    """Two workers insert; the one holding the lower ID commits after a refresh has run."""
+    async with database.AsyncSessionLocal() as slow, database.AsyncSessionLocal() as fast:
+        late = models.BrandItem(brandbook_id=brandbook_id, type="colour", link="-", colour="#123456")
+        slow.add(late)
+        await slow.flush()  # the ID is taken here, the row is visible only after COMMIT
+        early = models.BrandItem(brandbook_id=brandbook_id, type="colour", link="-", colour="#654321")
+        fast.add(early)
+        await fast.commit()
+        assert early.id > late.id
+
+        await _refresh(index)
+        seen_before_commit = set(index._known)
+        await slow.commit()
+        await _refresh(index)
+        return late.id, early.id, seen_before_commit
+
+
+def test_refresh_picks_up_rows_committed_out_of_id_order(client, owner, monkeypatch):
+    index = PaletteIndex(cell_size=8)
+    monkeypatch.setattr(crud, "palette_index", index)
+    created = client.post("/brandbooks/", json={"title": "Out of order"})
+    assert created.status_code == 201, created.text
+
+    brandbook_id = uuid.UUID(created.json()["id"])
+    late, early, seen = client.portal.call(_insert_out_of_commit_order, index, brandbook_id)
+    assert early in seen and late not in seen
+    assert index.scan_from < late < early <= index.last_item_id
+    assert [m.item_id for m in index.query("#123456", 0.01, k=10, within={brandbook_id})] == [late]
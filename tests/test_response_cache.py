@@ -0,0 +1,70 @@
+"""The in-process cache holds detail responses only; lost generation bumps stop list caching."""
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime
+
+from backend.brandbook.response_cache import MemoryBackend, RedisBackend, ResponseCache
+
+
+def test_memory_backend_caches_details_but_not_lists():
+    cache = ResponseCache(MemoryBackend(max_bytes=1024, ttl=60))
+    user_id, brandbook_id = uuid.uuid4(), uuid.uuid4()
+
+    async def run():
+        # per-process generations would let other workers serve stale pages
+        assert await cache.list_key(user_id, {"limit": 10}) is None
+        key = cache.detail_key(user_id, brandbook_id, datetime(2026, 1, 1))
+        await cache.set(key, b"{}")
+        assert await cache.get(key) == b"{}"
+
+    asyncio.run(run())
+
+
+
+class _FlakyRedis(RedisBackend):
+    """Commands go to a dict instead of a server; INCR fails while ``incr_fails`` is set."""
+
+    def __init__(self):
+        super().__init__("redis://localhost", ttl=60)
+        self.store = {}
+        self.incr_fails = False
+
+    async def _command(self, *args):
+        name, key, *rest = args
+        if name == "INCR":
+            if self.incr_fails:
+                raise OSError("connection reset")
+            self.store[key] = self.store.get(key, 0) + 1
+            return self.store[key]
+        if name == "SET":
+            self.store[key] = rest[0]
+            return "OK"
+        return self.store.get(key)
+
+
+def test_lists_are_not_cached_until_a_failed_bump_goes_through():
+    backend = _FlakyRedis()
+    cache = ResponseCache(backend)
+    user_id, params = uuid.uuid4(), {"limit": 10}
+
+    async def run():
+        stale = await cache.list_key(user_id, params)
+        await cache.set(stale, b"[]")
+
+        backend.incr_fails = True
+        await cache.invalidate_user(user_id)  # the write committed, but its bump was lost
+        assert await cache.list_key(user_id, params) is None
+        backend.incr_fails = False
+        # still backed off after the error: the retry is skipped, so still no list caching
+        assert await cache.list_key(user_id, params) is None
+        assert cache.stats()["pending_bumps"] == 1
+
+        backend._down_until = 0.0
+        fresh = await cache.list_key(user_id, params)
+        assert fresh is not None and fresh != stale
+        assert await cache.get(fresh) is None
+        assert cache.stats()["pending_bumps"] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,61 @@
+"""Search snippets are safe to render as HTML; the hit cap and the timeout bound the work.
+
+Needs the database; see the fixtures in conftest.py.
+"""
+from __future__ import annotations
+
+from sqlalchemy import Integer, func, literal, select
+from sqlalchemy.dialects.postgresql import UUID
+
+from backend.brandbook import search
+from backend.brandbook.search import render_snippet
+
+
+def test_render_snippet_escapes_everything_but_the_marks():
+    assert render_snippet("<b>acme</b> & \"co\"") == (
+        "&lt;b&gt;<mark>acme</mark>&lt;/b&gt; &amp; &quot;co&quot;"
+    )
+
+
+def test_snippets_of_markup_in_user_text_are_escaped(client, owner):
+    created = client.post("/brandbooks/", json={"title": "Zyxquu <img src=x onerror=alert(1)>"})
+    assert created.status_code == 201, created.text
+    brandbook_id = created.json()["id"]
+    section = client.post(f"/brandbooks/{brandbook_id}/sections", json={
+        "type": "text", "content": {"body": "zyxquu </mark><script>alert(2)</script>"},
+    })
+    assert section.status_code == 201, section.text
+
+    response = client.get("/brandbooks/search", params={"q": "zyxquu"})
+    assert response.status_code == 200, response.text
+    [result] = response.json()
+    snippets = {h["kind"]: h["snippet"] for h in result["highlights"]}
+
+    assert snippets["brandbook"].startswith("<mark>Zyxquu</mark> &lt;img")
+    assert "<mark>zyxquu</mark>" in snippets["section"]
+    for snippet in snippets.values():
+        assert "<img" not in snippet and "<script" not in snippet
+        assert snippet.count("<mark>") == snippet.count("</mark>") == 1
+
+
+def test_hit_cap_keeps_the_best_ranked_hits(client, owner, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_HIT_CAP", 1)
+    brandbook_id = client.post("/brandbooks/", json={"title": "Capped"}).json()["id"]
+    for name in ["qwvk one", "qwvk two", "qwvk qwvk qwvk best"]:  # the best-ranked row comes last
+        item = client.post(f"/brandbooks/{brandbook_id}/items", json={"type": "logo", "name": name, "link": "-"})
+        assert item.status_code == 201, item.text
+        best_id = item.json()["id"]
+
+    [result] = client.get("/brandbooks/search", params={"q": "qwvk"}).json()
+    assert [h["item_id"] for h in result["highlights"]] == [best_id]
+
+
+def test_too_broad_query_is_422(client, owner, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_STATEMENT_TIMEOUT_MS", 1)
+    monkeypatch.setattr(search, "_hits", lambda owner_id, tsquery: select(
+        literal(None, UUID).label("brandbook_id"), literal("brandbook").label("kind"),
+        literal(None, Integer).label("item_id"), literal(None, UUID).label("section_id"),
+        literal(1.0).label("rank"),
+    ).where(func.pg_sleep(0.05).is_not(None)))
+    response = client.get("/brandbooks/search", params={"q": "anything"})
+    assert response.status_code == 422, response.text
@@ -0,0 +1,44 @@
+"""Serving a built frontend: negotiated variants only, never the raw siblings."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from backend.static.build import build
+from backend.static.serving import FrontendFiles
+
+PAGE = "<!doctype html><html><body>" + "<p>Brand book</p>" * 200 + "</body></html>"
+
+
+@pytest.fixture
+def client(tmp_path: Path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "index.html").write_text(PAGE)
+    manifest = build(src, tmp_path / "out")
+    app = Starlette(routes=[Mount("/frontend", FrontendFiles(str(tmp_path / "out"), manifest))])
+    with TestClient(app) as client:
+        yield client
+
+
+def test_negotiated_variant(client):
+    response = client.get("/frontend/index.html", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == PAGE  # decoded by the client
+
+    plain = client.get("/frontend/index.html", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.text == PAGE
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".br"])
+def test_precompressed_siblings_are_not_served_by_name(client, suffix):
+    response = client.get(f"/frontend/index.html{suffix}")
+    assert response.status_code == 404
+
@@ -0,0 +1,103 @@
+"""Resumable uploads: offsets, length limits, resuming and retrying the last step.
+
+Needs the database; see the fixtures in conftest.py.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+
+import pytest
+
+from backend.files import crud as files_crud
+from backend.files.storage import blob_store, staging
+
+DATA = os.urandom(3000)
+
+
+@pytest.fixture
+def upload(client, owner):
+    brandbook = client.post("/brandbooks/", json={"title": "Uploads"})
+    assert brandbook.status_code == 201, brandbook.text
+    created = client.post("/files/uploads", json={
+        "brandbook_id": brandbook.json()["id"], "length": len(DATA), "content_type": "application/octet-stream",
+    })
+    assert created.status_code == 201, created.text
+    upload_id = created.json()["upload_id"]
+    yield f"/files/uploads/{upload_id}"
+    staging.discard(upload_id)
+
+
+def _send(client, url, offset, body):
+    return client.patch(url, content=body, headers={"Upload-Offset": str(offset)})
+
+
+def _offset(client, url) -> int:
+    response = client.head(url)
+    assert response.status_code == 200
+    return int(response.headers["Upload-Offset"])
+
+
+def _assert_stored(response):
+    assert response.status_code == 200, response.text
+    stored = response.json()["file"]
+    digest = hashlib.sha256(DATA).hexdigest()
+    assert stored["content_hash"] == digest and stored["size"] == len(DATA)
+    with blob_store.open(digest) as fh:
+        assert fh.read() == DATA
+
+
+def test_upload_in_chunks(client, upload):
+    first = _send(client, upload, 0, DATA[:1000])
+    assert first.status_code == 200 and first.json() == {
+        "upload_id": upload.rsplit("/", 1)[1], "offset": 1000, "length": len(DATA), "file": None,
+    }
+    assert _offset(client, upload) == 1000
+    _assert_stored(_send(client, upload, 1000, DATA[1000:]))
+    # the session is gone once the row exists
+    assert client.head(upload).status_code == 404
+
+
+@pytest.mark.parametrize("offset", [0, 500, 1001])
+def test_wrong_offset_is_409(client, upload, offset):
+    assert _send(client, upload, 0, DATA[:1000]).status_code == 200
+    response = _send(client, upload, offset, DATA[offset:offset + 10])
+    assert response.status_code == 409
+    assert response.headers["Upload-Offset"] == "1000"
+    assert _offset(client, upload) == 1000
+
+
+def test_body_past_declared_length_is_413(client, upload):
+    assert _send(client, upload, 0, DATA[:1000]).status_code == 200
+    response = _send(client, upload, 1000, DATA[1000:] + b"extra")
+    assert response.status_code == 413
+    # nothing of the rejected body is kept, and the upload can still finish
+    assert _offset(client, upload) == 1000
+    _assert_stored(_send(client, upload, 1000, DATA[1000:]))
+
+
+def test_resume_rebuilds_hash_from_staged_file(client, upload):
+    upload_id = upload.rsplit("/", 1)[1]
+    assert _send(client, upload, 0, DATA[:1200]).status_code == 200
+    # an interrupted PATCH (or a restart) drops the running hash; the .part file is the truth
+    staging.forget_hasher(upload_id)
+    resumed = _offset(client, upload)
+    assert resumed == 1200
+    assert _send(client, upload, resumed, DATA[resumed:2000]).status_code == 200
+    staging.forget_hasher(upload_id)
+    _assert_stored(_send(client, upload, 2000, DATA[2000:]))
+
+
+def test_final_patch_retries_failed_insert(client, upload, monkeypatch):
+    create = files_crud.create_uploaded_file
+
+    async def fail_once(*args, **kwargs):
+        monkeypatch.setattr(files_crud, "create_uploaded_file", create)
+        raise OSError("database went away")
+
+    monkeypatch.setattr(files_crud, "create_uploaded_file", fail_once)
+    with pytest.raises(OSError):
+        _send(client, upload, 0, DATA)
+    # the bytes are in the blob store; only the row is missing
+    assert _offset(client, upload) == len(DATA)
+    _assert_stored(_send(client, upload, len(DATA), b""))
@@ -0,0 +1,155 @@
+"""Version history: save, edit, restore, and rebuild versions across checkpoints.
+
+Needs the database; see the fixtures in conftest.py.
+"""
+from __future__ import annotations
+
+import uuid
+
+import pytest
+from sqlalchemy import delete, select, update
+
+import database
+from backend.brandbook import crud, models, versions
+from backend.users.models import Brandbook, Section
+
+
+@pytest.fixture
+def brandbook(client, owner):
+    created = client.post("/brandbooks/", json={"title": "Versioned"})
+    assert created.status_code == 201, created.text
+    brandbook_id = created.json()["id"]
+    for name, colour in [("Primary", "#ff0000"), ("Secondary", "#00ff00")]:
+        item = client.post(f"/brandbooks/{brandbook_id}/items", json={
+            "type": "colour", "name": name, "link": "-", "colour": colour,
+        })
+        assert item.status_code == 201, item.text
+    section = client.post(f"/brandbooks/{brandbook_id}/sections", json={"type": "text", "content": {"body": "v1"}})
+    assert section.status_code == 201, section.text
+    return brandbook_id
+
+
+async def _state(brandbook_id: uuid.UUID) -> dict:
+    """Everything a version covers (but files), as plain sets and values."""
+    async with database.AsyncSessionLocal() as db:
+        title = (await db.execute(select(Brandbook.title).where(Brandbook.id == brandbook_id))).scalar_one()
+        items = await db.execute(
+            select(models.BrandItem.id, models.BrandItem.type, models.BrandItem.name, models.BrandItem.colour)
+            .where(models.BrandItem.brandbook_id == brandbook_id)
+        )
+        sections = await db.execute(
+            select(Section.id, Section.type, Section.content, Section.order_key).where(Section.brandbook_id == brandbook_id)
+        )
+        return {
+            "title": title,
+            "items": {tuple(row) for row in items},
+            "sections": {(row.id, row.type, repr(row.content), row.order_key) for row in sections},
+        }
+
+
+async def _rename_and_drop_item(brandbook_id: uuid.UUID, title: str) -> None:
+    """Edits the API has no route for (yet): a new title and a removed item."""
+    async with database.AsyncSessionLocal() as db:
+        owner_id = await crud.touch_brandbook(db, brandbook_id)
+        await db.execute(update(Brandbook).where(Brandbook.id == brandbook_id).values(title=title))
+        first = select(models.BrandItem.id).where(models.BrandItem.brandbook_id == brandbook_id)
+        await db.execute(delete(models.BrandItem).where(
+            models.BrandItem.id == first.order_by(models.BrandItem.id).limit(1).scalar_subquery()
+        ))
+        await crud.commit_write(db, owner_id)
+
+
+def _save(client, brandbook_id, label=None):
+    response = client.post(f"/brandbooks/{brandbook_id}/versions", json={"label": label})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _restore(client, brandbook_id, number):
+    response = client.post(f"/brandbooks/{brandbook_id}/versions/{number}/restore")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _edit(client, brandbook_id, step):
+    """One edit of a different kind per step: add an item, add a section, patch a section, or rename/remove."""
+    kind = step % 4
+    if kind == 0:
+        response = client.post(f"/brandbooks/{brandbook_id}/items", json={
+            "type": "colour", "name": f"Step {step}", "link": "-", "colour": f"#0000{step:02x}",
+        })
+        assert response.status_code == 201, response.text
+    elif kind == 1:
+        response = client.post(f"/brandbooks/{brandbook_id}/sections", json={"type": "text", "content": {"body": f"s{step}"}})
+        assert response.status_code == 201, response.text
+    elif kind == 2:
+        sections = client.get(f"/brandbooks/{brandbook_id}/sections").json()
+        response = client.patch(
+            f"/brandbooks/{brandbook_id}/sections/{sections[0]['id']}",
+            json=[{"op": "add", "path": "/step", "value": step}],
+            headers={"Content-Type": "application/json-patch+json"},
+        )
+        assert response.status_code == 204, response.text
+    else:
+        client.portal.call(_rename_and_drop_item, uuid.UUID(brandbook_id), f"Versioned {step}")
+
+
+def test_create_edit_restore_round_trip(client, brandbook):
+    brandbook_id = uuid.UUID(brandbook)
+    original = client.portal.call(_state, brandbook_id)
+    assert _save(client, brandbook, "first")["number"] == 1
+    # nothing changed: the latest version comes back, nothing is saved
+    assert _save(client, brandbook)["number"] == 1
+
+    for step in range(4):
+        _edit(client, brandbook, step)
+    edited = client.portal.call(_state, brandbook_id)
+    assert edited["title"] != original["title"]
+    assert len(edited["items"]) == len(original["items"]) and edited["items"] != original["items"]
+    assert len(edited["sections"]) == 2
+
+    # the unsaved edits become version 2, the restore itself version 3
+    restored = _restore(client, brandbook, 1)
+    assert (restored["number"], restored["label"]) == (3, "Restored version 1")
+    assert client.portal.call(_state, brandbook_id) == original
+    assert [v["number"] for v in client.get(f"/brandbooks/{brandbook}/versions").json()] == [3, 2, 1]
+
+    # and the restore can be undone
+    _restore(client, brandbook, 2)
+    assert client.portal.call(_state, brandbook_id) == edited
+
+    detail = client.get(f"/brandbooks/{brandbook}/versions/1").json()
+    assert detail["title"] == original["title"]
+    assert {(i["id"], i["type"], i["name"], i["colour"]) for i in detail["items"]} == original["items"]
+    assert {(uuid.UUID(s["id"]), s["type"], repr(s["content"]), s["order_key"]) for s in detail["sections"]} == (
+        original["sections"]
+    )
+
+
+def test_restore_across_checkpoints(client, brandbook, monkeypatch):
+    monkeypatch.setattr(versions, "BRANDBOOK_VERSION_CHECKPOINT_EVERY", 3)
+    brandbook_id = uuid.UUID(brandbook)
+    states = {}
+    for step in range(8):
+        version = _save(client, brandbook)
+        states[version["number"]] = client.portal.call(_state, brandbook_id)
+        _edit(client, brandbook, step)
+    listed = client.get(f"/brandbooks/{brandbook}/versions").json()
+    assert [v["number"] for v in listed if v["checkpoint"]] == [7, 4, 1]
+
+    # from the newest state back to a delta before a checkpoint, a checkpoint, and a delta after one
+    for number in [2, 4, 6, 8, 1]:
+        _restore(client, brandbook, number)
+        assert client.portal.call(_state, brandbook_id) == states[number], number
+
+    for number, state in states.items():
+        detail = client.get(f"/brandbooks/{brandbook}/versions/{number}").json()
+        assert detail["title"] == state["title"]
+        assert {i["id"] for i in detail["items"]} == {i[0] for i in state["items"]}
+        assert {uuid.UUID(s["id"]) for s in detail["sections"]} == {s[0] for s in state["sections"]}
+
+
+def test_unknown_version_is_404(client, brandbook):
+    assert client.post(f"/brandbooks/{brandbook}/versions/1/restore").status_code == 404
+    _save(client, brandbook)
+    assert client.get(f"/brandbooks/{brandbook}/versions/2").status_code == 404